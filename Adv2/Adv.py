@@ -9,7 +9,12 @@
 # We use type hinting so that it is easy to see the intent as matching the C++/C# code
 
 from dataclasses import dataclass
+from datetime import datetime, timedelta
 from enum import Enum
+from typing import Optional
+
+# ADV timestamps are nanoseconds since this moment (UTC)
+ADV_EPOCH = datetime(2010, 1, 1)
 
 
 class StreamId(Enum):
@@ -87,9 +92,6 @@ class AdvFrameInfo:
     UtcMidExposureTimestampHi: int = 0
     Exposure: int = 0
 
-    DateString: str = ''                   # This a new item, not included in C# AdvFrameInfo
-    StartOfExposureTimestampString = ''    # This a new item, not included in C# AdvFrameInfo
-
     Gamma: float = 0.0
     Gain: float = 0.0
     Shutter: float = 0.0
@@ -103,10 +105,38 @@ class AdvFrameInfo:
     VideoCameraFrameIdLo: int = 0
     VideoCameraFrameIdHi: int = 0
     HardwareTimerFrameIdLo: int = 0
-    HardwareTimerFrameIdHi = 0
+    HardwareTimerFrameIdHi: int = 0
 
     SystemTimestampLo: int = 0
     SystemTimestampHi: int = 0
 
-    ImageLayoutId = 0
-    RawDataBlockSize = 0
+    ImageLayoutId: int = 0
+    RawDataBlockSize: int = 0
+
+    # DateString and StartOfExposureTimestampString are new items, not included in C# AdvFrameInfo.
+    # They are computed from the timestamp fields only when they are asked for.
+
+    def _startOfExposure(self) -> Optional[datetime]:
+        midExposure = self.UtcMidExposureTimestampLo + (self.UtcMidExposureTimestampHi << 32)
+        # There 'should' always be a valid timestamp in an adv2 file, but if there is not, then there will be
+        # zeros in UtcMidExposureTimestampLo and Hi.
+        if midExposure == 0:
+            return None
+        # Adjust from mid exposure to start-exposure and convert nanoseconds to microseconds (for timedelta)
+        usecs = (midExposure - self.Exposure // 2) // 1000
+        return ADV_EPOCH + timedelta(microseconds=usecs)
+
+    @property
+    def DateString(self) -> str:
+        ts = self._startOfExposure()
+        if ts is None:
+            return ''
+        return f'{ts.year:04d}-{ts.month:02d}-{ts.day:02d}'
+
+    @property
+    def StartOfExposureTimestampString(self) -> str:
+        # This string is in the form needed for direct insertion into a csv file column (Excel safe format)
+        ts = self._startOfExposure()
+        if ts is None:
+            return ''
+        return f'[{ts.hour:02d}:{ts.minute:02d}:{ts.second:02d}.{ts.microsecond:06d}]'
@@ -13,24 +13,174 @@ import os
 # print('\ncurrent working directory ...')
 # print(os.getcwd(), '\n')
 
-import pathlib
-from ctypes import c_int, c_uint
-from typing import Dict, List, Tuple
-from datetime import datetime, timedelta
+import copy
+import queue
+import threading
+import weakref
+from collections.abc import Sequence as SequenceABC
+from ctypes import POINTER, c_int, c_uint
+from typing import Dict, Iterator, Optional, Sequence, Tuple, Union
+from datetime import datetime, timedelta, timezone
 import numpy as np
 from Adv2.AdvError import ResolveErrorMessage, S_OK
-from Adv2 import AdvLib
+from Adv2 import AdvLib, AdvMmapLib
+from Adv2.AdvMmapLib import convertPixels
+from Adv2.AdvFrameCache import AdvFrameCache
+from Adv2.AdvInstrumentation import AdvInstrumentation, Tracer, clock
 from Adv2.Adv import AdvFileInfo, AdvFrameInfo, AdvIndexEntry, StreamId, TagPairType, Adv2TagType
 from Adv2.AdvError import AdvLibException
 
+# The native library is optional: if it is missing (or cannot be loaded on this platform) the pure Python
+# mmap backend (AdvMmapLib.py) is used instead. It is only loaded when a reader first needs it.
+# AdvProcessLib (multiprocessing) and AdvSidecar are imported only by the readers that use them.
+
+BACKENDS = ('auto', 'native', 'mmap', 'process')
+
+# The dtypes an Adv2reader can return images in (see Adv2reader.__init__())
+OUTPUT_DTYPES = ('native', 'uint8', 'uint16', 'float32')
+
+# The native library can only have one file open at a time (it holds the open file in process-global state).
+# This refers (weakly) to the Adv2reader that currently owns it.
+_nativeOwner = None
+
+
+def _nativeLibraryInUse() -> bool:
+    return _nativeOwner is not None and _nativeOwner() is not None
+
+
+# The numeric fields of AdvFrameInfo, in C# declaration order. The image stack readers return one record of this
+# dtype per frame (a structured array) instead of one AdvFrameInfo instance per frame.
+FRAME_INFO_DTYPE = np.dtype([
+    ('StartTicksLo', np.uint32), ('StartTicksHi', np.uint32),
+    ('EndTicksLo', np.uint32), ('EndTicksHi', np.uint32),
+    ('UtcMidExposureTimestampLo', np.uint32), ('UtcMidExposureTimestampHi', np.uint32),
+    ('Exposure', np.uint32),
+    ('Gamma', np.float32), ('Gain', np.float32), ('Shutter', np.float32), ('Offset', np.float32),
+    ('GPSTrackedSatellites', np.uint8), ('GPSAlmanacStatus', np.uint8),
+    ('GPSFixStatus', np.uint8), ('GPSAlmanacOffset', np.int8),
+    ('VideoCameraFrameIdLo', np.uint32), ('VideoCameraFrameIdHi', np.uint32),
+    ('HardwareTimerFrameIdLo', np.uint32), ('HardwareTimerFrameIdHi', np.uint32),
+    ('SystemTimestampLo', np.uint32), ('SystemTimestampHi', np.uint32),
+    ('ImageLayoutId', np.uint32), ('RawDataBlockSize', np.uint32),
+])
+
+
+# Layout of the AdvIndexEntry structure as written by AdvVer2_GetIndexEntries(). Although an AdvIndexEntry is
+# 2 int64 and an int32, the entries are aligned on int64 boundaries - hence the 24 byte itemsize.
+INDEX_ENTRY_DTYPE = np.dtype({
+    'names': ['ElapsedTicks', 'FrameOffset', 'BytesCount'],
+    'formats': [np.int64, np.int64, np.int32],
+    'offsets': [0, 8, 16],
+    'itemsize': 24,
+})
+
+
+class AdvIndexEntryList(SequenceABC):
+    # A read-only list of AdvIndexEntry that is a lazy view of an INDEX_ENTRY_DTYPE array
+    def __init__(self, indexArray: np.ndarray):
+        self.indexArray = indexArray
+
+    def __len__(self) -> int:
+        return len(self.indexArray)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[i] for i in range(*item.indices(len(self)))]
+        ticks, offset, byte_count = self.indexArray[item].tolist()
+        return AdvIndexEntry(ElapsedTicks=ticks, FrameOffset=offset, BytesCount=byte_count)
+
+
+# The AdvLib function that reads a status tag of each type, and the numpy dtype of its getStatusTable() column.
+# (Int8 tags are read as unsigned bytes, as the name of the AdvLib function says.)
+STATUS_TAG_GETTERS = {
+    Adv2TagType.Int8: ('AdvVer2_GetStatusTagUInt8', np.uint8),
+    Adv2TagType.Int16: ('AdvVer2_GetStatusTagInt16', np.int16),
+    Adv2TagType.Int32: ('AdvVer2_GetStatusTagInt32', np.int32),
+    Adv2TagType.Int64: ('AdvVer2_GetStatusTagInt64', np.int64),
+    Adv2TagType.Real: ('AdvVer2_GetStatusTagReal', np.float32),
+    Adv2TagType.UTF8String: ('AdvVer2_GetStatusTagUTF8String', object),
+}
+
+# ADV timestamps are nanoseconds since 2010-01-01. Adding this converts them to nanoseconds since 1970-01-01.
+ADV_EPOCH_NANOSECONDS = 1262304000 * 1_000_000_000
+
+# Marks a start-of-exposure timestamp that has not been read yet
+MISSING_TIMESTAMP = np.iinfo(np.int64).min
+
+
+def formatSystemTime(nanoseconds: int) -> str:
+    # The SystemTime status tag (nanoseconds since 2010-01-01) as 'YYYY-MM-DD [HH:MM:SS.ffffff]'
+    usecs = nanoseconds // 1000  # Convert nanoseconds to microseconds - for timedelta
+    ts = datetime(2010, 1, 1) + timedelta(microseconds=usecs)
+    return (f'{ts.year:04d}-{ts.month:02d}-{ts.day:02d} '
+            f'[{ts.hour:02d}:{ts.minute:02d}:{ts.second:02d}.{ts.microsecond:06d}]')
+
+
+def startOfExposureNanoseconds(frameInfos: np.ndarray) -> np.ndarray:
+    # Returns the start-of-exposure timestamps (int64 nanoseconds since 2010-01-01) of an array of FRAME_INFO_DTYPE
+    midExposure = (frameInfos['UtcMidExposureTimestampLo'].astype(np.int64) +
+                   (frameInfos['UtcMidExposureTimestampHi'].astype(np.int64) << 32))
+    return midExposure - frameInfos['Exposure'].astype(np.int64) // 2
+
 
 class Adv2reader:
-    def __init__(self, filename: str):
+    def __init__(self, filename: str, backend: str = 'auto', sidecarCache: bool = False,
+                 outputDtype: str = 'uint16', scaleTo16Bit: bool = False):
+        # backend selects how the file is read:
+        #   'native' uses the bundled AdvLib native library in this process. Only one 'native' reader can be
+        #       open at a time because the library holds the open file in process-global state.
+        #   'process' uses the native library in a worker process owned by this reader, so any number
+        #       of readers can be open side by side.
+        #   'mmap' parses the file in Python from a memory mapping (uncompressed images only)
+        #   'auto' uses 'native' if the native library could be loaded and is not in use by another reader,
+        #       'process' if it is in use, and 'mmap' if it could not be loaded.
+        # outputDtype selects the dtype of the images returned (see OUTPUT_DTYPES): 'native' is the smallest one
+        # that holds the file's pixels without loss (uint8 when FileInfo.DataBpp is 8 or less, otherwise uint16).
+        # With scaleTo16Bit the pixel values are multiplied by 2 ** (16 - DataBpp) so that they span the full
+        # 16 bit range (for display), in the same pass that converts them.
+        global _nativeOwner
+
+        if backend not in BACKENDS:
+            raise AdvLibException(f'backend must be one of {BACKENDS} but was {backend!r}')
+        if outputDtype not in OUTPUT_DTYPES:
+            raise AdvLibException(f'outputDtype must be one of {OUTPUT_DTYPES} but was {outputDtype!r}')
+        if backend == 'auto':
+            if not AdvLib.nativeLibraryAvailable():
+                backend = 'mmap'
+            else:
+                backend = 'process' if _nativeLibraryInUse() else 'native'
+        if backend in ('native', 'process') and not AdvLib.nativeLibraryAvailable():
+            raise AdvLibException('The native ADV library could not be loaded on this platform')
+        if backend == 'native' and _nativeLibraryInUse():
+            raise AdvLibException('The native ADV library is in use by another Adv2reader. Close that reader '
+                                  "first or use backend='process' or backend='mmap'")
+        self.backend = backend
+
         if not os.path.isfile(filename):
             raise AdvLibException(f'Error: cannot find file ... {filename}')
 
+        # self._lib is the AdvLib module, an AdvMmapFile or an AdvLibProcess. They all provide the same functions.
+        if backend == 'native':
+            self._lib = AdvLib
+            _nativeOwner = weakref.ref(self)
+        elif backend == 'process':
+            from Adv2 import AdvProcessLib
+            self._lib = AdvProcessLib.AdvLibProcess()
+        else:
+            self._lib = AdvMmapLib.AdvMmapFile()
+
+        try:
+            self._openFile(filename, sidecarCache, outputDtype, scaleTo16Bit)
+        except BaseException:
+            self._releaseFailedOpen()
+            raise
+
+    def _openFile(self, filename: str, sidecarCache: bool, outputDtype: str, scaleTo16Bit: bool):
+        # The part of __init__ that runs once self._lib has been claimed: if it raises, _releaseFailedOpen() gives
+        # the native library (or the worker process) back
+
         # Get version number without trying to fully parse the file.
-        err, version = AdvLib.AdvGetFileVersion(filename)
+        err, version = self._lib.AdvGetFileVersion(filename)
         if not err:
             if not version == 2:
                 raise AdvLibException(f'ADV version {version} is unsupported --- only version 2 is supported')
@@ -38,7 +188,7 @@ class Adv2reader:
             raise AdvLibException(err)
 
         fileInfo = AdvFileInfo()
-        fileVersionErrorCode = AdvLib.AdvOpenFile(filename, fileInfo)
+        fileVersionErrorCode = self._lib.AdvOpenFile(filename, fileInfo)
 
         if fileVersionErrorCode > 0x70000000:
             raise AdvLibException(f'There was an error opening {filename}: '
@@ -59,158 +209,799 @@ class Adv2reader:
         # This instance variable gives the user access all file information, including the above items
         self.FileInfo = fileInfo
 
+        # The dtype of the images returned and the factor their values are multiplied by (see scaleTo16Bit)
+        dataBpp = fileInfo.DataBpp if 0 < fileInfo.DataBpp <= 16 else 16
+        if outputDtype == 'native':
+            outputDtype = 'uint16' if dataBpp > 8 or scaleTo16Bit else 'uint8'
+        if outputDtype == 'uint8' and (dataBpp > 8 or scaleTo16Bit):
+            raise AdvLibException(f'uint8 images cannot hold the {16 if scaleTo16Bit else dataBpp} bit pixels '
+                                  f'of {filename}')
+        self.outputDtype = np.dtype(outputDtype)
+        self._pixelShift = 16 - dataBpp if scaleTo16Bit else 0
+        self.pixelScale = 1 << self._pixelShift
+
         self.pixels = None
+
+        # The native library writes uint32 pixel values. We preallocate that buffer once (as a numpy array) and hand
+        # its data pointer straight to AdvVer2_GetFramePixels so that no per-frame ctypes array is needed.
+        self._pixelBuffer = np.zeros((self.Height, self.Width), dtype=np.uint32)
+        self._pixelPointer = self._pixelBuffer.ctypes.data_as(POINTER(c_uint))
+
         self.sysErrLength: int = 0
         self.frameInfo = AdvFrameInfo()
         self.statusTagInfo = []
+        self._indexArrays = None
+        self._timestamps: Dict[StreamId, Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = {}
+        # Start-of-exposure timestamps of the frames decoded so far by framesInTimeRange() (MISSING_TIMESTAMP
+        # where a frame has not been decoded yet)
+        self._lazyStartOfExposure: Dict[StreamId, np.ndarray] = {}
+
+        # Serializes frame reads, which share self._pixelBuffer and self.frameInfo (see iterFrames())
+        self._lock = threading.RLock()
 
-        for tagId in range(fileInfo.StatusTagsCount):
-            tagType, tagName = AdvLib.AdvVer2_GetStatusTagInfo(tagId)
+        # An optional AdvFrameCache (see enableFrameCache())
+        self.frameCache: Optional[AdvFrameCache] = None
+
+        # Optional performance counters (see enableInstrumentation())
+        self.instrumentation: Optional[AdvInstrumentation] = None
+
+        # An AdvMmapFile used to read frame headers and status sections without decoding images when the backend
+        # is not 'mmap' (see _headerReader()). False once it is known that the mmap parser cannot read the file.
+        self._headerLib: Union[AdvMmapLib.AdvMmapFile, None, bool] = None
+        self._headerStatusGetters = []
+
+        # With sidecarCache the status tag layout, metadata, index and timestamps are read from (or saved to)
+        # a sidecar file next to the ADV file (see AdvSidecar.py)
+        self._filename = filename
+        self._metaData: Optional[Dict[str, str]] = None
+        self._sidecarKey = None
+        sidecar = None
+        if sidecarCache:
+            from Adv2 import AdvSidecar
+            self._sidecarKey = AdvSidecar.sidecarKey(filename)
+            sidecar = AdvSidecar.loadSidecar(filename, self._sidecarKey)
+        if sidecar is not None and not sidecar['fileInfo'] == fileInfo:
+            sidecar = None
+
+        if sidecar is not None:
+            statusTags = [(tagId, Adv2TagType(tagType), tagName) for tagId, tagType, tagName in sidecar['statusTags']]
+            self._metaData = sidecar['metaData']
+            self._indexArrays = sidecar['indexArrays']
+            for array in self._indexArrays:
+                array.setflags(write=False)
+            for streamName, (midExposure, exposure) in sidecar['timestamps'].items():
+                self._setTimestamps(StreamId[streamName], midExposure, exposure)
+        else:
+            statusTags = [(tagId,) + tuple(self._lib.AdvVer2_GetStatusTagInfo(tagId))
+                          for tagId in range(fileInfo.StatusTagsCount)]
+
+        # (tagId, tagName, getter, dtype) for each named status tag: the dispatch on the tag type is done once, here
+        self._statusTags = statusTags
+        self._statusGetters = []
+        for tagId, tagType, tagName in statusTags:
             if tagName:
                 self.statusTagInfo.append((tagType, tagName))
+                if tagType in STATUS_TAG_GETTERS:
+                    getterName, dtype = STATUS_TAG_GETTERS[tagType]
+                    self._statusGetters.append((tagId, tagName, getattr(self._lib, getterName), dtype))
+
+        if sidecarCache and sidecar is None:
+            self.getAdvFileMetaData()
+            self.getIndexArrays()
+            self._saveSidecar()
+
+    def _releaseFailedOpen(self):
+        # Closes whatever _openFile() had opened, shuts the worker process down and frees the native library, so
+        # that a failed open leaves nothing claimed even while the exception (and so this reader) is kept alive
+        global _nativeOwner
+        headerLib = getattr(self, '_headerLib', None)
+        if headerLib:
+            headerLib.AdvCloseFile()
+        try:
+            self._lib.AdvCloseFile()
+        except Exception:
+            pass  # The file may not have been opened
+        if self.backend == 'process':
+            self._lib.shutdown()
+        if _nativeOwner is not None and _nativeOwner() is self:
+            _nativeOwner = None
 
-    def getMainImageAndStatusData(self, frameNumber: int) -> Tuple[str, np.ndarray, AdvFrameInfo, Dict[str, any]]:
-        return self._getGenericImageAndStatusData(frameNumber=frameNumber, streamType=StreamId.Main)
+    def _saveSidecar(self):
+        if self._sidecarKey is None:
+            return
+        from Adv2 import AdvSidecar
+        statusTags = [(tagId, tagType.value, tagName) for tagId, tagType, tagName in self._statusTags]
+        timestamps = {stream.name: (midExposure, exposure)
+                      for stream, (_, midExposure, exposure, _) in self._timestamps.items()}
+        AdvSidecar.saveSidecar(self._filename, self._sidecarKey, self.FileInfo, statusTags, self.getAdvFileMetaData(),
+                               self.getIndexArrays(), timestamps)
 
-    def getCalibImageAndStatusData(self, frameNumber: int) -> Tuple[str, np.ndarray, AdvFrameInfo, Dict[str, any]]:
-        return self._getGenericImageAndStatusData(frameNumber=frameNumber, streamType=StreamId.Calibration)
+    def getMainImageAndStatusData(self, frameNumber: int, out: Optional[np.ndarray] = None,
+                                  roi: Optional[Tuple[int, int, int, int]] = None) -> \
+            Tuple[str, np.ndarray, AdvFrameInfo, Dict[str, any]]:
+        # Returns the error message ('' if none), the image, the frame info and the status tags of a frame.
+        # Without out the image is a new array, except that the mmap backend returns a read-only view into the
+        # file when the stored pixels are already of outputDtype (raw images with no scaling), and that a frame
+        # cache hit is read-only. Pass out= (or copy the image) to get a writable image with every backend.
+        return self._getGenericImageAndStatusData(frameNumber=frameNumber, streamType=StreamId.Main, out=out, roi=roi)
 
-    def _getGenericImageAndStatusData(self, frameNumber: int, streamType: StreamId) -> \
+    def getCalibImageAndStatusData(self, frameNumber: int, out: Optional[np.ndarray] = None,
+                                   roi: Optional[Tuple[int, int, int, int]] = None) -> \
             Tuple[str, np.ndarray, AdvFrameInfo, Dict[str, any]]:
-        err_msg = ''
-        # Create an array of c_uint to hold the pixel values
-        pixel_array = (c_uint * (self.Width * self.Height))()
+        return self._getGenericImageAndStatusData(frameNumber=frameNumber, streamType=StreamId.Calibration, out=out,
+                                                  roi=roi)
 
-        ret_val = AdvLib.AdvVer2_GetFramePixels(
-            streamId=streamType, frameNo=frameNumber,
-            pixels=pixel_array, frameInfo=self.frameInfo, systemErrorLen=self.sysErrLength
-        )
+    def getImageAndStatusData(self, frameNumber: int, stream: StreamId = StreamId.Main,
+                              out: Optional[np.ndarray] = None, roi: Optional[Tuple[int, int, int, int]] = None) -> \
+            Tuple[str, np.ndarray, AdvFrameInfo, Dict[str, any]]:
+        # getMainImageAndStatusData() or getCalibImageAndStatusData(), for the given stream
+        return self._getGenericImageAndStatusData(frameNumber=frameNumber, streamType=stream, out=out, roi=roi)
 
-        # Convert pixel_array to 1D numpy array, then reshape into 2D numpy array
-        self.pixels = np.reshape(np.array(pixel_array, dtype='uint16'), newshape=(self.Height, self.Width))
+    def getMainFrameInfoAndStatus(self, frameNumber: int) -> Tuple[str, AdvFrameInfo, Dict[str, any]]:
+        return self._getGenericFrameInfoAndStatus(frameNumber, StreamId.Main)
 
-        if ret_val is not S_OK:
-            err_msg = ResolveErrorMessage(ret_val)
-            return err_msg, self.pixels, self.frameInfo, {}
+    def getCalibFrameInfoAndStatus(self, frameNumber: int) -> Tuple[str, AdvFrameInfo, Dict[str, any]]:
+        return self._getGenericFrameInfoAndStatus(frameNumber, StreamId.Calibration)
 
-        # This code block adds date and start-of-exposure timestamp strings to self.frameInfo
+    def _getGenericFrameInfoAndStatus(self, frameNumber: int, streamType: StreamId) -> \
+            Tuple[str, AdvFrameInfo, Dict[str, any]]:
+        # The frame info and status of a frame, the same as getMainImageAndStatusData() returns, but without
+        # decoding (or decompressing) the image: only the frame header and status section are read.
+        # If the mmap parser cannot read the file the frame is decoded as usual.
+        with self._lock:
+            headerLib = self._headerReader()
+            if headerLib is None:
+                err_msg, _, frameInfo, status = self._readImageAndStatusData(frameNumber, streamType)
+                return err_msg, frameInfo, status
 
-        datetime64 = self.frameInfo.UtcMidExposureTimestampLo + (self.frameInfo.UtcMidExposureTimestampHi << 32)
-        # Adjust from mid exposure to start-exposure
-        datetime64 -= self.frameInfo.Exposure // 2
+            ret_val, _ = headerLib.AdvVer2_GetFrameStatus(streamType, frameNumber, self.frameInfo)
+            if ret_val != S_OK:
+                return ResolveErrorMessage(ret_val), self.frameInfo, {}
+            getters = self._statusGetters if headerLib is self._lib else self._headerStatusGetters
+            status_dict = {}
+            for tagId, tagName, getter, _ in getters:
+                val = getter(tagId)
+                if tagName == 'SystemTime':
+                    val = formatSystemTime(val)
+                status_dict[tagName] = val
+            return '', self.frameInfo, status_dict
 
-        usecs = datetime64 // 1000  # Convert nanoseconds to microseconds - needed for call to timedelta
-        ts = datetime(2010, 1, 1) + timedelta(microseconds=usecs)
+    def _headerReader(self) -> Optional[AdvMmapLib.AdvMmapFile]:
+        # The mmap parser can read the frame headers and status sections without touching the images. With the
+        # mmap backend that is self._lib; with the others a second (mmap) view of the file is opened the first
+        # time it is needed. Returns None if the mmap parser cannot read the file.
+        if self.backend == 'mmap':
+            return self._lib
+        if self._headerLib is None:
+            headerLib = AdvMmapLib.AdvMmapFile()
+            if headerLib.AdvOpenFile(self._filename, AdvFileInfo()) == 2:
+                self._headerLib = headerLib
+                self._headerStatusGetters = [
+                    (tagId, tagName, getattr(headerLib, STATUS_TAG_GETTERS[tagType][0]), STATUS_TAG_GETTERS[tagType][1])
+                    for tagId, tagType, tagName in self._statusTags if tagName and tagType in STATUS_TAG_GETTERS]
+            else:
+                headerLib.AdvCloseFile()
+                self._headerLib = False
+        return self._headerLib or None
 
-        # There 'should' always be a valid timestamp in an adv2 file, but if there is not, then there will be
-        # zeros in UtcMidExposureTimestampLo and Hi.  We return empty strings in this case.
-        if timedelta == 0:
-            self.frameInfo.DateString = ''
-            self.frameInfo.StartOfExposureTimestampString = ''
+    def checkRoi(self, roi: Optional[Tuple[int, int, int, int]]) -> Optional[Tuple[int, int, int, int]]:
+        # A region of interest is (y0, y1, x0, x1): the window [y0:y1, x0:x1] of the image. Returns roi as a tuple
+        # of ints (or None if roi is None) and raises an AdvLibException if it is not inside the image.
+        if roi is None:
+            return None
+        y0, y1, x0, x1 = [int(value) for value in roi]
+        if not (0 <= y0 < y1 <= self.Height and 0 <= x0 < x1 <= self.Width):
+            raise AdvLibException(f'roi must be (y0, y1, x0, x1) with 0 <= y0 < y1 <= {self.Height} and '
+                                  f'0 <= x0 < x1 <= {self.Width} but was {roi}')
+        return y0, y1, x0, x1
+
+    def imageShape(self, roi: Optional[Tuple[int, int, int, int]] = None) -> Tuple[int, int]:
+        # The (rows, columns) of the images read with the given (checked, see checkRoi()) roi
+        if roi is None:
+            return self.Height, self.Width
+        y0, y1, x0, x1 = roi
+        return y1 - y0, x1 - x0
+
+    def _checkOutArray(self, out: np.ndarray, roi: Optional[Tuple[int, int, int, int]] = None):
+        shape = self.imageShape(roi)
+        if out.shape != shape or out.dtype != self.outputDtype:
+            raise AdvLibException(f'out must be a {self.outputDtype} array of shape {shape} '
+                                  f'but has dtype {out.dtype} and shape {out.shape}')
+
+    def _readFramePixels(self, frameNumber: int, streamType: StreamId,
+                         roi: Optional[Tuple[int, int, int, int]] = None,
+                         convert: bool = False) -> Tuple[int, np.ndarray]:
+        # Decodes a frame into self.frameInfo and returns the error code and a (Height, Width) array of the pixels
+        # (or the window given by roi). For the native backend that array is (a view of) self._pixelBuffer
+        # (uint32). The mmap backend returns the image straight from the file mapping (a read-only view for raw
+        # images, of which only the rows of roi are read) and the process backend returns the shared memory
+        # buffer that its worker decoded the frame into.
+        # With convert the pixels are returned as self.outputDtype (scaled if scaleTo16Bit was given), in a new
+        # array unless a raw mmap view is already in that form. The mmap backend converts 12 bit packed images as
+        # it unpacks them.
+        if self.backend in ('mmap', 'process'):
+            if convert and self.backend == 'mmap':
+                ret_val, pixels = self._lib.AdvVer2_GetFramePixelsView(streamType, frameNumber, self.frameInfo, roi,
+                                                                       self.outputDtype, self._pixelShift)
+                if pixels is not None:
+                    return ret_val, pixels
+            else:
+                ret_val, pixels = self._lib.AdvVer2_GetFramePixelsView(streamType, frameNumber, self.frameInfo, roi)
+            if pixels is None:
+                self._pixelBuffer.fill(0)
+                pixels = self._pixelBuffer
         else:
-            self.frameInfo.DateString = f'{ts.year:04d}-{ts.month:02d}-{ts.day:02d}'
-            # This string below is in the form needed for direct insertion into a csv file column (Excel safe format)
-            self.frameInfo.StartOfExposureTimestampString = \
-                f'[{ts.hour:02d}:{ts.minute:02d}:{ts.second:02d}.{ts.microsecond:06d}]'
+            ret_val = self._lib.AdvVer2_GetFramePixels(
+                streamId=streamType, frameNo=frameNumber,
+                pixels=self._pixelPointer, frameInfo=self.frameInfo, systemErrorLen=self.sysErrLength
+            )
+            pixels = self._pixelBuffer
 
-        # end code block
+        if roi is not None and pixels.shape != self.imageShape(roi):
+            y0, y1, x0, x1 = roi
+            pixels = pixels[y0:y1, x0:x1]
+        if convert:
+            pixels = convertPixels(pixels, self.outputDtype, self._pixelShift)
+        return ret_val, pixels
 
-        status_dict = {}
-        for i in range(len(self.statusTagInfo)):
-            tagType, tagName = self.statusTagInfo[i]
-            if tagType == Adv2TagType.Int8:
-                val = AdvLib.AdvVer2_GetStatusTagUInt8(i)
-                status_dict.update({tagName: val})
-            if tagType == Adv2TagType.Int16:
-                val = AdvLib.AdvVer2_GetStatusTagInt16(i)
-                status_dict.update({tagName: val})
-            if tagType == Adv2TagType.Int32:
-                val = AdvLib.AdvVer2_GetStatusTagInt32(i)
-                status_dict.update({tagName: val})
-            if tagType == Adv2TagType.Int64:
-                val = AdvLib.AdvVer2_GetStatusTagInt64(i)
-                if tagName == 'SystemTime':
-                    usecs = val // 1000  # Convert nanoseconds to microseconds - for timedelta
-                    ts = datetime(2010, 1, 1) + timedelta(microseconds=usecs)
-                    val_str = (f'{ts.year:04d}-{ts.month:02d}-{ts.day:02d} '
-                               f'[{ts.hour:02d}:{ts.minute:02d}:{ts.second:02d}.{ts.microsecond:06d}]')
-                    status_dict.update({tagName: val_str})
+    def getMainImageStack(self, start: int = 0, stop: Optional[int] = None, step: int = 1,
+                          frames: Union[slice, Sequence[int], None] = None, out: Optional[np.ndarray] = None,
+                          roi: Optional[Tuple[int, int, int, int]] = None) -> \
+            Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self.getImageStack(StreamId.Main, start, stop, step, frames, out, roi)
+
+    def getCalibImageStack(self, start: int = 0, stop: Optional[int] = None, step: int = 1,
+                           frames: Union[slice, Sequence[int], None] = None, out: Optional[np.ndarray] = None,
+                           roi: Optional[Tuple[int, int, int, int]] = None) -> \
+            Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self.getImageStack(StreamId.Calibration, start, stop, step, frames, out, roi)
+
+    def frameNumbers(self, stream: StreamId = StreamId.Main, start: int = 0, stop: Optional[int] = None,
+                     step: int = 1, frames: Union[slice, Sequence[int], None] = None) -> np.ndarray:
+        # Resolves either range(start, stop, step) or frames (a slice or a list of frame numbers)
+        # into an int64 array of frame numbers that are valid for the given stream. This is how every method
+        # that takes start, stop, step and frames selects its frames.
+        if stream == StreamId.Main:
+            frameCount = self.CountMainFrames
+        else:
+            frameCount = self.CountCalibrationFrames
+
+        if frames is None:
+            frameNumbers = np.arange(*slice(start, stop, step).indices(frameCount), dtype=np.int64)
+        elif isinstance(frames, slice):
+            frameNumbers = np.arange(*frames.indices(frameCount), dtype=np.int64)
+        else:
+            frameNumbers = np.asarray(frames, dtype=np.int64).reshape(-1)
+
+        if frameNumbers.size and (frameNumbers.min() < 0 or frameNumbers.max() >= frameCount):
+            raise AdvLibException(f'Frame numbers must be in the range 0 to {frameCount - 1} '
+                                  f'for the {stream.name} stream')
+        return frameNumbers
+
+    def getImageStack(self, stream: StreamId = StreamId.Main, start: int = 0, stop: Optional[int] = None,
+                      step: int = 1, frames: Union[slice, Sequence[int], None] = None,
+                      out: Optional[np.ndarray] = None, roi: Optional[Tuple[int, int, int, int]] = None) -> \
+            Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # getMainImageStack() or getCalibImageStack(), for the given stream.
+        # Reads the requested frames into a single (n, Height, Width) array of self.outputDtype (or
+        # (n, y1 - y0, x1 - x0) if roi=(y0, y1, x0, x1) is given). Frame info is returned as a structured array
+        # (FRAME_INFO_DTYPE) and the start-of-exposure timestamps as int64 nanoseconds since 2010-01-01. Status
+        # tags are not extracted.
+        frameNumbers = self.frameNumbers(stream, start, stop, step, frames)
+        numFrames = frameNumbers.size
+        roi = self.checkRoi(roi)
+        shape = (numFrames,) + self.imageShape(roi)
+
+        if out is None:
+            out = np.empty(shape, dtype=self.outputDtype)
+        elif out.shape != shape or out.dtype != self.outputDtype:
+            raise AdvLibException(f'out must be a {self.outputDtype} array of shape {shape} '
+                                  f'but has dtype {out.dtype} and shape {out.shape}')
+
+        instrumentation = self.instrumentation
+        startTime = clock() if instrumentation is not None else 0.0
+        frameInfos = np.zeros(numFrames, dtype=FRAME_INFO_DTYPE)
+        fieldNames = FRAME_INFO_DTYPE.names
+
+        with self._lock:
+            for i, frameNumber in enumerate(frameNumbers.tolist()):
+                ret_val, pixels = self._readFramePixels(frameNumber, stream, roi)
+                if ret_val != S_OK:
+                    raise AdvLibException(f'{stream.name} frame {frameNumber}: {ResolveErrorMessage(ret_val)}')
+                convertPixels(pixels, self.outputDtype, self._pixelShift, out[i])
+                frameInfos[i] = tuple([getattr(self.frameInfo, name) for name in fieldNames])
+
+        if instrumentation is not None:
+            instrumentation.record('stackRead', clock() - startTime, out.nbytes)
+        return out, frameInfos, startOfExposureNanoseconds(frameInfos)
+
+    def getTimestamps(self, stream: StreamId = StreamId.Main) -> \
+            Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # Returns, for every frame of the stream, the start-of-exposure and mid-exposure timestamps (int64
+        # nanoseconds since 2010-01-01), the exposure durations (int64 nanoseconds) and the start-of-exposure
+        # timestamps as a datetime64[ns] array. No strings or datetime objects are built.
+        # Only the frame headers are read (with every backend, see _headerReader()), unless the mmap parser cannot
+        # read the file, in which case every frame is decoded. The arrays are computed once per stream and are
+        # read-only.
+        instrumentation = self.instrumentation
+        startTime = clock() if instrumentation is not None else 0.0
+        if stream not in self._timestamps:
+            headerLib = self._headerReader()
+            if headerLib is not None:
+                ret_val, midExposure, exposure = headerLib.AdvVer2_GetTimestamps(stream)
+                if ret_val != S_OK:
+                    raise AdvLibException(f'{ResolveErrorMessage(ret_val)}')
+            else:
+                frameNumbers = self.frameNumbers(stream)
+                midExposure = np.zeros(frameNumbers.size, dtype=np.int64)
+                exposure = np.zeros(frameNumbers.size, dtype=np.int64)
+                with self._lock:
+                    for frameNumber in frameNumbers.tolist():
+                        ret_val, _ = self._readFramePixels(frameNumber, stream)
+                        if ret_val != S_OK:
+                            raise AdvLibException(f'{stream.name} frame {frameNumber}: '
+                                                  f'{ResolveErrorMessage(ret_val)}')
+                        midExposure[frameNumber] = (self.frameInfo.UtcMidExposureTimestampLo +
+                                                    (self.frameInfo.UtcMidExposureTimestampHi << 32))
+                        exposure[frameNumber] = self.frameInfo.Exposure
+
+            self._setTimestamps(stream, midExposure, exposure)
+            self._saveSidecar()
+
+        if instrumentation is not None:
+            instrumentation.record('timestamps', clock() - startTime)
+        return self._timestamps[stream]
+
+    def _setTimestamps(self, stream: StreamId, midExposure: np.ndarray, exposure: np.ndarray):
+        midExposure = midExposure.astype(np.int64)
+        exposure = exposure.astype(np.int64)
+        startOfExposure = midExposure - exposure // 2
+        startOfExposureDatetime64 = (startOfExposure + ADV_EPOCH_NANOSECONDS).view('datetime64[ns]')
+        for array in (startOfExposure, midExposure, exposure):
+            array.setflags(write=False)
+        self._timestamps[stream] = (startOfExposure, midExposure, exposure, startOfExposureDatetime64)
+
+    def framesInTimeRange(self, t0: Union[int, str, datetime, np.datetime64, None],
+                          t1: Union[int, str, datetime, np.datetime64, None] = None,
+                          stream: StreamId = StreamId.Main) -> slice:
+        # Returns slice(first, stop) of the frames whose start-of-exposure timestamp is at or after t0 and before
+        # t1 (None for either end leaves that end open). The slice can be passed straight to the frames argument
+        # of getMainImageStack(), getCalibImageStack() and iterFrames().
+        # t0 and t1 can be int nanoseconds since 2010-01-01, datetime (naive UTC, or timezone aware),
+        # numpy.datetime64, or a string: '2024-01-01T01:03:10.2', or a time of day such as '01:03:10.2' or
+        # '[01:03:10.200000]', which is taken on the date of the first frame (or the next day, if that
+        # is earlier than the first frame, for recordings that cross midnight).
+        # The timestamps must increase with the frame number. A binary search is used: with the mmap backend
+        # over the timestamps of all frames (see getTimestamps()), and otherwise over frames that are decoded
+        # only when the search visits them (starting from an estimate made from the index ElapsedTicks and the
+        # stream clock frequency), so only O(log n) frames are decoded.
+        frameCount = self.frameNumbers(stream).size
+        first = 0 if t0 is None else self._firstFrameAtOrAfter(stream, self._advNanoseconds(t0, stream), frameCount)
+        stop = frameCount if t1 is None else self._firstFrameAtOrAfter(stream, self._advNanoseconds(t1, stream),
+                                                                       frameCount)
+        return slice(first, max(first, stop))
+
+    def _advNanoseconds(self, t: Union[int, str, datetime, np.datetime64], stream: StreamId) -> int:
+        # Converts a time given in any of the forms accepted by framesInTimeRange() to nanoseconds since 2010-01-01
+        if isinstance(t, (int, np.integer)):
+            return int(t)
+        if isinstance(t, datetime):
+            if t.tzinfo is not None:
+                t = t.astimezone(timezone.utc).replace(tzinfo=None)
+            t = np.datetime64(t, 'us')
+        if isinstance(t, str):
+            text = t.strip().strip('[]').strip()
+            if ':' in text and '-' not in text:
+                if self.frameNumbers(stream).size == 0:
+                    return 0
+                firstStart = self.startOfExposure(0, stream)
+                day = np.datetime64(firstStart + ADV_EPOCH_NANOSECONDS, 'ns').astype('datetime64[D]')
+                t = np.datetime64(f'{day}T{text}', 'ns')
+                if int(t.astype(np.int64)) - ADV_EPOCH_NANOSECONDS < firstStart:
+                    t = t + np.timedelta64(1, 'D')
+            else:
+                t = np.datetime64(text.replace(' ', 'T'), 'ns')
+        if isinstance(t, np.datetime64):
+            return int(t.astype('datetime64[ns]').astype(np.int64)) - ADV_EPOCH_NANOSECONDS
+        raise AdvLibException(f'Cannot use {t!r} as a time')
+
+    def startOfExposure(self, frameNumber: int, stream: StreamId = StreamId.Main) -> int:
+        # The start-of-exposure timestamp (nanoseconds since 2010-01-01) of one frame: from the timestamp arrays
+        # if they have been computed, otherwise read (once) and kept in self._lazyStartOfExposure
+        if stream in self._timestamps:
+            return int(self._timestamps[stream][0][frameNumber])
+        starts = self._lazyStartOfExposure.get(stream)
+        if starts is None:
+            starts = np.full(self.frameNumbers(stream).size, MISSING_TIMESTAMP, dtype=np.int64)
+            self._lazyStartOfExposure[stream] = starts
+        if starts[frameNumber] == MISSING_TIMESTAMP:
+            with self._lock:
+                headerLib = self._headerReader()
+                if headerLib is not None:
+                    ret_val, _ = headerLib.AdvVer2_GetFrameStatus(stream, frameNumber, self.frameInfo)
+                else:
+                    ret_val, _ = self._readFramePixels(frameNumber, stream)
+                if ret_val != S_OK:
+                    raise AdvLibException(f'{stream.name} frame {frameNumber}: {ResolveErrorMessage(ret_val)}')
+                midExposure = (self.frameInfo.UtcMidExposureTimestampLo +
+                               (self.frameInfo.UtcMidExposureTimestampHi << 32))
+                starts[frameNumber] = midExposure - self.frameInfo.Exposure // 2
+        return int(starts[frameNumber])
+
+    def _firstFrameAtOrAfter(self, stream: StreamId, t: int, frameCount: int) -> int:
+        # The first frame whose start-of-exposure timestamp is >= t (frameCount if there is none)
+        if frameCount == 0:
+            return 0
+        if stream in self._timestamps or self._headerReader() is not None:
+            return int(np.searchsorted(self.getTimestamps(stream)[0], t, side='left'))
+
+        # Estimate the frame from the elapsed ticks of the index (relative to the first frame) ...
+        if t <= self.startOfExposure(0, stream):
+            return 0
+        ticks = self.getIndexArrays()[0 if stream == StreamId.Main else 1]['ElapsedTicks']
+        if stream == StreamId.Main:
+            clockFrequency = self.FileInfo.MainClockFrequency
+        else:
+            clockFrequency = self.FileInfo.CalibrationClockFrequency
+        if clockFrequency > 0:
+            targetTicks = ticks[0] + (t - self.startOfExposure(0, stream)) * clockFrequency / 1e9
+            guess = int(min(max(np.searchsorted(ticks, targetTicks, side='left'), 1), frameCount - 1))
+        else:
+            guess = frameCount // 2
+
+        # ... then gallop from the estimate until t is bracketed: start(low) < t and (high == frameCount or
+        # start(high) >= t), and finish with a binary search
+        step = 1
+        if self.startOfExposure(guess, stream) < t:
+            low, high = guess, frameCount
+            probe = guess + step
+            while probe < frameCount:
+                if self.startOfExposure(probe, stream) >= t:
+                    high = probe
+                    break
+                low = probe
+                step *= 2
+                probe = guess + step
+        else:
+            low, high = 0, guess
+            probe = guess - step
+            while probe > 0:
+                if self.startOfExposure(probe, stream) < t:
+                    low = probe
+                    break
+                high = probe
+                step *= 2
+                probe = guess - step
+        while high - low > 1:
+            middle = (low + high) // 2
+            if self.startOfExposure(middle, stream) < t:
+                low = middle
+            else:
+                high = middle
+        return high
+
+    def getStatusTable(self, stream: StreamId = StreamId.Main, start: int = 0, stop: Optional[int] = None,
+                       step: int = 1, frames: Union[slice, Sequence[int], None] = None) -> \
+            Tuple[np.ndarray, Dict[str, 'np.ma.MaskedArray']]:
+        # Returns the frame numbers read and, for each status tag, a masked array holding the tag's value in each
+        # of those frames (uint8, int16, int32, int64, float32 or object (str) according to the tag type). The
+        # mask is True in the frames where the tag is missing. SystemTime is left as int64 nanoseconds.
+        # Only the frame headers and status sections are read (see _headerReader()). If the mmap parser cannot
+        # read the file every frame is decoded by the native library, which reports a missing tag as -1 or '', so
+        # then a tag whose actual value is -1 is masked.
+        instrumentation = self.instrumentation
+        startTime = clock() if instrumentation is not None else 0.0
+        frameNumbers = self.frameNumbers(stream, start, stop, step, frames)
+        numFrames = frameNumbers.size
+        columns = [[] for _ in self._statusGetters]
+        missing = np.zeros((len(self._statusGetters), numFrames), dtype=bool)
+
+        with self._lock:
+            headerLib = self._headerReader()
+            for k, frameNumber in enumerate(frameNumbers.tolist()):
+                if headerLib is not None:
+                    ret_val, statusValues = headerLib.AdvVer2_GetFrameStatus(stream, frameNumber, self.frameInfo)
                 else:
-                    status_dict.update({tagName: val})
-            if tagType == Adv2TagType.Real:
-                val = AdvLib.AdvVer2_GetStatusTagReal(i)
-                status_dict.update({tagName: val})
-            if tagType == Adv2TagType.UTF8String:
-                val = AdvLib.AdvVer2_GetStatusTagUTF8String(i)
-                status_dict.update({tagName: val})
+                    ret_val, _ = self._readFramePixels(frameNumber, stream)
+                    statusValues = None
+                if ret_val != S_OK:
+                    raise AdvLibException(f'{stream.name} frame {frameNumber}: {ResolveErrorMessage(ret_val)}')
+
+                for j, (tagId, _, getter, dtype) in enumerate(self._statusGetters):
+                    if statusValues is not None:
+                        val = statusValues.get(tagId)
+                        isMissing = val is None
+                    else:
+                        val = getter(tagId)
+                        isMissing = val == ('' if dtype is object else -1)
+                    if isMissing:
+                        missing[j, k] = True
+                        val = '' if dtype is object else 0
+                    columns[j].append(val)
+
+        table = {}
+        for j, (_, tagName, _, dtype) in enumerate(self._statusGetters):
+            if dtype is object:
+                data = np.empty(numFrames, dtype=object)
+                data[:] = columns[j]
+            elif dtype is np.float32:
+                data = np.array(columns[j], dtype=np.float32)
+            else:
+                # Through int64 so that signed bytes returned by the native library wrap to uint8
+                data = np.array(columns[j], dtype=np.int64).astype(dtype)
+            table[tagName] = np.ma.MaskedArray(data, mask=missing[j])
+
+        if instrumentation is not None:
+            instrumentation.record('statusTable', clock() - startTime)
+        return frameNumbers, table
+
+    def iterFrames(self, stream: StreamId = StreamId.Main, start: int = 0, stop: Optional[int] = None,
+                   prefetch: int = 4, frames: Union[slice, Sequence[int], None] = None,
+                   roi: Optional[Tuple[int, int, int, int]] = None) -> \
+            Iterator[Tuple[int, np.ndarray, AdvFrameInfo, Dict[str, any]]]:
+        # A generator that yields (frameNo, pixels, frameInfo, status) for each frame in range(start, stop) or
+        # in frames. A background thread decodes up to prefetch frames ahead of the consumer into a ring of
+        # reusable buffers (of self.outputDtype). Because the buffers are reused, the pixels yielded for a frame
+        # are only valid until the next frame is requested --- copy them if they are needed for longer.
+        # frameInfo and status belong to the yielded frame and are not reused.
+        # An AdvLibException is raised if a frame cannot be read.
+        # With roi=(y0, y1, x0, x1) only that window of each frame is read and the buffers are of its size.
+        frameNumbers = self.frameNumbers(stream, start, stop, 1, frames).tolist()
+        roi = self.checkRoi(roi)
+        shape = self.imageShape(roi)
+
+        if prefetch < 1:
+            out = np.empty(shape, dtype=self.outputDtype)
+            for frameNumber in frameNumbers:
+                err, pixels, frameInfo, status = self._getGenericImageAndStatusData(frameNumber, stream, out, roi)
+                if err:
+                    raise AdvLibException(f'{stream.name} frame {frameNumber}: {err}')
+                yield frameNumber, pixels, copy.copy(frameInfo), status
+            return
+
+        # prefetch buffers waiting to be consumed, one being decoded and one held by the consumer
+        freeBuffers = queue.Queue()
+        for _ in range(prefetch + 2):
+            freeBuffers.put(np.empty(shape, dtype=self.outputDtype))
+        readyFrames = queue.Queue(maxsize=prefetch)
+        stopping = threading.Event()
+
+        def putUnlessStopping(item) -> bool:
+            while not stopping.is_set():
+                try:
+                    readyFrames.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def decodeFrames():
+            try:
+                for frameNumber in frameNumbers:
+                    buffer = None
+                    while buffer is None and not stopping.is_set():
+                        try:
+                            buffer = freeBuffers.get(timeout=0.1)
+                        except queue.Empty:
+                            pass
+                    if buffer is None:
+                        return
+                    err, pixels, frameInfo, status = self._getGenericImageAndStatusData(frameNumber, stream, buffer,
+                                                                                        roi)
+                    if err:
+                        putUnlessStopping(AdvLibException(f'{stream.name} frame {frameNumber}: {err}'))
+                        return
+                    if not putUnlessStopping((frameNumber, pixels, copy.copy(frameInfo), status)):
+                        return
+                putUnlessStopping(None)  # Signals the end of the frames
+            except Exception as exc:
+                putUnlessStopping(exc)
+
+        decoder = threading.Thread(target=decodeFrames, name='Adv2reader.iterFrames', daemon=True)
+        decoder.start()
+        heldBuffer = None
+        try:
+            while True:
+                item = readyFrames.get()
+                if heldBuffer is not None:
+                    freeBuffers.put(heldBuffer)
+                    heldBuffer = None
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                heldBuffer = item[1]
+                yield item
+        finally:
+            stopping.set()
+            decoder.join()
+
+    def enableFrameCache(self, maxBytes: int = 256 * 1024 * 1024):
+        # Keeps recently read frames (pixels, frame info and status) in a least-recently-used cache that holds at
+        # most maxBytes of pixel data. getMainImageAndStatusData() and getCalibImageAndStatusData() then return
+        # revisited frames without decoding them again. Cached images are returned read-only (pass out= to get a
+        # writable copy). Hit, miss and eviction counts are available from self.frameCache.stats()
+        with self._lock:
+            self.frameCache = AdvFrameCache(maxBytes)
+
+    def disableFrameCache(self):
+        with self._lock:
+            self.frameCache = None
+
+    def enableInstrumentation(self, tracer: Optional[Tracer] = None) -> AdvInstrumentation:
+        # Starts recording the number of calls, the time taken and the bytes produced by each phase of reading
+        # (frame decode, pixel conversion, status tags, timestamp formatting, cache lookups, stack reads, ...) and
+        # returns the AdvInstrumentation holding the counts (also available as self.instrumentation; see its
+        # stats() and reset()). tracer, if given, is called as tracer(phase, seconds, bytes) after each phase.
+        with self._lock:
+            self.instrumentation = AdvInstrumentation(tracer)
+            return self.instrumentation
+
+    def disableInstrumentation(self):
+        with self._lock:
+            self.instrumentation = None
+
+    def _getGenericImageAndStatusData(self, frameNumber: int, streamType: StreamId,
+                                      out: Optional[np.ndarray] = None,
+                                      roi: Optional[Tuple[int, int, int, int]] = None) -> \
+            Tuple[str, np.ndarray, AdvFrameInfo, Dict[str, any]]:
+        roi = self.checkRoi(roi)
+        with self._lock:
+            if self.frameCache is None:
+                return self._readImageAndStatusData(frameNumber, streamType, out, roi)
+            return self._getCachedImageAndStatusData(frameNumber, streamType, out, roi)
+
+    def _getCachedImageAndStatusData(self, frameNumber: int, streamType: StreamId,
+                                     out: Optional[np.ndarray] = None,
+                                     roi: Optional[Tuple[int, int, int, int]] = None) -> \
+            Tuple[str, np.ndarray, AdvFrameInfo, Dict[str, any]]:
+        # The cache holds private copies of the pixels, frame info and status, so later reads (which overwrite
+        # self.pixels and self.frameInfo) cannot change what is cached. A hit copies the cached frame info into
+        # self.frameInfo so that the values returned are the same objects as for an uncached read.
+        # Windows of a frame (roi) are cached separately from the whole frame.
+        key = (streamType, frameNumber, roi)
+        instrumentation = self.instrumentation
+        if instrumentation is None:
+            entry = self.frameCache.get(key)
+        else:
+            startTime = clock()
+            entry = self.frameCache.get(key)
+            instrumentation.recordCacheLookup(clock() - startTime, entry is not None)
+        if entry is None:
+            err_msg, pixels, frameInfo, status = self._readImageAndStatusData(frameNumber, streamType, out, roi)
+            if not err_msg:
+                cachedPixels = np.array(pixels, dtype=self.outputDtype)
+                cachedPixels.setflags(write=False)
+                self.frameCache.put(key, cachedPixels, copy.copy(frameInfo), dict(status))
+            return err_msg, pixels, frameInfo, status
+
+        cachedPixels, cachedFrameInfo, cachedStatus = entry
+        if out is None:
+            self.pixels = cachedPixels
+        else:
+            self._checkOutArray(out, roi)
+            np.copyto(out, cachedPixels)
+            self.pixels = out
+        vars(self.frameInfo).update(vars(cachedFrameInfo))
+        return '', self.pixels, self.frameInfo, dict(cachedStatus)
+
+    def _readImageAndStatusData(self, frameNumber: int, streamType: StreamId,
+                                out: Optional[np.ndarray] = None,
+                                roi: Optional[Tuple[int, int, int, int]] = None) -> \
+            Tuple[str, np.ndarray, AdvFrameInfo, Dict[str, any]]:
+        # If the caller supplies out (an array of self.outputDtype of shape (Height, Width), or of the shape of roi)
+        # the pixels are written into it and no memory is allocated for the image. Otherwise a new array is returned
+        # for each frame.
+        err_msg = ''
+        if out is not None:
+            self._checkOutArray(out, roi)
+
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            startTime = clock()
+
+        # The mmap backend converts the pixels to self.outputDtype while it decodes them (and passes raw views
+        # that are already in that form through without a copy)
+        fusedConversion = out is None and self.backend == 'mmap'
+        ret_val, pixels = self._readFramePixels(frameNumber, streamType, roi, convert=fusedConversion)
+
+        if instrumentation is not None:
+            decodedTime = clock()
+
+        # Otherwise narrow (and scale) the uint32 values written by the native library in a single vectorized pass
+        if fusedConversion:
+            self.pixels = pixels
+        else:
+            self.pixels = convertPixels(pixels, self.outputDtype, self._pixelShift, out)
+
+        if instrumentation is not None:
+            convertedTime = clock()
+            instrumentation.record('decode', decodedTime - startTime, self.pixels.nbytes)
+            instrumentation.record('convert', convertedTime - decodedTime)
+
+        if ret_val is not S_OK:
+            err_msg = ResolveErrorMessage(ret_val)
+            return err_msg, self.pixels, self.frameInfo, {}
+
+        # The date and start-of-exposure timestamp strings of self.frameInfo are computed only when they are used
+
+        status_dict = {}
+        formatTime = 0.0
+        for tagId, tagName, getter, _ in self._statusGetters:
+            val = getter(tagId)
+            if tagName == 'SystemTime':
+                if instrumentation is not None:
+                    formatStart = clock()
+                val = formatSystemTime(val)
+                if instrumentation is not None:
+                    formatTime = clock() - formatStart
+            status_dict.update({tagName: val})
+
+        if instrumentation is not None:
+            instrumentation.record('statusTags', clock() - convertedTime - formatTime)
+            if formatTime:
+                instrumentation.record('timestampFormat', formatTime)
 
         return err_msg, self.pixels, self.frameInfo, status_dict
 
     def getAdvFileMetaData(self) -> Dict[str, str]:
+        # The metadata is read from the file once; a copy is returned each time
+        if self._metaData is not None:
+            return dict(self._metaData)
         meta_dict = {}
         if self.FileInfo.SystemMetadataTagsCount > 0:
             for entryNum in range(self.FileInfo.SystemMetadataTagsCount):
-                err_msg, name, value = AdvLib.AdvVer2_GetTagPairValues(TagPairType.SystemMetaData, entryNum)
+                err_msg, name, value = self._lib.AdvVer2_GetTagPairValues(TagPairType.SystemMetaData, entryNum)
                 if not err_msg:
                     meta_dict.update({name: value})
         if self.FileInfo.UserMetadataTagsCount > 0:
             for entryNum in range(self.FileInfo.UserMetadataTagsCount):
-                err_msg, name, value = AdvLib.AdvVer2_GetTagPairValues(TagPairType.UserMetaData, entryNum)
+                err_msg, name, value = self._lib.AdvVer2_GetTagPairValues(TagPairType.UserMetaData, entryNum)
                 if not err_msg:
                     meta_dict.update({name: value})
-        return meta_dict
-
-    def getIndexEntries(self) -> Tuple[List[AdvIndexEntry], List[AdvIndexEntry]]:
-        # Create C compatible buffers that hold the correct number of AdvIndexEntry instances.
-        # Although an AdvIndexEntry is 2 int64 and an int32, we have to allow for 'alignment' on int64
-        # boundaries - that's the reason for the 6 c_int rather than 5 c_int in the buffer construction
-        mainIndex = (c_int * (6 * self.CountMainFrames))()
-        calibIndex = (c_int * (6 * self.CountCalibrationFrames))()
-
-        ret_val = AdvLib.AdvVer2_GetIndexEntries(mainIndex, calibIndex)
-
-        if ret_val is S_OK:
-            mainList = []
-            calibList = []
-
-            base = 0
-            for _ in range(self.CountMainFrames):
-                ticks = mainIndex[base] + (mainIndex[base + 1] << 32)
-                offset = mainIndex[base + 2] + (mainIndex[base + 3] << 32)
-                byte_count = mainIndex[base + 4]
-
-                new_index_entry = AdvIndexEntry()
-                new_index_entry.ElapsedTicks = ticks
-                new_index_entry.FrameOffset = offset
-                new_index_entry.BytesCount = byte_count
-
-                mainList.append(new_index_entry)
-                base += 6
-
-            base = 0
-            for _ in range(self.CountCalibrationFrames):
-                ticks = calibIndex[base] + (calibIndex[base + 1] << 32)
-                offset = calibIndex[base + 2] + (calibIndex[base + 3] << 32)
-                byte_count = calibIndex[base + 4]
-
-                new_index_entry = AdvIndexEntry()
-                new_index_entry.ElapsedTicks = ticks
-                new_index_entry.FrameOffset = offset
-                new_index_entry.BytesCount = byte_count
-
-                calibList.append(new_index_entry)
-                base += 6
-
-            return mainList, calibList
-        else:
-            raise AdvLibException(f'{ResolveErrorMessage(ret_val)}')
+        self._metaData = meta_dict
+        return dict(meta_dict)
 
-    @staticmethod
-    def closeFile():
-        return AdvLib.AdvCloseFile()
+    def getIndexArrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Returns the MAIN and CALIBRATION indexes as (read-only) structured arrays of INDEX_ENTRY_DTYPE.
+        # The library writes the index entries straight into the arrays, so no per-entry Python work is done.
+        if self._indexArrays is None:
+            mainIndex = np.zeros(self.CountMainFrames, dtype=INDEX_ENTRY_DTYPE)
+            calibIndex = np.zeros(self.CountCalibrationFrames, dtype=INDEX_ENTRY_DTYPE)
+
+            ret_val = self._lib.AdvVer2_GetIndexEntries(mainIndex.ctypes.data_as(POINTER(c_int)),
+                                                        calibIndex.ctypes.data_as(POINTER(c_int)))
+            if ret_val is not S_OK:
+                raise AdvLibException(f'{ResolveErrorMessage(ret_val)}')
+
+            mainIndex.setflags(write=False)
+            calibIndex.setflags(write=False)
+            self._indexArrays = (mainIndex, calibIndex)
+
+        return self._indexArrays
+
+    def getIndexEntries(self) -> Tuple[Sequence[AdvIndexEntry], Sequence[AdvIndexEntry]]:
+        # Kept for compatibility: the returned sequences build AdvIndexEntry instances on demand from getIndexArrays()
+        mainIndex, calibIndex = self.getIndexArrays()
+        return AdvIndexEntryList(mainIndex), AdvIndexEntryList(calibIndex)
+
+    def closeFile(self):
+        # With the mmap backend, images returned without out= may be views of the file mapping: a warning is given
+        # if any of them are still referenced, as the mapping then stays open until they are released
+        global _nativeOwner
+        self.pixels = None
+        if _nativeOwner is not None and _nativeOwner() is self:
+            _nativeOwner = None
+        if self.frameCache is not None:
+            self.frameCache.clear()
+        if self._headerLib:
+            self._headerLib.AdvCloseFile()
+        self._headerLib = None
+        return self._lib.AdvCloseFile()
 
 
 def exerciser():
+    import pathlib
     import sys
     import cv2  # Used by exerciser() only
 
@@ -250,7 +1041,8 @@ def exerciser():
     rdr = None
     try:
         file_path = str(file_to_use)
-        rdr = Adv2reader(file_path)
+        # For display purposes, data with less than 16 bits/pixel is scaled to a full 16 bit range as it is read
+        rdr = Adv2reader(file_path, scaleTo16Bit=True)
     except AdvLibException as adverr:
         print(repr(adverr))
         exit()
@@ -282,10 +1074,8 @@ def exerciser():
     #     print(f'index: {i:2d}  FrameOffset: {mainIndexList[i].FrameOffset}')
     #     print(f'index: {i:2d}   BytesCount: {mainIndexList[i].BytesCount}')
 
-    # For display purposes, we need to scale data that BITPIX less than 16 to a full 16 bit scale
-    scale_factor = 1 << (16 - int(meta_data.setdefault('BITPIX', '16')))
-    if scale_factor > 1:
-        print(f'\nThe image data has been scaled (multiplied) by {scale_factor} because bits/pixel is < 16')
+    if rdr.pixelScale > 1:
+        print(f'\nThe image data has been scaled (multiplied) by {rdr.pixelScale} because bits/pixel is < 16')
 
     if rdr.Width < 300:
         zoom_factor = 20
@@ -297,8 +1087,6 @@ def exerciser():
     for frame in range(num_frames_to_view):
         err, image, frameInfo, status = rdr.getMainImageAndStatusData(frameNumber=frame)
 
-        image = image * scale_factor
-
         # If we're running a UnitTestSample with tiny images (too conserve space), we automatically zoom the image
         if rdr.Width < 300:
             zoom_factor = 20
@@ -0,0 +1,184 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# We use type hinting so that it is easy to see the intent as matching the C++/C# code
+
+# AsyncAdv2reader lets asyncio applications (a GUI event loop, a web server) read ADV files without blocking
+# the event loop on disk reads and image decoding. It owns an Adv2reader and a single worker thread: the reader
+# is opened, used and closed only on that thread, one call at a time, so the process-global state of the native
+# library is never touched by two calls at once. At most maxInFlight calls are queued or running on the worker;
+# further requests wait (without blocking the event loop) until one of them finishes.
+#
+# A request that is cancelled while it is still queued is dropped without being run. One that is already being
+# decoded runs to the end (a native call cannot be interrupted) and its result is thrown away.
+#
+#     async with AsyncAdv2reader(file_path) as ardr:
+#         err, image, frameInfo, status = await ardr.getFrame(0)
+#         async for frameNo, image, frameInfo, status in ardr.frames(start=0, stop=100):
+#             ...
+
+import asyncio
+import copy
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from Adv2.Adv import AdvFrameInfo, StreamId
+from Adv2.Adv2File import Adv2reader
+from Adv2.AdvError import AdvLibException
+
+
+class AsyncAdv2reader:
+    def __init__(self, filename: str, backend: str = 'auto', maxInFlight: int = 4, sidecarCache: bool = False,
+                 outputDtype: str = 'uint16', scaleTo16Bit: bool = False):
+        # The file is opened by open() (or by entering 'async with'). backend, sidecarCache, outputDtype and
+        # scaleTo16Bit are passed on to Adv2reader.
+        if maxInFlight < 1:
+            raise AdvLibException(f'maxInFlight must be at least 1 but was {maxInFlight}')
+        self._filename = filename
+        self._backend = backend
+        self._sidecarCache = sidecarCache
+        self._outputDtype = outputDtype
+        self._scaleTo16Bit = scaleTo16Bit
+        self.maxInFlight = maxInFlight
+
+        # The underlying Adv2reader (None until the file is open). Only call it through run().
+        self.reader: Optional[Adv2reader] = None
+        self.Width = 0
+        self.Height = 0
+        self.CountMainFrames = 0
+        self.CountCalibrationFrames = 0
+        self.FileInfo = None
+        self.outputDtype = None
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def open(self):
+        if self.reader is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(self.maxInFlight)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='AsyncAdv2reader')
+        try:
+            rdr = await self._submit(Adv2reader, self._filename, self._backend, self._sidecarCache,
+                                     self._outputDtype, self._scaleTo16Bit)
+        except BaseException:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            raise
+        self.reader = rdr
+        self.Width = rdr.Width
+        self.Height = rdr.Height
+        self.CountMainFrames = rdr.CountMainFrames
+        self.CountCalibrationFrames = rdr.CountCalibrationFrames
+        self.FileInfo = rdr.FileInfo
+        self.outputDtype = rdr.outputDtype
+
+    async def close(self):
+        # Waits for the calls already queued, then closes the file and stops the worker thread
+        if self._executor is None:
+            return
+        try:
+            if self.reader is not None:
+                await asyncio.wrap_future(self._executor.submit(self.reader.closeFile), loop=self._loop)
+        finally:
+            self.reader = None
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def _submit(self, function: Callable, *args, **kwargs):
+        # Runs function(*args, **kwargs) on the worker thread once fewer than maxInFlight calls are queued or
+        # running. The slot is given back when the call has actually finished (or was cancelled before it
+        # started), not when the awaiting task gives up, so the bound holds even when requests are cancelled.
+        if self._executor is None:
+            raise AdvLibException('The AsyncAdv2reader is not open')
+        await self._slots.acquire()
+        try:
+            future = self._executor.submit(function, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._releaseSlot)
+        return await asyncio.wrap_future(future, loop=self._loop)
+
+    def _releaseSlot(self, _):
+        # Called on the worker thread (or on the event loop thread when a queued call is cancelled)
+        try:
+            self._loop.call_soon_threadsafe(self._slots.release)
+        except RuntimeError:
+            pass  # The event loop has already been closed
+
+    async def run(self, function: Callable, *args, **kwargs):
+        # Runs function(reader, *args, **kwargs) on the worker thread and returns its result, e.g.
+        #     startNs, midNs, exposureNs, startTimes = await ardr.run(Adv2reader.getTimestamps)
+        #     frameNumbers, table = await ardr.run(Adv2reader.getStatusTable, start=0, stop=1000)
+        # Anything returned that the reader reuses (self.frameInfo, the ring buffers of iterFrames()) must be
+        # copied inside function.
+        if self.reader is None:
+            raise AdvLibException('The AsyncAdv2reader is not open')
+        return await self._submit(function, self.reader, *args, **kwargs)
+
+    @staticmethod
+    def _readFrame(rdr: Adv2reader, frameNumber: int, stream: StreamId,
+                   roi: Optional[Tuple[int, int, int, int]]) -> Tuple[str, np.ndarray, AdvFrameInfo, Dict[str, any]]:
+        # Runs on the worker. The reader reuses its frameInfo for every frame, so each result gets its own copy.
+        err, pixels, frameInfo, status = rdr.getImageAndStatusData(frameNumber, stream, None, roi)
+        return err, pixels, copy.copy(frameInfo), status
+
+    async def getFrame(self, frameNumber: int, stream: StreamId = StreamId.Main,
+                       roi: Optional[Tuple[int, int, int, int]] = None) -> \
+            Tuple[str, np.ndarray, AdvFrameInfo, Dict[str, any]]:
+        # Returns (err_msg, image, frameInfo, status) like getMainImageAndStatusData()/getCalibImageAndStatusData().
+        # The image and frameInfo belong to this frame (they are not overwritten by later reads).
+        return await self.run(self._readFrame, frameNumber, stream, roi)
+
+    async def frames(self, stream: StreamId = StreamId.Main, start: int = 0, stop: Optional[int] = None,
+                     step: int = 1, frames: Union[slice, Sequence[int], None] = None,
+                     roi: Optional[Tuple[int, int, int, int]] = None, prefetch: Optional[int] = None) -> \
+            AsyncIterator[Tuple[int, np.ndarray, AdvFrameInfo, Dict[str, any]]]:
+        # An async generator that yields (frameNo, image, frameInfo, status) for each frame in
+        # range(start, stop, step) or in frames, in order. Up to prefetch (default maxInFlight) frames are
+        # requested ahead of the consumer. An AdvLibException is raised if a frame cannot be read.
+        # The requests still outstanding are cancelled when the generator is closed: wrap it in
+        # contextlib.aclosing() (or call its aclose()) when leaving the loop early, so that happens at once.
+        if self.reader is None:
+            raise AdvLibException('The AsyncAdv2reader is not open')
+        frameNumbers = iter(self.reader.frameNumbers(stream, start, stop, step, frames).tolist())
+        prefetch = max(1, prefetch or self.maxInFlight)
+        pending = deque()
+
+        def requestMore():
+            while len(pending) < prefetch:
+                frameNumber = next(frameNumbers, None)
+                if frameNumber is None:
+                    return
+                task = asyncio.ensure_future(self.getFrame(frameNumber, stream, roi))
+                pending.append((frameNumber, task))
+
+        try:
+            requestMore()
+            while pending:
+                frameNumber, task = pending.popleft()
+                err, image, frameInfo, status = await task
+                if err:
+                    raise AdvLibException(f'{stream.name} frame {frameNumber}: {err}')
+                requestMore()
+                yield frameNumber, image, frameInfo, status
+        finally:
+            for _, task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*(task for _, task in pending), return_exceptions=True)
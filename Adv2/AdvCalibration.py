@@ -0,0 +1,218 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# We use type hinting so that it is easy to see the intent as matching the C++/C# code
+
+# Master dark/flat frames built from the frames of an ADV file (by default its calibration stream), and their
+# application to images.
+#
+# A median (or sigma clipped mean) needs every frame for each pixel, so buildMasterCalibration() combines the
+# frames one band of chunkRows image rows at a time: only (number of frames) x chunkRows x Width pixels (and, for
+# a sigma clipped mean, a float32 copy of them to work in) are in memory at once. With the mmap backend a band
+# is read straight from the file (only those rows of each frame are read). The native library can only decode
+# whole frames, so with the other backends the frames are first decoded once into a temporary file that is then
+# read band by band.
+
+import tempfile
+from typing import Iterator, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from Adv2.Adv import StreamId
+from Adv2.Adv2File import Adv2reader
+from Adv2.AdvError import AdvLibException
+
+CALIBRATION_METHODS = ('median', 'mean', 'sigma_clip')
+
+# Bytes of float32 work space that _combine() needs per value of a band, on top of the band itself
+COMBINE_BYTES_PER_VALUE = {'median': 0, 'sigma_clip': 4}
+
+
+def _readStack(rdr: Adv2reader, stream: StreamId):
+    return rdr.getMainImageStack if stream == StreamId.Main else rdr.getCalibImageStack
+
+
+def _combine(band: np.ndarray, method: str, sigma: float, iterations: int,
+             work: Optional[np.ndarray] = None) -> np.ndarray:
+    # Combines a (n, rows, Width) band of frames into a (rows, Width) float32 band. The band is overwritten.
+    # Apart from work (a float32 array of the band's shape, needed for 'sigma_clip') only (rows, Width)
+    # temporaries are made, so the memory used is known in advance (see COMBINE_BYTES_PER_VALUE).
+    if method == 'median':
+        return np.median(band, axis=0, overwrite_input=True).astype(np.float32)
+
+    # sigma_clip: repeatedly reject values more than sigma standard deviations from the median, then average.
+    # Rejected values are set to NaN in work; the frames are processed one (rows, Width) plane at a time.
+    values = work
+    np.copyto(values, band, casting='unsafe')
+    for _ in range(iterations):
+        # Sorting each pixel's values (the order of the frames does not matter here) puts the NaNs last, so the
+        # median is found from the number of values left
+        values.sort(axis=0)
+        count = _countValid(values)
+        lower = np.take_along_axis(values, np.maximum(count - 1, 0)[None] // 2, axis=0)[0]
+        upper = np.take_along_axis(values, (count // 2)[None], axis=0)[0]
+        center = (lower + upper) / 2
+        mean = _nanMean(values, count)
+        variance = np.zeros(count.shape)
+        for plane in values:
+            variance += np.nan_to_num(np.square(plane - mean))
+        limit = sigma * np.sqrt(np.divide(variance, count, out=np.zeros(count.shape), where=count > 0))
+        rejected = False
+        for plane in values:
+            outliers = np.abs(plane - center) > limit
+            if outliers.any():
+                plane[outliers] = np.nan
+                rejected = True
+        if not rejected:
+            break
+    return _nanMean(values, _countValid(values)).astype(np.float32)
+
+
+def _countValid(values: np.ndarray) -> np.ndarray:
+    # The number of values that are not NaN at each pixel of a (n, rows, Width) band
+    count = np.zeros(values.shape[1:], dtype=np.int64)
+    for plane in values:
+        count += ~np.isnan(plane)
+    return count
+
+
+def _nanMean(values: np.ndarray, count: np.ndarray) -> np.ndarray:
+    # The mean of the values that are not NaN at each pixel (NaN where there are none)
+    total = np.zeros(count.shape)
+    for plane in values:
+        total += np.nan_to_num(plane)
+    return np.divide(total, count, out=np.full(count.shape, np.nan), where=count > 0)
+
+
+def buildMasterCalibration(rdr: Adv2reader, method: str = 'median', chunkRows: Optional[int] = None,
+                           stream: StreamId = StreamId.Calibration, start: int = 0, stop: Optional[int] = None,
+                           step: int = 1, frames: Union[slice, Sequence[int], None] = None,
+                           sigma: float = 3.0, iterations: int = 3, maxBytes: int = 256 * 1024 * 1024) -> np.ndarray:
+    # Returns the (Height, Width) float32 combination of the selected frames (start/stop/step or frames, as for
+    # Adv2reader.getCalibImageStack()). method is 'median', 'mean' or 'sigma_clip' (a mean of the values within
+    # sigma standard deviations of the median). chunkRows (the height of each band) defaults to the number of
+    # rows that keeps a band of all the frames (with its sigma_clip work space) within maxBytes.
+    if method not in CALIBRATION_METHODS:
+        raise AdvLibException(f'method must be one of {CALIBRATION_METHODS} but was {method!r}')
+    frameNumbers = rdr.frameNumbers(stream, start, stop, step, frames)
+    numFrames = frameNumbers.size
+    if numFrames == 0:
+        raise AdvLibException(f'There are no {stream.name} frames to combine')
+    readStack = _readStack(rdr, stream)
+    height, width = rdr.Height, rdr.Width
+    dtype, pixelBytes = rdr.outputDtype, rdr.outputDtype.itemsize
+    master = np.empty((height, width), dtype=np.float32)
+
+    if method == 'mean':
+        # A running sum needs no bands: the frames are read in chunks of whole frames
+        chunkSize = max(1, maxBytes // (pixelBytes * height * width))
+        buffer = np.empty((min(chunkSize, numFrames), height, width), dtype=dtype)
+        total = np.zeros((height, width), dtype=np.float64)
+        for first in range(0, numFrames, chunkSize):
+            chunk = frameNumbers[first:first + chunkSize]
+            stack, _, _ = readStack(frames=chunk, out=buffer[:chunk.size])
+            total += stack.sum(axis=0, dtype=np.float64)
+        np.divide(total, numFrames, out=master, casting='unsafe')
+        return master
+
+    # A band takes pixelBytes per value, plus the work space of the method
+    if chunkRows is None:
+        valueBytes = pixelBytes + COMBINE_BYTES_PER_VALUE[method]
+        chunkRows = max(1, maxBytes // (valueBytes * numFrames * width))
+    chunkRows = min(chunkRows, height)
+    buffer = np.empty((numFrames, chunkRows, width), dtype=dtype)
+    work = np.empty(buffer.shape, dtype=np.float32) if COMBINE_BYTES_PER_VALUE[method] else None
+
+    def combineBand(y0: int, y1: int, band: np.ndarray):
+        master[y0:y1] = _combine(band, method, sigma, iterations, None if work is None else work[:, :y1 - y0])
+
+    if rdr.backend == 'mmap':
+        for y0 in range(0, height, chunkRows):
+            y1 = min(y0 + chunkRows, height)
+            band, _, _ = readStack(frames=frameNumbers, out=buffer[:, :y1 - y0], roi=(y0, y1, 0, width))
+            combineBand(y0, y1, band)
+        return master
+
+    # Decode every frame once into a temporary file, then combine it band by band
+    with tempfile.TemporaryFile() as spool:
+        spooled = np.memmap(spool, dtype=dtype, mode='w+', shape=(numFrames, height, width))
+        chunkSize = max(1, maxBytes // (pixelBytes * height * width))
+        for first in range(0, numFrames, chunkSize):
+            chunk = frameNumbers[first:first + chunkSize]
+            readStack(frames=chunk, out=spooled[first:first + chunk.size])
+        for y0 in range(0, height, chunkRows):
+            y1 = min(y0 + chunkRows, height)
+            band = buffer[:, :y1 - y0]
+            np.copyto(band, spooled[:, y0:y1])
+            combineBand(y0, y1, band)
+        del spooled
+    return master
+
+
+class Calibration:
+    # Holds a master dark and/or flat prepared for applying to many images: the flat is normalized to a mean
+    # of 1 and inverted once, so applying it is a subtraction and a multiplication.
+    # The flat should already have had its own dark (or bias) subtracted.
+    def __init__(self, dark: Optional[np.ndarray] = None, flat: Optional[np.ndarray] = None):
+        self.dark = None if dark is None else np.asarray(dark, dtype=np.float32)
+        self.flatScale = None
+        if flat is not None:
+            flat = np.asarray(flat, dtype=np.float64)
+            if not (flat > 0).any():
+                raise AdvLibException('The flat has no pixels with a positive value')
+            normalized = flat / flat[flat > 0].mean()
+            self.flatScale = np.divide(1.0, normalized, out=np.zeros_like(normalized),
+                                       where=normalized > 0).astype(np.float32)
+
+    def apply(self, images: np.ndarray, out: Optional[np.ndarray] = None,
+              roi: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        # images is a (Height, Width) image or an (n, Height, Width) stack (or their roi window, if the images
+        # were read with roi). Returns float32 (images - dark) / flat, written into out if it is given.
+        dark, flatScale = self.dark, self.flatScale
+        if roi is not None:
+            y0, y1, x0, x1 = roi
+            dark = None if dark is None else dark[y0:y1, x0:x1]
+            flatScale = None if flatScale is None else flatScale[y0:y1, x0:x1]
+        if out is None:
+            out = np.empty(images.shape, dtype=np.float32)
+        if dark is None:
+            np.copyto(out, images, casting='unsafe')
+        else:
+            np.subtract(images, dark, out=out, casting='unsafe')
+        if flatScale is not None:
+            np.multiply(out, flatScale, out=out)
+        return out
+
+
+def applyCalibration(images: np.ndarray, dark: Optional[np.ndarray] = None, flat: Optional[np.ndarray] = None,
+                     out: Optional[np.ndarray] = None) -> np.ndarray:
+    # Returns float32 (images - dark) / flat, where flat is normalized to a mean of 1. To calibrate many images
+    # with the same dark and flat, make a Calibration once and use its apply() method.
+    return Calibration(dark, flat).apply(images, out)
+
+
+def calibratedImageStacks(rdr: Adv2reader, dark: Optional[np.ndarray] = None, flat: Optional[np.ndarray] = None,
+                          stream: StreamId = StreamId.Main, start: int = 0, stop: Optional[int] = None,
+                          step: int = 1, frames: Union[slice, Sequence[int], None] = None, chunkSize: int = 256,
+                          roi: Optional[Tuple[int, int, int, int]] = None) -> \
+        Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    # A generator that reads the selected frames in stacks of chunkSize frames and yields
+    # (frameNumbers, calibratedImages, frameInfos, startOfExposure) for each stack. calibratedImages is float32.
+    # The read and calibration buffers are reused, so the arrays yielded are only valid until the next stack
+    # is requested --- copy them if they are needed for longer.
+    calibration = Calibration(dark, flat)
+    frameNumbers = rdr.frameNumbers(stream, start, stop, step, frames)
+    roi = rdr.checkRoi(roi)
+    readStack = _readStack(rdr, stream)
+    shape = (min(chunkSize, max(frameNumbers.size, 1)),) + rdr.imageShape(roi)
+    rawBuffer = np.empty(shape, dtype=rdr.outputDtype)
+    calibratedBuffer = np.empty(shape, dtype=np.float32)
+
+    for first in range(0, frameNumbers.size, chunkSize):
+        chunk = frameNumbers[first:first + chunkSize]
+        n = chunk.size
+        stack, frameInfos, startOfExposure = readStack(frames=chunk, out=rawBuffer[:n], roi=roi)
+        calibrated = calibration.apply(stack, out=calibratedBuffer[:n], roi=roi)
+        yield chunk, calibrated, frameInfos, startOfExposure
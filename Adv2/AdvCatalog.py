@@ -0,0 +1,242 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# We use type hinting so that it is easy to see the intent as matching the C++/C# code
+
+# A catalog of the ADV files (.adv and .aav) in a directory tree: version, image size, frame counts, metadata,
+# first and last timestamps and duration of every file. The files are opened by a pool of worker processes
+# (never threads: each worker has its own copy of the native library's process-global state).
+#
+# The catalog is written as JSON lines (.jsonl), CSV (.csv) or an SQLite database (.sqlite or .db), chosen by
+# the extension of the output file. When the output file already exists the scan is incremental: files whose
+# size and modification time match their catalog entry are not opened again (unless that entry records an
+# error, which may have been passing, such as a file still being written), and entries of files that no longer
+# exist are dropped.
+#
+#     python -m Adv2.AdvCatalog path/to/recordings --output catalog.jsonl [--workers 8] [--full]
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from Adv2 import AdvMmapLib
+from Adv2.Adv2File import Adv2reader, ADV_EPOCH_NANOSECONDS
+from Adv2.AdvError import AdvLibException
+
+ADV_FILE_EXTENSIONS = ('.adv', '.aav')
+
+# The columns of a catalog entry, in order. metadata is a dict (a JSON string in CSV and SQLite catalogs) and
+# the timestamps are ISO 8601 UTC strings of the start of exposure of the first and last frames.
+CATALOG_FIELDS = ('path', 'size', 'mtimeNs', 'version', 'width', 'height', 'dataBpp', 'mainFrames',
+                  'calibrationFrames', 'firstTimestamp', 'lastTimestamp', 'durationSeconds', 'metadata', 'error')
+
+SQLITE_TYPES = {'size': 'INTEGER', 'mtimeNs': 'INTEGER', 'version': 'INTEGER', 'width': 'INTEGER',
+                'height': 'INTEGER', 'dataBpp': 'INTEGER', 'mainFrames': 'INTEGER', 'calibrationFrames': 'INTEGER',
+                'durationSeconds': 'REAL'}
+
+INTEGER_FIELDS = tuple(name for name, sqlType in SQLITE_TYPES.items() if sqlType == 'INTEGER')
+
+
+def findAdvFiles(root: str) -> List[str]:
+    # The absolute paths of the .adv and .aav files below root, sorted
+    found = []
+    for folder, _, names in os.walk(root):
+        for name in names:
+            if name.lower().endswith(ADV_FILE_EXTENSIONS):
+                found.append(os.path.abspath(os.path.join(folder, name)))
+    return sorted(found)
+
+
+def _frameTiming(rdr: Adv2reader, frameNumber: int) -> Tuple[int, int]:
+    # (start-of-exposure, exposure) of a MAIN frame in nanoseconds. Only the frame header and status section
+    # are read (see Adv2reader.getMainFrameInfoAndStatus()): the image is not decoded.
+    err, frameInfo, _ = rdr.getMainFrameInfoAndStatus(frameNumber)
+    if err:
+        raise AdvLibException(f'MAIN frame {frameNumber}: {err}')
+    midExposure = frameInfo.UtcMidExposureTimestampLo + (frameInfo.UtcMidExposureTimestampHi << 32)
+    return midExposure - frameInfo.Exposure // 2, frameInfo.Exposure
+
+
+def _isoTimestamp(nanoseconds: int) -> str:
+    return str(np.datetime64(nanoseconds + ADV_EPOCH_NANOSECONDS, 'ns').astype('datetime64[us]'))
+
+
+def catalogEntry(path: str, backend: str = 'auto') -> Dict[str, any]:
+    # Opens one file and returns its catalog entry. A file that cannot be read gets an entry with the reason in
+    # 'error' (and whatever could be found out before that).
+    stat = os.stat(path)
+    entry = dict.fromkeys(CATALOG_FIELDS)
+    entry.update(path=path, size=stat.st_size, mtimeNs=stat.st_mtime_ns, metadata={}, error='')
+
+    err, version = AdvMmapLib.AdvGetFileVersion(path)
+    if err:
+        entry['error'] = err
+        return entry
+    entry['version'] = version
+
+    # One unreadable file must not stop the scan, so any exception is recorded in the entry
+    try:
+        rdr = Adv2reader(path, backend=backend)
+    except Exception as exc:
+        entry['error'] = str(exc)
+        return entry
+    try:
+        entry.update(width=rdr.Width, height=rdr.Height, dataBpp=rdr.FileInfo.DataBpp,
+                     mainFrames=rdr.CountMainFrames, calibrationFrames=rdr.CountCalibrationFrames,
+                     metadata=rdr.getAdvFileMetaData())
+        if rdr.CountMainFrames > 0:
+            firstStart, _ = _frameTiming(rdr, 0)
+            lastStart, lastExposure = _frameTiming(rdr, rdr.CountMainFrames - 1)
+            entry.update(firstTimestamp=_isoTimestamp(firstStart), lastTimestamp=_isoTimestamp(lastStart),
+                         durationSeconds=(lastStart + lastExposure - firstStart) / 1e9)
+    except Exception as exc:
+        entry['error'] = str(exc)
+    finally:
+        rdr.closeFile()
+    return entry
+
+
+def _catalogFormat(filename: str) -> str:
+    extension = os.path.splitext(filename)[1].lower()
+    if extension in ('.jsonl', '.json'):
+        return 'jsonl'
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.sqlite', '.db'):
+        return 'sqlite'
+    raise ValueError(f'The catalog must be a .jsonl, .csv, .sqlite or .db file, not {filename}')
+
+
+def _fromText(entry: Dict[str, any]) -> Dict[str, any]:
+    # Restores the types of an entry read back from CSV (or the metadata of an SQLite row)
+    for name in INTEGER_FIELDS:
+        if entry.get(name) not in (None, ''):
+            entry[name] = int(entry[name])
+        elif name in entry:
+            entry[name] = None
+    if entry.get('durationSeconds') not in (None, ''):
+        entry['durationSeconds'] = float(entry['durationSeconds'])
+    else:
+        entry['durationSeconds'] = None
+    for name in ('firstTimestamp', 'lastTimestamp'):
+        entry[name] = entry.get(name) or None
+    entry['metadata'] = json.loads(entry['metadata']) if entry.get('metadata') else {}
+    return entry
+
+
+def readCatalog(filename: str) -> List[Dict[str, any]]:
+    # The entries of an existing catalog (an empty list if there is no such file)
+    if not os.path.isfile(filename):
+        return []
+    catalogFormat = _catalogFormat(filename)
+    if catalogFormat == 'jsonl':
+        with open(filename, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    if catalogFormat == 'csv':
+        with open(filename, newline='', encoding='utf-8') as f:
+            return [_fromText(dict(row)) for row in csv.DictReader(f)]
+    with closing(sqlite3.connect(filename)) as connection, connection:
+        connection.row_factory = sqlite3.Row
+        try:
+            rows = connection.execute('SELECT * FROM catalog ORDER BY path').fetchall()
+        except sqlite3.OperationalError:
+            return []
+        return [_fromText(dict(row)) for row in rows]
+
+
+def writeCatalog(filename: str, entries: List[Dict[str, any]]):
+    # Replaces the catalog with entries. JSON lines and CSV catalogs are written to a temporary file that is then
+    # renamed, so an interrupted write never leaves a truncated catalog.
+    catalogFormat = _catalogFormat(filename)
+    if catalogFormat == 'sqlite':
+        columns = ', '.join(f'{name} {SQLITE_TYPES.get(name, "TEXT")}' + (' PRIMARY KEY' if name == 'path' else '')
+                            for name in CATALOG_FIELDS)
+        with closing(sqlite3.connect(filename)) as connection, connection:
+            connection.execute(f'CREATE TABLE IF NOT EXISTS catalog ({columns})')
+            connection.execute('DELETE FROM catalog')
+            connection.executemany(
+                f'INSERT INTO catalog VALUES ({", ".join("?" * len(CATALOG_FIELDS))})',
+                [[json.dumps(entry[name]) if name == 'metadata' else entry[name] for name in CATALOG_FIELDS]
+                 for entry in entries])
+        return
+
+    tempName = f'{filename}.{os.getpid()}.tmp'
+    with open(tempName, 'w', newline='', encoding='utf-8') as f:
+        if catalogFormat == 'jsonl':
+            for entry in entries:
+                f.write(json.dumps({name: entry[name] for name in CATALOG_FIELDS}) + '\n')
+        else:
+            writer = csv.writer(f)
+            writer.writerow(CATALOG_FIELDS)
+            for entry in entries:
+                writer.writerow([json.dumps(entry[name]) if name == 'metadata' else
+                                 '' if entry[name] is None else entry[name] for name in CATALOG_FIELDS])
+    os.replace(tempName, filename)
+
+
+def buildCatalog(root: str, output: Optional[str] = None, workers: Optional[int] = None, backend: str = 'auto',
+                 incremental: bool = True) -> Tuple[List[Dict[str, any]], Dict[str, int]]:
+    # Scans the tree below root and returns (entries, counts), where counts gives the number of files 'scanned'
+    # (including those whose previous entry records an error), 'unchanged' (taken from the existing catalog),
+    # 'removed' (in the catalog but no longer on disk) and 'errors'. If output is given the catalog is read from
+    # there (when incremental) and written back to it.
+    paths = findAdvFiles(root)
+    previous = {}
+    if output is not None and incremental:
+        previous = {entry['path']: entry for entry in readCatalog(output)}
+
+    entries = {}
+    toScan = []
+    for path in paths:
+        stat = os.stat(path)
+        old = previous.get(path)
+        if old is not None and not old['error'] and old['size'] == stat.st_size and \
+                old['mtimeNs'] == stat.st_mtime_ns:
+            entries[path] = old
+        else:
+            toScan.append(path)
+    counts = {'scanned': len(toScan), 'unchanged': len(entries),
+              'removed': len(set(previous) - set(paths)), 'errors': 0}
+
+    if toScan:
+        workers = min(workers or os.cpu_count() or 1, len(toScan))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn')) as executor:
+            chunkSize = max(1, len(toScan) // (4 * workers))
+            for entry in executor.map(catalogEntry, toScan, [backend] * len(toScan), chunksize=chunkSize):
+                entries[entry['path']] = entry
+
+    result = [entries[path] for path in paths]
+    counts['errors'] = sum(1 for entry in result if entry['error'])
+    if output is not None:
+        writeCatalog(output, result)
+    return result, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Catalog the ADV files in a directory tree')
+    parser.add_argument('root', help='the directory to scan')
+    parser.add_argument('--output', default='adv_catalog.jsonl',
+                        help='catalog file: .jsonl, .csv, .sqlite or .db (default adv_catalog.jsonl)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: number of cores)')
+    parser.add_argument('--backend', default='auto', choices=('auto', 'native', 'mmap'),
+                        help='how the workers read the files')
+    parser.add_argument('--full', action='store_true', help='rescan every file, even if it has not changed')
+    args = parser.parse_args()
+
+    entries, counts = buildCatalog(args.root, args.output, args.workers, args.backend, incremental=not args.full)
+    print(f'{len(entries)} files in {args.output}: {counts["scanned"]} scanned, {counts["unchanged"]} unchanged, '
+          f'{counts["removed"]} removed, {counts["errors"]} with errors')
+
+
+if __name__ == '__main__':
+    main()
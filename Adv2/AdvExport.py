@@ -0,0 +1,279 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# We use type hinting so that it is easy to see the intent as matching the C++/C# code
+
+# Converts the frames of an ADV file to
+#   'npy'     a single (frames, Height, Width) .npy file, filled through a memory map
+#   'fits'    a FITS cube (NAXIS3 = frames) whose header holds the file's metadata as header cards
+#   'chunks'  a directory of chunk_NNNNN.npy files of chunkSize frames each
+# and writes a side table (<output>.frames.csv) with the frame number, timestamps, exposure and status tags of
+# every frame in the same pass. The frames are read chunkSize at a time into one reused buffer (or straight into
+# a memory map of the chunk's part of the .npy file, which is flushed and unmapped before the next chunk), so the
+# memory used does not depend on the number of frames. The pixels are stored in the reader's outputDtype.
+#
+# FITS files are written directly (astropy is not needed): 16 bit unsigned pixels are stored, as the FITS
+# standard requires, as big endian int16 with BZERO = 32768; uint8 pixels as BITPIX 8 and float32 as BITPIX -32.
+#
+#     python -m Adv2.AdvExport file.adv cube.fits [--chunk-size 256] [--calibration] [--start 0] [--stop 100]
+
+import argparse
+import csv
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from Adv2.Adv import StreamId
+from Adv2.Adv2File import Adv2reader, ADV_EPOCH_NANOSECONDS, OUTPUT_DTYPES
+from Adv2.AdvError import AdvLibException
+
+EXPORT_FORMATS = ('npy', 'fits', 'chunks')
+
+FITS_BLOCK_BYTES = 2880
+FITS_CARD_BYTES = 80
+
+# The BITPIX of each pixel type that can be exported, and the (big endian) type it is written as
+FITS_BITPIX = {np.dtype(np.uint8): 8, np.dtype(np.uint16): 16, np.dtype(np.float32): -32}
+FITS_DISK_DTYPES = {np.dtype(np.uint8): np.dtype('u1'), np.dtype(np.uint16): np.dtype('>u2'),
+                    np.dtype(np.float32): np.dtype('>f4')}
+
+# Metadata entries with these names (or that start with NAXIS) would clash with the cards that describe the data,
+# so they are written as HIERARCH ADV <name> cards instead
+FITS_RESERVED_KEYWORDS = {'SIMPLE', 'BITPIX', 'NAXIS', 'EXTEND', 'BZERO', 'BSCALE', 'BLANK', 'END', 'COMMENT',
+                          'HISTORY', 'DATE-OBS', 'ADVSTRM', 'ADVBPP', 'ROI_Y0', 'ROI_X0'}
+
+
+def exportFormat(output: str) -> str:
+    # The format implied by the name of the output: .npy, .fits (.fit, .fts) or otherwise a directory of chunks
+    extension = os.path.splitext(output)[1].lower()
+    if extension == '.npy':
+        return 'npy'
+    if extension in ('.fits', '.fit', '.fts'):
+        return 'fits'
+    return 'chunks'
+
+
+def sideTablePath(output: str) -> str:
+    return output.rstrip('/\\') + '.frames.csv'
+
+
+def _fitsString(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _fitsCard(keyword: str, value: any = None, comment: str = '') -> str:
+    # One 80 character header card. Keywords longer than 8 characters, or with characters that FITS keywords
+    # may not have, use the HIERARCH convention. Values that do not fit are truncated.
+    if isinstance(value, bool):
+        text = 'T' if value else 'F'
+    elif isinstance(value, (int, np.integer)):
+        text = str(int(value))
+    elif isinstance(value, (float, np.floating)):
+        text = repr(float(value))
+    else:
+        text = _fitsString(str(value))
+
+    keyword = keyword.upper()
+    if len(keyword) <= 8 and all(c.isalnum() or c in '-_' for c in keyword) and keyword.isascii():
+        card = f'{keyword:8s}= {text:>20s}'
+    else:
+        keyword = ''.join(c if c.isascii() and c.isprintable() and c not in "='" else '_' for c in keyword)
+        card = f'HIERARCH {keyword} = {text}'
+    if comment:
+        card += f' / {comment}'
+    card = card.encode('ascii', errors='replace').decode('ascii')
+    if len(card) > FITS_CARD_BYTES and text.startswith("'"):
+        # Keep the closing quote of a truncated string
+        card = card[:FITS_CARD_BYTES - 1].rstrip("'") + "'"
+    return f'{card[:FITS_CARD_BYTES]:{FITS_CARD_BYTES}s}'
+
+
+def fitsHeader(shape: Tuple[int, int, int], metaData: Dict[str, str], extraCards: Sequence[tuple] = (),
+               dtype: np.dtype = np.dtype(np.uint16)) -> bytes:
+    # The primary header of a uint16, uint8 or float32 cube of shape (frames, Height, Width), padded to whole
+    # FITS blocks
+    numFrames, height, width = shape
+    dtype = np.dtype(dtype)
+    if dtype not in FITS_BITPIX:
+        raise AdvLibException(f'FITS export supports {[str(np.dtype(t)) for t in FITS_BITPIX]} pixels, not {dtype}')
+    cards = [
+        _fitsCard('SIMPLE', True, 'conforms to FITS standard'),
+        _fitsCard('BITPIX', FITS_BITPIX[dtype], 'array data type'),
+        _fitsCard('NAXIS', 3, 'number of array dimensions'),
+        _fitsCard('NAXIS1', width),
+        _fitsCard('NAXIS2', height),
+        _fitsCard('NAXIS3', numFrames),
+    ]
+    if dtype == np.uint16:
+        cards += [_fitsCard('BZERO', 32768, 'pixels are unsigned 16 bit integers'), _fitsCard('BSCALE', 1)]
+    cards += [_fitsCard(*card) for card in extraCards]
+    used = set()
+    for name, value in metaData.items():
+        keyword = name.upper()
+        if keyword in FITS_RESERVED_KEYWORDS or keyword.startswith('NAXIS') or keyword in used:
+            keyword = f'ADV {keyword}'
+        used.add(keyword)
+        cards.append(_fitsCard(keyword, value))
+    cards.append(f'{"END":{FITS_CARD_BYTES}s}')
+    header = ''.join(cards).encode('ascii')
+    return header + b' ' * (-len(header) % FITS_BLOCK_BYTES)
+
+
+def _isoTimestamp(nanoseconds: int) -> str:
+    return str(np.datetime64(int(nanoseconds) + ADV_EPOCH_NANOSECONDS, 'ns').astype('datetime64[us]'))
+
+
+class _SideTable:
+    # Writes one csv row per frame as the frames are read
+    def __init__(self, filename: str, statusTagNames: List[str]):
+        self._file = open(filename, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._statusTagNames = statusTagNames
+        self._writer.writerow(['FrameNum', 'StartOfExposureNs', 'StartOfExposure', 'MidExposureNs', 'ExposureNs']
+                              + statusTagNames)
+
+    def write(self, frameNumber: int, midExposure: int, exposure: int, status: Dict[str, any]):
+        startOfExposure = midExposure - exposure // 2
+        self._writer.writerow([frameNumber, startOfExposure, _isoTimestamp(startOfExposure), midExposure, exposure]
+                              + [status.get(name, '') for name in self._statusTagNames])
+
+    def close(self):
+        self._file.close()
+
+
+def exportFrames(rdr: Adv2reader, output: str, outputFormat: Optional[str] = None,
+                 stream: StreamId = StreamId.Main, start: int = 0, stop: Optional[int] = None, step: int = 1,
+                 frames: Union[slice, Sequence[int], None] = None, roi: Optional[Tuple[int, int, int, int]] = None,
+                 chunkSize: int = 256, sideTable: bool = True) -> Dict[str, any]:
+    # Writes the selected frames (start/stop/step or frames, as for Adv2reader.getMainImageStack()) to output in
+    # outputFormat (one of EXPORT_FORMATS; by default implied by the name of output, see exportFormat()).
+    # With roi=(y0, y1, x0, x1) only that window of each frame is exported. Returns the number of frames and
+    # bytes of pixels written, the seconds taken and the throughput in MB/s.
+    outputFormat = outputFormat or exportFormat(output)
+    if outputFormat not in EXPORT_FORMATS:
+        raise AdvLibException(f'outputFormat must be one of {EXPORT_FORMATS} but was {outputFormat!r}')
+    frameNumbers = rdr.frameNumbers(stream, start, stop, step, frames)
+    numFrames = frameNumbers.size
+    roi = rdr.checkRoi(roi)
+    imageShape = rdr.imageShape(roi)
+    shape = (numFrames,) + imageShape
+    dtype = rdr.outputDtype
+    if stream == StreamId.Main:
+        readFrame = rdr.getMainImageAndStatusData
+    else:
+        readFrame = rdr.getCalibImageAndStatusData
+
+    startTime = time.perf_counter()
+    table = None
+    if sideTable:
+        table = _SideTable(sideTablePath(output), [tagName for _, tagName in rdr.statusTagInfo])
+
+    fitsFile = None
+    buffer = None
+    try:
+        if outputFormat == 'npy':
+            # Write the header and size the file; each chunk then maps only its own part of the file
+            np.lib.format.open_memmap(output, mode='w+', dtype=dtype, shape=shape).flush()
+            with open(output, 'rb') as f:
+                if np.lib.format.read_magic(f) == (1, 0):
+                    np.lib.format.read_array_header_1_0(f)
+                else:
+                    np.lib.format.read_array_header_2_0(f)
+                dataOffset = f.tell()
+            frameBytes = imageShape[0] * imageShape[1] * dtype.itemsize
+        else:
+            buffer = np.empty((min(chunkSize, max(numFrames, 1)),) + imageShape, dtype=dtype)
+        if outputFormat == 'fits':
+            extraCards = [('ADVSTRM', stream.name, 'ADV stream of the frames'),
+                          ('ADVBPP', rdr.FileInfo.DataBpp, 'bits per pixel in the ADV file')]
+            if numFrames:
+                firstStart = rdr.startOfExposure(int(frameNumbers[0]), stream)
+                extraCards.append(('DATE-OBS', _isoTimestamp(firstStart), 'start of exposure of the first frame'))
+            if roi is not None:
+                extraCards += [('ROI_Y0', roi[0]), ('ROI_X0', roi[2])]
+            header = fitsHeader(shape, rdr.getAdvFileMetaData(), extraCards, dtype)
+            fitsFile = open(output, 'wb')
+            fitsFile.write(header)
+            bigEndian = np.empty(buffer.shape, dtype=FITS_DISK_DTYPES[dtype])
+        elif outputFormat == 'chunks':
+            os.makedirs(output, exist_ok=True)
+
+        for chunkNumber, first in enumerate(range(0, numFrames, chunkSize)):
+            chunk = frameNumbers[first:first + chunkSize].tolist()
+            n = len(chunk)
+            if outputFormat == 'npy':
+                target = np.memmap(output, dtype=dtype, mode='r+', offset=dataOffset + first * frameBytes,
+                                   shape=(n,) + imageShape)
+            else:
+                target = buffer[:n]
+            for i, frameNumber in enumerate(chunk):
+                err, _, frameInfo, status = readFrame(frameNumber, out=target[i], roi=roi)
+                if err:
+                    raise AdvLibException(f'{stream.name} frame {frameNumber}: {err}')
+                if table is not None:
+                    midExposure = frameInfo.UtcMidExposureTimestampLo + (frameInfo.UtcMidExposureTimestampHi << 32)
+                    table.write(frameNumber, midExposure, frameInfo.Exposure, status)
+
+            if outputFormat == 'fits':
+                if dtype == np.uint16:
+                    # Unsigned to BZERO offset signed: flipping the top bit is the same as subtracting 32768
+                    np.bitwise_xor(target, 0x8000, out=bigEndian[:n], casting='unsafe')
+                else:
+                    np.copyto(bigEndian[:n], target)
+                fitsFile.write(memoryview(bigEndian[:n]).cast('B'))
+            elif outputFormat == 'chunks':
+                np.save(os.path.join(output, f'chunk_{chunkNumber:05d}.npy'), target)
+            else:
+                target.flush()
+                del target
+
+        if fitsFile is not None:
+            fitsFile.write(b'\0' * (-fitsFile.tell() % FITS_BLOCK_BYTES))
+    finally:
+        if fitsFile is not None:
+            fitsFile.close()
+        if table is not None:
+            table.close()
+
+    seconds = time.perf_counter() - startTime
+    numBytes = numFrames * imageShape[0] * imageShape[1] * dtype.itemsize
+    return {'frames': numFrames, 'bytes': numBytes, 'seconds': seconds,
+            'MBPerSecond': numBytes / seconds / 1e6 if seconds > 0 else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert the frames of an ADV file to .npy, FITS or npy chunks')
+    parser.add_argument('file', help='the ADV file')
+    parser.add_argument('output', help='a .npy or .fits file, or a directory for npy chunks')
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default=None,
+                        help='output format (by default implied by the output name)')
+    parser.add_argument('--calibration', action='store_true', help='export the CALIBRATION frames')
+    parser.add_argument('--start', type=int, default=0)
+    parser.add_argument('--stop', type=int, default=None)
+    parser.add_argument('--step', type=int, default=1)
+    parser.add_argument('--chunk-size', type=int, default=256, help='frames read and written at a time')
+    parser.add_argument('--no-side-table', action='store_true', help='do not write the frames.csv side table')
+    parser.add_argument('--backend', default='auto', choices=('auto', 'native', 'mmap', 'process'))
+    parser.add_argument('--output-dtype', default='uint16', choices=OUTPUT_DTYPES, help='pixel type written')
+    parser.add_argument('--scale-to-16-bit', action='store_true',
+                        help='multiply pixels of files with less than 16 bits/pixel up to the 16 bit range')
+    args = parser.parse_args()
+
+    rdr = Adv2reader(args.file, backend=args.backend, outputDtype=args.output_dtype,
+                     scaleTo16Bit=args.scale_to_16_bit)
+    try:
+        stream = StreamId.Calibration if args.calibration else StreamId.Main
+        result = exportFrames(rdr, args.output, args.format, stream, args.start, args.stop, args.step,
+                              chunkSize=args.chunk_size, sideTable=not args.no_side_table)
+    finally:
+        rdr.closeFile()
+    print(f'{result["frames"]} frames ({result["bytes"] / 1e6:.1f} MB) written to {args.output} '
+          f'in {result["seconds"]:.2f} s ({result["MBPerSecond"] or 0:.0f} MB/s)')
+
+
+if __name__ == '__main__':
+    main()
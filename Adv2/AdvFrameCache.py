@@ -0,0 +1,72 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# We use type hinting so that it is easy to see the intent as matching the C++/C# code
+
+# A least-recently-used cache of decoded frames for Adv2reader (see Adv2reader.enableFrameCache()).
+# The cache is bounded by the number of bytes of pixel data it holds rather than by the number of frames.
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+from Adv2.Adv import AdvFrameInfo
+
+
+class AdvFrameCache:
+    def __init__(self, maxBytes: int):
+        self.maxBytes = maxBytes
+        self.currentBytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # key -> (pixels, frameInfo, status). The entries are private copies and the pixels are read-only.
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Tuple[np.ndarray, AdvFrameInfo, Dict[str, any]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, pixels: np.ndarray, frameInfo: AdvFrameInfo, status: Dict[str, any]):
+        # pixels must be a private (read-only) copy: it is handed out again on later hits
+        if pixels.nbytes > self.maxBytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.currentBytes -= self._entries.pop(key)[0].nbytes
+            self._entries[key] = (pixels, frameInfo, status)
+            self.currentBytes += pixels.nbytes
+            while self.currentBytes > self.maxBytes:
+                _, (evictedPixels, _, _) = self._entries.popitem(last=False)
+                self.currentBytes -= evictedPixels.nbytes
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.currentBytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'currentBytes': self.currentBytes,
+            'maxBytes': self.maxBytes,
+        }
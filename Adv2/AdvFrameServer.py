@@ -0,0 +1,522 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# We use type hinting so that it is easy to see the intent as matching the C++/C# code
+
+# A frame server lets several processes (a live display, a photometry run, a recording checker, ...) share the
+# frames of one file without each of them decoding every frame. AdvFrameServer owns the Adv2reader and decodes
+# the frames, in order, straight into a ring of slots in a multiprocessing.shared_memory block. Next to each slot
+# an index record holds the frame number, the frame info fields (FRAME_INFO_DTYPE) and the status tags (as JSON).
+# Any number of AdvFrameClient processes attach to the block by its name and get the images as read-only views of
+# the ring, so no pixel is copied or pickled. The ring holds the images in the outputDtype of the server's reader,
+# which the header records for the clients.
+#
+# Each client keeps a cursor in the block: the first frame it may still be using. The server does not overwrite a
+# slot until every client has moved past the frame in it, so a slow client holds the server back (back-pressure)
+# rather than missing frames. A client that joins while the server is running starts at the next frame to be
+# published; to be sure that clients see every frame, have the server wait for them (waitForClients).
+# A client process that dies without closing is noticed (its process no longer exists) and its entry is freed.
+#
+# The block has no lock: the server writes a slot and its index record, then the slot's sequence number, and only
+# then increments the count of published frames. Readers and the writer wait by polling with a short sleep.
+#
+#     server = AdvFrameServer(file_path, name='adv-frames', slots=32)       # in the process that decodes
+#     server.serve(waitForClients=2)
+#     server.close()
+#
+#     client = AdvFrameClient('adv-frames')                                   # in each consumer process
+#     for frameNo, image, frameInfo, status in client.frames():
+#         ...
+#     client.close()
+#
+#     python -m Adv2.AdvFrameServer path/to/your/file.adv --name adv-frames --slots 32 --wait-for-clients 2
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from Adv2.Adv import AdvFrameInfo, StreamId
+from Adv2.Adv2File import Adv2reader, FRAME_INFO_DTYPE, OUTPUT_DTYPES
+from Adv2.AdvError import AdvLibException
+
+FRAME_SERVER_MAGIC = 0x32534652_46564441  # 'ADVFRFS2'
+
+# Values of the header's state field
+STATE_WAITING = 0   # waiting for clients, nothing published yet
+STATE_SERVING = 1
+STATE_FINISHED = 2  # every frame has been published
+STATE_FAILED = 3    # the server stopped on an error (see the header's error field)
+STATE_CLOSED = 4    # the server has closed the block
+
+HEADER_DTYPE = np.dtype([
+    ('magic', np.uint64), ('serverPid', np.int64), ('width', np.int64), ('height', np.int64),
+    ('slots', np.int64), ('maxClients', np.int64), ('statusBytes', np.int64), ('frameCount', np.int64),
+    ('published', np.int64), ('state', np.int64), ('slotTableOffset', np.int64), ('pixelsOffset', np.int64),
+    ('stream', 'S16'), ('dtype', 'S8'), ('filename', 'S1024'), ('error', 'S1024'),
+])
+
+# pid 0 marks a free entry; cursor is the first sequence number the client may still be using
+CLIENT_DTYPE = np.dtype([('pid', np.int64), ('cursor', np.int64)])
+
+# Polling intervals (seconds) while waiting for frames or for free slots
+MIN_POLL_SECONDS = 0.0002
+MAX_POLL_SECONDS = 0.005
+
+# How often (seconds) a blocked server or client checks that the processes it waits on still exist
+LIVENESS_CHECK_SECONDS = 1.0
+
+_trackerLock = threading.Lock()
+
+
+def _slotDtype(statusBytes: int) -> np.dtype:
+    # seq is the sequence number of the frame held in the slot (-1 while the slot is being written)
+    return np.dtype([('seq', np.int64), ('frameNumber', np.int64), ('statusLength', np.int64),
+                     ('frameInfo', FRAME_INFO_DTYPE), ('status', f'S{statusBytes}')], align=True)
+
+
+def _aligned(offset: int, alignment: int = 64) -> int:
+    return -(-offset // alignment) * alignment
+
+
+def _layout(width: int, height: int, slots: int, maxClients: int, statusBytes: int,
+            dtype: np.dtype) -> Tuple[int, int, int, int]:
+    # (clientTableOffset, slotTableOffset, pixelsOffset, totalBytes) of a frame server block
+    clientTableOffset = _aligned(HEADER_DTYPE.itemsize)
+    slotTableOffset = _aligned(clientTableOffset + maxClients * CLIENT_DTYPE.itemsize)
+    pixelsOffset = _aligned(slotTableOffset + slots * _slotDtype(statusBytes).itemsize)
+    return clientTableOffset, slotTableOffset, pixelsOffset, pixelsOffset + slots * width * height * dtype.itemsize
+
+
+@contextmanager
+def _untracked(name: str):
+    # Before Python 3.13 every process that opens a block registers it with its resource tracker, which unlinks
+    # the block when that process exits --- while the other processes are still using it --- and unlinking a
+    # block unregisters it. While this is in effect neither happens for this one block (the tracker may be
+    # shared with the server, so unregistering a block it never registered would disturb it).
+    from multiprocessing import resource_tracker
+    trackedName = name if os.name == 'nt' or name.startswith('/') else '/' + name
+
+    def skipping(function):
+        return lambda rname, rtype: None if (rname, rtype) == (trackedName, 'shared_memory') \
+            else function(rname, rtype)
+    with _trackerLock:
+        register, unregister = resource_tracker.register, resource_tracker.unregister
+        resource_tracker.register, resource_tracker.unregister = skipping(register), skipping(unregister)
+        try:
+            yield
+        finally:
+            resource_tracker.register, resource_tracker.unregister = register, unregister
+
+
+def _attachSharedMemory(name: str, create: bool = False, size: int = 0,
+                        track: Optional[bool] = None) -> shared_memory.SharedMemory:
+    # Opens (or creates) a block. Only the process that owns a block should track it: by default that is the
+    # process that creates it. The client markers are created untracked because the server may remove them.
+    if track is None:
+        track = create
+    if track:
+        return shared_memory.SharedMemory(name=name, create=create, size=size)
+    try:
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    except TypeError:
+        pass
+    with _untracked(name):
+        return shared_memory.SharedMemory(name=name, create=create, size=size)
+
+
+def _unlinkUntracked(memory: shared_memory.SharedMemory):
+    # Unlinks a block opened with track=False
+    if sys.version_info >= (3, 13):
+        memory.unlink()
+        return
+    with _untracked(memory.name):
+        memory.unlink()
+
+
+def _removeMarker(name: str):
+    # Removes a client marker block left behind by a client that did not close (if it is still there)
+    try:
+        marker = _attachSharedMemory(name)
+    except FileNotFoundError:
+        return
+    marker.close()
+    _unlinkUntracked(marker)
+
+
+def _processAlive(pid: int) -> bool:
+    if os.name == 'nt':
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        exitCode = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(exitCode))
+        kernel32.CloseHandle(handle)
+        return exitCode.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    # A child process that has exited but not been waited for (a zombie) still accepts signals
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rpartition(')')[2].split()[0] not in ('Z', 'X')
+    except (OSError, IndexError):
+        return True
+
+
+class _FrameServerBlock:
+    # numpy views of the header, client table, slot table and pixel ring of a frame server block
+    def __init__(self, memory: shared_memory.SharedMemory, width: int, height: int, slots: int, maxClients: int,
+                 statusBytes: int, dtype: np.dtype):
+        self.memory = memory
+        clientTableOffset, slotTableOffset, pixelsOffset, _ = _layout(width, height, slots, maxClients, statusBytes,
+                                                                      dtype)
+        self.header = np.ndarray((), dtype=HEADER_DTYPE, buffer=memory.buf)
+        self.clients = np.ndarray((maxClients,), dtype=CLIENT_DTYPE, buffer=memory.buf, offset=clientTableOffset)
+        self.slotTable = np.ndarray((slots,), dtype=_slotDtype(statusBytes), buffer=memory.buf,
+                                    offset=slotTableOffset)
+        self.ring = np.ndarray((slots, height, width), dtype=dtype, buffer=memory.buf, offset=pixelsOffset)
+
+    def release(self):
+        # The views must be gone before the shared memory can be closed
+        self.header = self.clients = self.slotTable = self.ring = None
+
+
+class AdvFrameServer:
+    def __init__(self, filename: str, name: Optional[str] = None, slots: int = 16, maxClients: int = 8,
+                 backend: str = 'auto', roi: Optional[Tuple[int, int, int, int]] = None, statusBytes: int = 4096,
+                 outputDtype: str = 'uint16', scaleTo16Bit: bool = False):
+        # name is the name of the shared memory block the clients attach to (a unique name is made up if it is
+        # None; see self.name). slots is the number of frames the ring holds. With roi=(y0, y1, x0, x1) only
+        # that window of each frame is served. statusBytes bounds the size of the JSON status of one frame.
+        # outputDtype and scaleTo16Bit are passed to the Adv2reader and give the dtype of the served images.
+        if slots < 2:
+            raise AdvLibException(f'slots must be at least 2 but was {slots}')
+        if maxClients < 1:
+            raise AdvLibException(f'maxClients must be at least 1 but was {maxClients}')
+        self._reader = Adv2reader(filename, backend=backend, outputDtype=outputDtype, scaleTo16Bit=scaleTo16Bit)
+        try:
+            self._roi = self._reader.checkRoi(roi)
+            self.Height, self.Width = self._reader.imageShape(self._roi)
+            self.dtype = self._reader.outputDtype
+            self.slots = slots
+            self.maxClients = maxClients
+            self.statusBytes = statusBytes
+            totalBytes = _layout(self.Width, self.Height, slots, maxClients, statusBytes, self.dtype)[3]
+            memory = _attachSharedMemory(name, create=True, size=totalBytes)
+        except BaseException:
+            self._reader.closeFile()
+            raise
+        self.name = memory.name
+        self._block = _FrameServerBlock(memory, self.Width, self.Height, slots, maxClients, statusBytes, self.dtype)
+        # Markers left by clients of an earlier server of the same name that did not close
+        for k in range(maxClients):
+            _removeMarker(self._markerName(k))
+
+        _, slotTableOffset, pixelsOffset, _ = _layout(self.Width, self.Height, slots, maxClients, statusBytes,
+                                                      self.dtype)
+        header = self._block.header
+        header['serverPid'] = os.getpid()
+        header['width'] = self.Width
+        header['height'] = self.Height
+        header['slots'] = slots
+        header['maxClients'] = maxClients
+        header['statusBytes'] = statusBytes
+        header['dtype'] = self.dtype.str.encode('ascii')
+        header['slotTableOffset'] = slotTableOffset
+        header['pixelsOffset'] = pixelsOffset
+        header['filename'] = os.path.abspath(filename).encode('utf-8')[:1024]
+        header['state'] = STATE_WAITING
+        self._block.clients['pid'] = 0
+        self._block.slotTable['seq'] = -1
+        header['magic'] = FRAME_SERVER_MAGIC  # Last, so a client never sees a half initialized header
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def clientCount(self) -> int:
+        return len(self._activeClients())
+
+    def _markerName(self, k: int) -> str:
+        return f'{self.name}_client{k}'
+
+    def _activeClients(self) -> np.ndarray:
+        # Indexes of the client table entries in use
+        return np.flatnonzero(self._block.clients['pid'])
+
+    def _checkClientsAlive(self, entries: np.ndarray):
+        # Frees the entries of clients whose process has gone without closing: the entry is cleared before its
+        # marker is removed, so a new client that claims the entry again is never mistaken for the dead one
+        for k in entries.tolist():
+            pid = int(self._block.clients['pid'][k])
+            if pid and not _processAlive(pid):
+                self._block.clients['pid'][k] = 0
+                _removeMarker(self._markerName(k))
+
+    def _waitUntil(self, ready, deadline: Optional[float], waitingFor: str):
+        # Polls ready() (which returns the client entries being waited on, or None when the wait is over)
+        delay = MIN_POLL_SECONDS
+        nextLivenessCheck = time.monotonic() + LIVENESS_CHECK_SECONDS
+        while True:
+            blocking = ready()
+            if blocking is None:
+                return
+            now = time.monotonic()
+            if deadline is not None and now > deadline:
+                raise AdvLibException(f'Timed out waiting for {waitingFor}')
+            if now > nextLivenessCheck:
+                self._checkClientsAlive(blocking)
+                nextLivenessCheck = now + LIVENESS_CHECK_SECONDS
+            time.sleep(delay)
+            delay = min(2 * delay, MAX_POLL_SECONDS)
+
+    def serve(self, stream: StreamId = StreamId.Main, start: int = 0, stop: Optional[int] = None, step: int = 1,
+              frames: Union[slice, Sequence[int], None] = None, waitForClients: int = 0,
+              timeout: Optional[float] = None) -> int:
+        # Decodes the frames in range(start, stop, step) (or in frames) into the ring, in order, and returns the
+        # number published. First waits until waitForClients clients have attached. timeout (seconds) bounds
+        # each wait, for clients to attach or for a slot to be freed.
+        header = self._block.header
+        if header['state'] != STATE_WAITING:
+            raise AdvLibException('A frame server can only serve once')
+        try:
+            frameNumbers = self._reader.frameNumbers(stream, start, stop, step, frames).tolist()
+            header['stream'] = stream.name.encode('utf-8')
+            header['frameCount'] = len(frameNumbers)
+
+            def enoughClients():
+                active = self._activeClients()
+                return None if active.size >= waitForClients else active
+            self._waitUntil(enoughClients, None if timeout is None else time.monotonic() + timeout,
+                            f'{waitForClients} clients')
+            header['state'] = STATE_SERVING
+
+            fieldNames = FRAME_INFO_DTYPE.names
+            slotTable = self._block.slotTable
+            for seq, frameNumber in enumerate(frameNumbers):
+                def slotFree():
+                    # Writing seq overwrites frame seq - slots, which every client must have moved past
+                    active = self._activeClients()
+                    blocking = active[self._block.clients['cursor'][active] <= seq - self.slots]
+                    return blocking if blocking.size else None
+                self._waitUntil(slotFree, None if timeout is None else time.monotonic() + timeout,
+                                'the clients to free a slot')
+
+                slot = seq % self.slots
+                slotTable['seq'][slot] = -1
+                err, _, frameInfo, status = self._reader.getImageAndStatusData(
+                    frameNumber, stream, self._block.ring[slot], self._roi)
+                if err:
+                    raise AdvLibException(f'{stream.name} frame {frameNumber}: {err}')
+                statusText = json.dumps(status).encode('utf-8')
+                if len(statusText) > self.statusBytes:
+                    raise AdvLibException(f'The status of {stream.name} frame {frameNumber} needs '
+                                          f'{len(statusText)} bytes but statusBytes is {self.statusBytes}')
+                slotTable['frameNumber'][slot] = frameNumber
+                slotTable['frameInfo'][slot] = tuple([getattr(frameInfo, name) for name in fieldNames])
+                slotTable['statusLength'][slot] = len(statusText)
+                slotTable['status'][slot] = statusText
+                slotTable['seq'][slot] = seq
+                header['published'] = seq + 1
+        except BaseException as exc:
+            header['error'] = str(exc).encode('utf-8')[:1024]
+            header['state'] = STATE_FAILED
+            raise
+        header['state'] = STATE_FINISHED
+        return len(frameNumbers)
+
+    def close(self):
+        # Clients that are attached keep their mapping of the block and can still read what was published
+        if self._block is None:
+            return
+        if self._block.header['state'] != STATE_FAILED:
+            self._block.header['state'] = STATE_CLOSED
+        memory = self._block.memory
+        self._block.release()
+        self._block = None
+        memory.close()
+        memory.unlink()
+        self._reader.closeFile()
+
+
+class AdvFrameClient:
+    def __init__(self, name: str, timeout: Optional[float] = 10.0):
+        # Attaches to the frame server block called name, waiting up to timeout seconds for it to appear
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                memory = _attachSharedMemory(name)
+                header = np.ndarray((), dtype=HEADER_DTYPE, buffer=memory.buf)
+                ready = header['magic'] == FRAME_SERVER_MAGIC
+                del header
+                if ready:
+                    break
+                memory.close()
+            except FileNotFoundError:
+                pass
+            if deadline is not None and time.monotonic() > deadline:
+                raise AdvLibException(f'There is no frame server called {name}')
+            time.sleep(MAX_POLL_SECONDS)
+
+        header = np.ndarray((), dtype=HEADER_DTYPE, buffer=memory.buf)
+        self.Width = int(header['width'])
+        self.Height = int(header['height'])
+        self.slots = int(header['slots'])
+        self.dtype = np.dtype(header['dtype'].item().decode('ascii'))
+        self.filename = header['filename'].item().decode('utf-8')
+        self._serverPid = int(header['serverPid'])
+        maxClients, statusBytes = int(header['maxClients']), int(header['statusBytes'])
+        del header
+        self._block = _FrameServerBlock(memory, self.Width, self.Height, self.slots, maxClients, statusBytes,
+                                        self.dtype)
+        self._ring = self._block.ring.view()
+        self._ring.setflags(write=False)
+
+        # A client claims an entry of the client table by creating a small marker block: creating a named block
+        # either succeeds or fails atomically, so two clients can never claim the same entry
+        self._marker = None
+        for k in range(maxClients):
+            try:
+                self._marker = _attachSharedMemory(f'{name}_client{k}', create=True, size=8, track=False)
+            except FileExistsError:
+                continue
+            self._entry = k
+            break
+        if self._marker is None:
+            self._release()
+            raise AdvLibException(f'The frame server {name} already has {maxClients} clients')
+
+        # Start at the next frame to be published (the frame being written now, if any, is not waited for).
+        # published is read again once the entry is in use: until then the server does not wait for this client
+        # and may have published (and overwritten) more frames.
+        self._block.clients['cursor'][self._entry] = int(self._block.header['published'])
+        self._block.clients['pid'][self._entry] = os.getpid()
+        self._seq = int(self._block.header['published'])
+        self._block.clients['cursor'][self._entry] = self._seq
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def frameCount(self) -> int:
+        # The number of frames the server is publishing (0 until it has started)
+        return int(self._block.header['frameCount'])
+
+    @property
+    def stream(self) -> str:
+        return self._block.header['stream'].item().decode('utf-8')
+
+    def frames(self, timeout: Optional[float] = None) -> Iterator[Tuple[int, np.ndarray, AdvFrameInfo,
+                                                                        Dict[str, any]]]:
+        # Yields (frameNo, image, frameInfo, status) for each frame the server publishes from now on, in order.
+        # The image is a read-only view of the ring and is only valid until the next frame is requested ---
+        # copy it to keep it. timeout (seconds) bounds the wait for each frame. An AdvLibException is raised if
+        # the server fails or disappears.
+        fieldNames = FRAME_INFO_DTYPE.names
+        while True:
+            if not self._waitForFrame(self._seq, timeout):
+                return
+            slot = self._seq % self.slots
+            record = self._block.slotTable[slot]
+            if record['seq'] != self._seq:
+                raise AdvLibException(f'Frame {self._seq} of the frame server was overwritten before it was read')
+            frameInfo = AdvFrameInfo()
+            for name, value in zip(fieldNames, record['frameInfo'].item()):
+                setattr(frameInfo, name, value)
+            status = json.loads(record['status'][:int(record['statusLength'])].decode('utf-8'))
+            yield int(record['frameNumber']), self._ring[slot], frameInfo, status
+            self._seq += 1
+            self._block.clients['cursor'][self._entry] = self._seq
+
+    def _waitForFrame(self, seq: int, timeout: Optional[float]) -> bool:
+        # True once frame seq has been published, False if the server has finished without publishing it
+        header = self._block.header
+        deadline = None if timeout is None else time.monotonic() + timeout
+        nextLivenessCheck = time.monotonic() + LIVENESS_CHECK_SECONDS
+        delay = MIN_POLL_SECONDS
+        while True:
+            # The state is read before published: once the state is final, so is published
+            state = int(header['state'])
+            if header['published'] > seq:
+                return True
+            if state == STATE_FAILED:
+                raise AdvLibException(f'The frame server failed: {header["error"].item().decode("utf-8")}')
+            if state in (STATE_FINISHED, STATE_CLOSED):
+                return False
+            now = time.monotonic()
+            if deadline is not None and now > deadline:
+                raise AdvLibException(f'Timed out waiting for frame {seq} of the frame server')
+            if now > nextLivenessCheck:
+                if not _processAlive(self._serverPid):
+                    raise AdvLibException('The frame server process has stopped')
+                nextLivenessCheck = now + LIVENESS_CHECK_SECONDS
+            time.sleep(delay)
+            delay = min(2 * delay, MAX_POLL_SECONDS)
+
+    def close(self):
+        # Images yielded by frames() must not be used after this
+        if self._block is None:
+            return
+        self._block.clients['pid'][self._entry] = 0
+        self._marker.close()
+        _unlinkUntracked(self._marker)
+        self._release()
+
+    def _release(self):
+        memory = self._block.memory
+        self._block.release()
+        self._block = None
+        self._ring = None
+        try:
+            memory.close()
+        except BufferError:
+            pass  # An image yielded by frames() is still referenced: the mapping goes when it does
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the frames of an ADV file to other processes through '
+                                                 'shared memory')
+    parser.add_argument('file', help='the .adv or .aav file to serve')
+    parser.add_argument('--name', default=None, help='name of the shared memory block (default: made up)')
+    parser.add_argument('--slots', type=int, default=16, help='frames held in the ring (default 16)')
+    parser.add_argument('--max-clients', type=int, default=8)
+    parser.add_argument('--wait-for-clients', type=int, default=0,
+                        help='clients that must attach before the first frame is published')
+    parser.add_argument('--stream', default='Main', choices=[stream.name for stream in StreamId])
+    parser.add_argument('--start', type=int, default=0)
+    parser.add_argument('--stop', type=int, default=None)
+    parser.add_argument('--backend', default='auto', choices=('auto', 'native', 'mmap', 'process'))
+    parser.add_argument('--output-dtype', default='uint16', choices=OUTPUT_DTYPES, help='pixel type served')
+    parser.add_argument('--scale-to-16-bit', action='store_true',
+                        help='multiply pixels of files with less than 16 bits/pixel up to the 16 bit range')
+    args = parser.parse_args()
+
+    with AdvFrameServer(args.file, args.name, args.slots, args.max_clients, args.backend,
+                        outputDtype=args.output_dtype, scaleTo16Bit=args.scale_to_16_bit) as server:
+        print(f'Serving {args.file} as {server.name}', flush=True)
+        count = server.serve(StreamId[args.stream], args.start, args.stop, waitForClients=args.wait_for_clients)
+        print(f'{count} frames published')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# We use type hinting so that it is easy to see the intent as matching the C++/C# code
+
+# Performance counters for Adv2reader (see Adv2reader.enableInstrumentation()). The reader records how long each
+# phase of its work takes:
+#   'decode'           reading a frame and decoding its pixels (including filling in the frame information)
+#   'convert'          narrowing, scaling or copying the decoded pixels into the image that is returned
+#   'statusTags'       fetching the status tag values of a frame
+#   'timestampFormat'  formatting the SystemTime status tag as a string
+#   'cacheLookup'      looking a frame up in the frame cache (see Adv2reader.enableFrameCache())
+#   'stackRead'        reading a stack of frames (getMainImageStack() and getCalibImageStack())
+#   'timestamps'       getTimestamps()
+#   'statusTable'      getStatusTable()
+# For each phase the number of calls, the total seconds and the bytes produced (pixel bytes for 'decode' and
+# 'stackRead') are accumulated. An optional tracer is called with (phase, seconds, bytes) after each phase,
+# so the measurements can also be forwarded to another metrics system as they are made.
+# When instrumentation is not enabled the reader only checks an attribute for None, so it costs next to nothing.
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+# tracer(phase, seconds, bytes)
+Tracer = Callable[[str, float, int], None]
+
+clock = time.perf_counter
+
+
+class AdvInstrumentation:
+    def __init__(self, tracer: Optional[Tracer] = None):
+        self.tracer = tracer
+        self.cacheHits = 0
+        self.cacheMisses = 0
+
+        # phase -> [calls, seconds, bytes]
+        self._phases: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def record(self, phase: str, seconds: float, numBytes: int = 0):
+        with self._lock:
+            totals = self._phases.get(phase)
+            if totals is None:
+                totals = self._phases[phase] = [0, 0.0, 0]
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] += numBytes
+        if self.tracer is not None:
+            self.tracer(phase, seconds, numBytes)
+
+    def recordCacheLookup(self, seconds: float, hit: bool):
+        with self._lock:
+            if hit:
+                self.cacheHits += 1
+            else:
+                self.cacheMisses += 1
+        self.record('cacheLookup', seconds)
+
+    def reset(self):
+        with self._lock:
+            self._phases.clear()
+            self.cacheHits = 0
+            self.cacheMisses = 0
+
+    def stats(self) -> Dict[str, any]:
+        # Returns {'phases': {phase: {'calls', 'seconds', 'bytes'}}, 'bytesDecoded', 'framesDecoded',
+        # 'cacheHits', 'cacheMisses'}
+        with self._lock:
+            phases = {phase: {'calls': calls, 'seconds': seconds, 'bytes': numBytes}
+                      for phase, (calls, seconds, numBytes) in self._phases.items()}
+            decode = self._phases.get('decode', [0, 0.0, 0])
+            return {
+                'phases': phases,
+                'framesDecoded': decode[0],
+                'bytesDecoded': decode[2],
+                'cacheHits': self.cacheHits,
+                'cacheMisses': self.cacheMisses,
+            }
@@ -11,11 +11,14 @@
 # a module with the methods defined at the top level, such as this)
 
 
-import pathlib
+import functools
+import os
 import platform
-from ctypes import CDLL, byref, c_char_p, c_int, c_uint, pointer, c_int8, c_int16, c_int32, c_int64, c_float
-from struct import pack, unpack
-from typing import Tuple
+import struct
+import threading
+from ctypes import CDLL, POINTER, Structure, addressof, byref, c_bool, c_char_p, c_float, c_int, c_int8, c_int16, \
+    c_int32, c_int64, c_uint, c_uint8, c_uint32, c_uint64, create_string_buffer, memset, sizeof
+from typing import Optional, Tuple
 
 from Adv2.Adv import AdvFileInfo, AdvFrameInfo, StreamId, TagPairType, Adv2TagType
 from Adv2.AdvError import S_OK, ResolveErrorMessage, AdvLibException
@@ -24,101 +27,215 @@ from Adv2.AdvError import S_OK, ResolveErrorMessage, AdvLibException
 # This mask is used to remove the sign bits from the 32 bit ret_val when it is converted to a Python int
 RET_VAL_MASK = 0xffffffff
 
-# The following code/tests will run at import time (startup) and raise/throw an exception if we can cannot
-# distinguish Windows 64bit/32bit from Mac 64bit/32bit from Linux 64bit/32bit or find libraries.  We
-# allow such an event to be a fatal error.
-
-DLL_folder = pathlib.Path(__file__).parent / 'Adv2DLLlibs'
-
-if platform.system().lower().startswith('windows'):
-    # We're running on a on a Windows system
-    if platform.architecture()[0] == '64bit':
-        # The following line generates a platform agnostic filepath (deals with / \ issues)
-        file_path = str(DLL_folder / 'AdvLib.Core64.dll')
-        advDLL = CDLL(file_path)
-    elif platform.architecture()[0] == '32bit':
-        file_path = str(DLL_folder / 'AdvLib.Core32.dll')
-        advDLL = CDLL(file_path)
-    else:
-        raise ImportError("System is neither 64 bit nor 32 bit.")
-elif platform.system().lower().startswith('darwin'):
-    # We're running on MacOS
-    if platform.architecture()[0] == '64bit':
-        # The following line generates a platform agnostic filepath (deals with / \ issues)
-        file_path = str(DLL_folder / 'libAdvCore.dylib')
-        advDLL = CDLL(file_path)
-    elif platform.architecture()[0] == '32bit':
-        raise ImportError("No 32 bit library available for MacOS")
-    else:
+DLL_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Adv2DLLlibs')
+
+# If set, this environment variable gives the path of the native library to load instead of the bundled one
+LIBRARY_PATH_ENV_VAR = 'ADV2_LIBRARY_PATH'
+
+# The native library is loaded by the first call that needs it (see loadLibrary()), not when this module is
+# imported, so importing the package stays cheap for programs that never read a frame with the native library.
+_advDLL: Optional[CDLL] = None
+_loadError: Optional[Exception] = None
+_libraryPathOverride: Optional[str] = None
+
+
+# The C structures filled in by AdvOpenFile() and AdvVer2_GetFramePixels(). Their fields have the same names as
+# those of the AdvFileInfo and AdvFrameInfo dataclasses (in Adv.py) that the values are copied into.
+class AdvFileInfoStruct(Structure):
+    _fields_ = [
+        ('Width', c_int32), ('Height', c_int32),
+        ('CountMainFrames', c_int32), ('CountCalibrationFrames', c_int32),
+        ('DataBpp', c_int32), ('MaxPixelValue', c_int32),
+        ('MainClockFrequency', c_uint64), ('MainStreamAccuracy', c_int32),
+        ('CalibrationClockFrequency', c_uint64), ('CalibrationStreamAccuracy', c_int32),
+        ('MainStreamTagsCount', c_uint8), ('CalibrationStreamTagsCount', c_uint8),
+        ('SystemMetadataTagsCount', c_uint8), ('UserMetadataTagsCount', c_uint8),
+        ('UtcTimestampAccuracyInNanoseconds', c_uint64),
+        ('IsColourImage', c_bool),
+        ('ImageLayoutsCount', c_int32), ('StatusTagsCount', c_int32),
+        ('ImageSectionTagsCount', c_int32), ('ErrorStatusTagId', c_int32),
+    ]
+
+
+class AdvFrameInfoStruct(Structure):
+    _fields_ = [
+        ('StartTicksLo', c_uint32), ('StartTicksHi', c_uint32),
+        ('EndTicksLo', c_uint32), ('EndTicksHi', c_uint32),
+        ('UtcMidExposureTimestampLo', c_uint32), ('UtcMidExposureTimestampHi', c_uint32),
+        ('Exposure', c_uint32),
+        ('Gamma', c_float), ('Gain', c_float), ('Shutter', c_float), ('Offset', c_float),
+        ('GPSTrackedSatellites', c_uint8), ('GPSAlmanacStatus', c_uint8),
+        ('GPSFixStatus', c_uint8), ('GPSAlmanacOffset', c_int8),
+        ('VideoCameraFrameIdLo', c_uint32), ('VideoCameraFrameIdHi', c_uint32),
+        ('HardwareTimerFrameIdLo', c_uint32), ('HardwareTimerFrameIdHi', c_uint32),
+        ('SystemTimestampLo', c_uint32), ('SystemTimestampHi', c_uint32),
+        ('ImageLayoutId', c_uint32), ('RawDataBlockSize', c_uint32),
+    ]
+
+
+FILE_INFO_FIELDS = [name for name, _ in AdvFileInfoStruct._fields_]
+FRAME_INFO_FIELDS = [name for name, _ in AdvFrameInfoStruct._fields_]
+
+# The same layout as AdvFrameInfoStruct (native alignment) for struct: all its fields are read in a single call
+FRAME_INFO_LAYOUT = struct.Struct('@' + ''.join(fieldType._type_ for _, fieldType in AdvFrameInfoStruct._fields_))
+
+# The argument and return types of the library functions used here. They are declared once, when the library
+# is loaded, so that ctypes checks and converts the arguments of every call.
+LIBRARY_PROTOTYPES = {
+    'AdvOpenFile': ([c_char_p, POINTER(AdvFileInfoStruct)], c_int),
+    'AdvCloseFile': ([], c_int),
+    'AdvGetFileVersion': ([c_char_p], c_int),
+    'AdvVer2_GetFramePixels': ([c_int, c_int, POINTER(c_uint), POINTER(AdvFrameInfoStruct), POINTER(c_int)],
+                               c_int),
+    'AdvVer2_GetTagPairSizes': ([c_int, c_int, POINTER(c_int), POINTER(c_int)], c_int),
+    'AdvVer2_GetTagPairValues': ([c_int, c_int, c_char_p, c_char_p], c_int),
+    'AdvVer2_GetIndexEntries': ([POINTER(c_int), POINTER(c_int)], c_int),
+    'AdvVer2_GetStatusTagNameSize': ([c_uint, POINTER(c_int)], c_int),
+    'AdvVer2_GetStatusTagInfo': ([c_uint, c_char_p, POINTER(c_int)], c_int),
+    'AdvVer2_GetStatusTagUInt8': ([c_uint, POINTER(c_int8)], c_int),
+    'AdvVer2_GetStatusTag16': ([c_uint, POINTER(c_int16)], c_int),
+    'AdvVer2_GetStatusTag32': ([c_uint, POINTER(c_int32)], c_int),
+    'AdvVer2_GetStatusTag64': ([c_uint, POINTER(c_int64)], c_int),
+    'AdvVer2_GetStatusTagReal': ([c_uint, POINTER(c_float)], c_int),
+    'AdvVer2_GetStatusTagSizeUTF8String': ([c_uint, POINTER(c_int)], c_int),
+    'AdvVer2_GetStatusTagUTF8String': ([c_uint, c_char_p], c_int),
+    'GetLibraryVersion': ([c_char_p], None),
+    'GetLibraryPlatformId': ([c_char_p], None),
+    'GetLibraryBitness': ([], c_int),
+}
+
+
+def setLibraryPath(path: Optional[str]):
+    # Sets the path of the native library to load (None restores the default). Must be called before the
+    # library is first used.
+    global _libraryPathOverride, _loadError
+    if _advDLL is not None:
+        raise AdvLibException('The native ADV library has already been loaded')
+    _libraryPathOverride = path
+    _loadError = None
+
+
+def libraryPath() -> str:
+    # The path set by setLibraryPath(), else the path in the ADV2_LIBRARY_PATH environment variable, else the
+    # bundled library for this platform. An ImportError is raised if we cannot distinguish Windows 64bit/32bit
+    # from Mac 64bit/32bit from Linux 64bit/32bit.
+    if _libraryPathOverride:
+        return _libraryPathOverride
+    if os.environ.get(LIBRARY_PATH_ENV_VAR):
+        return os.environ[LIBRARY_PATH_ENV_VAR]
+
+    system = platform.system().lower()
+    bits = platform.architecture()[0]
+    if bits not in ('64bit', '32bit'):
         raise ImportError("System is neither 64 bit nor 32 bit.")
-elif platform.system().lower().startswith('linux'):
-    # We're running on a linux system
-    if platform.architecture()[0] == '64bit':
-        # The following line generates a platform agnostic filepath (deals with / \ issues)
-        file_path = str(DLL_folder / 'libAdvCore64.so')
-        advDLL = CDLL(file_path)
-    elif platform.architecture()[0] == '32bit':
-        # The following line generates a platform agnostic filepath (deals with / \ issues)
-        file_path = str(DLL_folder / 'libAdvCore32.so')
-
-        advDLL = CDLL(file_path)
-    else:
-        raise ImportError("System is neither 64 bit nor 32 bit.")
-
-
+    # os.path.join() generates a platform agnostic filepath (deals with / \ issues)
+    if system.startswith('windows'):
+        return os.path.join(DLL_folder, 'AdvLib.Core64.dll' if bits == '64bit' else 'AdvLib.Core32.dll')
+    if system.startswith('darwin'):
+        if bits == '32bit':
+            raise ImportError("No 32 bit library available for MacOS")
+        return os.path.join(DLL_folder, 'libAdvCore.dylib')
+    if system.startswith('linux'):
+        return os.path.join(DLL_folder, 'libAdvCore64.so' if bits == '64bit' else 'libAdvCore32.so')
+    raise ImportError(f'No native ADV library available for {platform.system()}')
+
+
+def loadLibrary() -> CDLL:
+    # Loads the native library (once) and declares the prototypes of its functions.
+    # Raises ImportError or OSError if the library cannot be loaded (and the same error again on later calls).
+    global _advDLL, _loadError
+    if _loadError is not None:
+        raise _loadError
+    if _advDLL is None:
+        try:
+            dll = CDLL(libraryPath())
+        except (ImportError, OSError) as error:
+            _loadError = error
+            raise
+        for name, (argtypes, restype) in LIBRARY_PROTOTYPES.items():
+            function = getattr(dll, name)
+            function.argtypes = argtypes
+            function.restype = restype
+        _advDLL = dll
+    return _advDLL
+
+
+def nativeLibraryAvailable() -> bool:
+    # True if the native library can be loaded on this platform (loading it if it has not been loaded yet)
+    try:
+        loadLibrary()
+    except (ImportError, OSError):
+        return False
+    return True
+
+
+def __getattr__(name: str):
+    # advDLL was a module level variable before the library was loaded lazily: keep it working
+    if name == 'advDLL':
+        return loadLibrary()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# The out-parameters of the library calls are allocated once, at module level, and reused by every call.
+# The library holds the open file in process-global state, so only one Adv2reader per process uses this module
+# (a second native reader is refused, see Adv2reader), but that reader can still be used from more than one
+# thread (for example an AsyncAdv2reader's worker thread reading frames while the metadata is read directly).
+# Every call that uses the out-parameters therefore holds _callLock from the library call until its values have
+# been copied out (see _serialized()).
+# The library leaves the fields it has no value for untouched, so the structures are cleared before each call.
+_callLock = threading.RLock()
+_fileInfo = AdvFileInfoStruct()
+_frameInfo = AdvFrameInfoStruct()
+_systemErrorLen = c_int(0)
+_size1 = c_int(0)
+_size2 = c_int(0)
+_tagType = c_int(0)
+_uint8Value = c_int8(0)
+_int16Value = c_int16(0)
+_int32Value = c_int32(0)
+_int64Value = c_int64(0)
+_realValue = c_float(0)
+_stringBuffers = [create_string_buffer(256), create_string_buffer(256)]
+
+
+def _serialized(function):
+    # Decorates a function of this module that uses the module level out-parameters to hold _callLock
+    @functools.wraps(function)
+    def serializedCall(*args, **kwargs):
+        with _callLock:
+            return function(*args, **kwargs)
+    return serializedCall
+
+
+def _stringBuffer(which: int, size: int):
+    # Returns preallocated string buffer number which (0 or 1), grown if needed to hold size bytes and a null
+    if len(_stringBuffers[which]) < size + 1:
+        _stringBuffers[which] = create_string_buffer(size + 1)
+    return _stringBuffers[which]
+
+
+@_serialized
 def AdvOpenFile(filepath: str, fileinfo: AdvFileInfo) -> int:
-    advFileInfoFormat = '6iQiQi4BQ?4i'  # format of AdvFileInfo structure needed by pack() and unpack()
-    # The above format specifies 6*int32 int64 int32 int64 4*uint8 int64 bool 4*uint32
-
-    # Create a C style structure per the supplied format string
-    file_info = pack(advFileInfoFormat,
-                     0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
-
-    # Convert the Python string to an array of bytes (with null terminator)
-    file_path_as_bytes = bytes(filepath + '\0', 'utf-8')
-    fname_ptr = c_char_p(file_path_as_bytes)  # fname_ptr equivalent to: const char* fileName
-
-    # Call into the library with C-compatible arguments
-    ret_val = advDLL.AdvOpenFile(fname_ptr, c_char_p(file_info)) & RET_VAL_MASK
-
-    # Extract the entries from the the C struct file_info into the Python structure fileInfo
-    fileinfo.Width = unpack(advFileInfoFormat, file_info)[0]
-    fileinfo.Height = unpack(advFileInfoFormat, file_info)[1]
-    fileinfo.CountMainFrames = unpack(advFileInfoFormat, file_info)[2]
-    fileinfo.CountCalibrationFrames = unpack(advFileInfoFormat, file_info)[3]
-    fileinfo.DataBpp = unpack(advFileInfoFormat, file_info)[4]
-    fileinfo.MaxPixelValue = unpack(advFileInfoFormat, file_info)[5]
-    fileinfo.MainClockFrequency = unpack(advFileInfoFormat, file_info)[6]
-    fileinfo.MainStreamAccuracy = unpack(advFileInfoFormat, file_info)[7]
-    fileinfo.CalibrationClockFrequency = unpack(advFileInfoFormat, file_info)[8]
-    fileinfo.CalibrationStreamAccuracy = unpack(advFileInfoFormat, file_info)[9]
-    fileinfo.MainStreamTagsCount = unpack(advFileInfoFormat, file_info)[10]
-    fileinfo.CalibrationStreamTagsCount = unpack(advFileInfoFormat, file_info)[11]
-    fileinfo.SystemMetadataTagsCount = unpack(advFileInfoFormat, file_info)[12]
-    fileinfo.UserMetadataTagsCount = unpack(advFileInfoFormat, file_info)[13]
-    fileinfo.UtcTimestampAccuracyInNanoseconds = unpack(advFileInfoFormat, file_info)[14]
-    fileinfo.IsColourImage = unpack(advFileInfoFormat, file_info)[15]
-    fileinfo.ImageLayoutsCount = unpack(advFileInfoFormat, file_info)[16]
-    fileinfo.StatusTagsCount = unpack(advFileInfoFormat, file_info)[17]
-    fileinfo.ImageSectionTagsCount = unpack(advFileInfoFormat, file_info)[18]
-    fileinfo.ErrorStatusTagId = unpack(advFileInfoFormat, file_info)[19]
+    # Convert the Python string to an array of bytes (the library needs a const char* fileName)
+    memset(addressof(_fileInfo), 0, sizeof(_fileInfo))
+    ret_val = loadLibrary().AdvOpenFile(filepath.encode('utf-8'), byref(_fileInfo)) & RET_VAL_MASK
+
+    # Copy the entries from the C struct into the Python structure fileinfo
+    for name in FILE_INFO_FIELDS:
+        setattr(fileinfo, name, getattr(_fileInfo, name))
 
     return ret_val
 
 
 def AdvCloseFile() -> int:
-    return advDLL.AdvCloseFile() & RET_VAL_MASK
+    return loadLibrary().AdvCloseFile() & RET_VAL_MASK
 
 
 def AdvGetFileVersion(filepath: str) -> Tuple[str, int]:
-    if not pathlib.Path(filepath).is_file():
+    if not os.path.isfile(filepath):
         return f'Error - cannot find file: {filepath}', 0
     else:
-        # Convert the Python string to an array of bytes (with null terminator)
-        file_path_as_bytes = bytes(filepath + '\0', 'utf-8')
-        fname_ptr = c_char_p(file_path_as_bytes)  # fname_ptr: const char* fileName
-
-        version_num = advDLL.AdvGetFileVersion(fname_ptr) & RET_VAL_MASK
+        version_num = loadLibrary().AdvGetFileVersion(filepath.encode('utf-8')) & RET_VAL_MASK
 
         if version_num == 0:
             return f'Error - not an FSTF file: {filepath}', 0
@@ -126,165 +243,130 @@ def AdvGetFileVersion(filepath: str) -> Tuple[str, int]:
             return '', version_num
 
 
+@_serialized
 def AdvVer2_GetFramePixels(streamId: StreamId, frameNo: int,
                            pixels: any, frameInfo: AdvFrameInfo, systemErrorLen: int) -> int:
-    advFrameInfoFormat = '7I4f3Bb8I'  # format of AdvFrameInfo needed by pack() and unpack()
-    # The above format specifies 7 * uint32 4 * float32 3 * uchar char 8 * uint32
-    # Create a C style structure per the supplied format string
-    frame_info = pack(advFrameInfoFormat, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-                      0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
-
-    # Call into the library will C-compatible arguments
-    ret_val = advDLL.AdvVer2_GetFramePixels(c_int(streamId.value), c_int(frameNo), pixels,
-                                            c_char_p(frame_info), byref(c_int(systemErrorLen))) & RET_VAL_MASK
-
-    # Unpack the C struct frame_info into the Python struct frameInfo
-    frameInfo.StartTicksLo = unpack(advFrameInfoFormat, frame_info)[0]
-    frameInfo.StartTicksHi = unpack(advFrameInfoFormat, frame_info)[1]
-    frameInfo.EndTicksLo = unpack(advFrameInfoFormat, frame_info)[2]
-    frameInfo.EndTicksHi = unpack(advFrameInfoFormat, frame_info)[3]
-
-    frameInfo.UtcMidExposureTimestampLo = unpack(advFrameInfoFormat, frame_info)[4]
-    frameInfo.UtcMidExposureTimestampHi = unpack(advFrameInfoFormat, frame_info)[5]
-    frameInfo.Exposure = unpack(advFrameInfoFormat, frame_info)[6]
-
-    frameInfo.Gamma = unpack(advFrameInfoFormat, frame_info)[7]
-    frameInfo.Gain = unpack(advFrameInfoFormat, frame_info)[8]
-    frameInfo.Shutter = unpack(advFrameInfoFormat, frame_info)[9]
-    frameInfo.Offset = unpack(advFrameInfoFormat, frame_info)[10]
-
-    frameInfo.GPSTrackedSatellites = unpack(advFrameInfoFormat, frame_info)[11]
-    frameInfo.GPSAlmanacStatus = unpack(advFrameInfoFormat, frame_info)[12]
-    frameInfo.GPSFixStatus = unpack(advFrameInfoFormat, frame_info)[13]
-    frameInfo.GPSAlmanacOffset = unpack(advFrameInfoFormat, frame_info)[14]
-
-    frameInfo.VideoCameraFrameIdLo = unpack(advFrameInfoFormat, frame_info)[15]
-    frameInfo.VideoCameraFrameIdHi = unpack(advFrameInfoFormat, frame_info)[16]
-    frameInfo.HardwareTimerFrameIdLo = unpack(advFrameInfoFormat, frame_info)[17]
-    frameInfo.HardwareTimerFrameIdHi = unpack(advFrameInfoFormat, frame_info)[18]
-
-    frameInfo.SystemTimestampLo = unpack(advFrameInfoFormat, frame_info)[19]
-    frameInfo.SystemTimestampHi = unpack(advFrameInfoFormat, frame_info)[20]
-
-    frameInfo.ImageLayoutId = unpack(advFrameInfoFormat, frame_info)[21]
-    frameInfo.RawDataBlockSize = unpack(advFrameInfoFormat, frame_info)[22]
+    # pixels is a pointer to (or a ctypes array of) Width * Height c_uint
+    _systemErrorLen.value = systemErrorLen
+    memset(addressof(_frameInfo), 0, sizeof(_frameInfo))
+    ret_val = loadLibrary().AdvVer2_GetFramePixels(streamId.value, frameNo, pixels, byref(_frameInfo),
+                                                   byref(_systemErrorLen)) & RET_VAL_MASK
+
+    # Copy the C struct into the Python struct frameInfo (one unpack and one dict update)
+    vars(frameInfo).update(zip(FRAME_INFO_FIELDS, FRAME_INFO_LAYOUT.unpack_from(_frameInfo)))
 
     return ret_val
 
 
+@_serialized
 def AdvVer2_GetTagPairValues(tagPairType: TagPairType, tagId: int) -> Tuple[int, str, str]:
-    # Create big buffers of bytes to hold char string returns
-    tagName = bytes('\0' * 256, 'utf8')
-    tagValue = bytes('\0' * 256, 'utf8')
-    ret_val = advDLL.AdvVer2_GetTagPairValues(
-        c_int(tagPairType.value),
-        c_int(tagId),
-        c_char_p(tagName),
-        c_char_p(tagValue)
-    ) & RET_VAL_MASK
-    tag_name_as_python_string = tagName.decode().strip('\0')  # This removes the null bytes
-    tag_value_as_python_string = tagValue.decode().strip('\0')  # This removes the null bytes
+    # The buffers are sized from AdvVer2_GetTagPairSizes() so that long names and values are never truncated
+    advDLL = loadLibrary()
+    ret_val = advDLL.AdvVer2_GetTagPairSizes(tagPairType.value, tagId, byref(_size1), byref(_size2)) & RET_VAL_MASK
+    if ret_val is not S_OK:
+        return ret_val, '', ''
+    tagName = _stringBuffer(0, _size1.value)
+    tagValue = _stringBuffer(1, _size2.value)
+    tagName[0] = tagValue[0] = b'\0'
+    ret_val = advDLL.AdvVer2_GetTagPairValues(tagPairType.value, tagId, tagName, tagValue) & RET_VAL_MASK
 
-    return ret_val, tag_name_as_python_string, tag_value_as_python_string
+    return ret_val, tagName.value.decode(), tagValue.value.decode()
 
 
 def AdvVer2_GetIndexEntries(mainIndex, calibrationIndex) -> int:
-    return advDLL.AdvVer2_GetIndexEntries(mainIndex, calibrationIndex) & RET_VAL_MASK
+    return loadLibrary().AdvVer2_GetIndexEntries(mainIndex, calibrationIndex) & RET_VAL_MASK
 
 
+@_serialized
 def AdvVer2_GetStatusTagInfo(tagId: int) -> Tuple[Adv2TagType, str]:
-    pTagNameSize = pointer(c_int(0))
-    ret_val = advDLL.AdvVer2_GetStatusTagNameSize(c_uint(tagId), pTagNameSize) & RET_VAL_MASK
+    advDLL = loadLibrary()
+    ret_val = advDLL.AdvVer2_GetStatusTagNameSize(tagId, byref(_size1)) & RET_VAL_MASK
 
     if ret_val is not S_OK:
         raise AdvLibException(f'{ResolveErrorMessage(ret_val)}')
 
-    tagNameSize = pTagNameSize.contents.value
-    tagName = bytes('\0' * (tagNameSize + 1), 'utf8')
-    pTagType = pointer(c_int(0))
-    ret_val = advDLL.AdvVer2_GetStatusTagInfo(
-        c_uint(tagId),
-        c_char_p(tagName),
-        pTagType
-    ) & RET_VAL_MASK
+    tagName = _stringBuffer(0, _size1.value)
+    tagName[0] = b'\0'
+    ret_val = advDLL.AdvVer2_GetStatusTagInfo(tagId, tagName, byref(_tagType)) & RET_VAL_MASK
 
     if ret_val is not S_OK:
         raise AdvLibException(f'{ResolveErrorMessage(ret_val)}')
 
-    tagType = pTagType.contents.value
-    return Adv2TagType(tagType), tagName.decode().strip('\0')
+    return Adv2TagType(_tagType.value), tagName.value.decode()
 
 
+@_serialized
 def AdvVer2_GetStatusTagUInt8(tagId: int) -> int:
-    pTagValue = pointer(c_int8(0))
-    ret_val = advDLL.AdvVer2_GetStatusTagUInt8(c_uint(tagId), pTagValue) & RET_VAL_MASK
+    ret_val = loadLibrary().AdvVer2_GetStatusTagUInt8(tagId, byref(_uint8Value)) & RET_VAL_MASK
     if ret_val is not S_OK:
         return -1
-    return pTagValue.contents.value
+    return _uint8Value.value
 
 
+@_serialized
 def AdvVer2_GetStatusTagInt16(tagId: int) -> int:
-    pTagValue = pointer(c_int16(0))
-    ret_val = advDLL.AdvVer2_GetStatusTag16(c_uint(tagId), pTagValue) & RET_VAL_MASK
+    ret_val = loadLibrary().AdvVer2_GetStatusTag16(tagId, byref(_int16Value)) & RET_VAL_MASK
     if ret_val is not S_OK:
         return -1
-    return pTagValue.contents.value
+    return _int16Value.value
 
 
+@_serialized
 def AdvVer2_GetStatusTagInt32(tagId: int) -> int:
-    pTagValue = pointer(c_int32(0))
-    ret_val = advDLL.AdvVer2_GetStatusTag32(c_uint(tagId), pTagValue) & RET_VAL_MASK
+    ret_val = loadLibrary().AdvVer2_GetStatusTag32(tagId, byref(_int32Value)) & RET_VAL_MASK
     if ret_val is not S_OK:
         return -1
-    return pTagValue.contents.value
+    return _int32Value.value
 
 
+@_serialized
 def AdvVer2_GetStatusTagInt64(tagId: int) -> int:
-    pTagValue = pointer(c_int64(0))
-    ret_val = advDLL.AdvVer2_GetStatusTag64(c_uint(tagId), pTagValue) & RET_VAL_MASK
+    ret_val = loadLibrary().AdvVer2_GetStatusTag64(tagId, byref(_int64Value)) & RET_VAL_MASK
     if ret_val is not S_OK:
         return -1
-    return pTagValue.contents.value
+    return _int64Value.value
 
 
+@_serialized
 def AdvVer2_GetStatusTagReal(tagId: int) -> float:
-    pTagValue = pointer(c_float(0))
-    ret_val = advDLL.AdvVer2_GetStatusTagReal(c_uint(tagId), pTagValue) & RET_VAL_MASK
+    ret_val = loadLibrary().AdvVer2_GetStatusTagReal(tagId, byref(_realValue)) & RET_VAL_MASK
     if ret_val is not S_OK:
         return -1
-    return pTagValue.contents.value
+    return _realValue.value
 
 
+@_serialized
 def AdvVer2_GetStatusTagUTF8String(tagId: int) -> str:
-    pTagLen = pointer(c_int(0))
-    ret_val = advDLL.AdvVer2_GetStatusTagSizeUTF8String(c_uint(tagId), pTagLen) & RET_VAL_MASK
+    advDLL = loadLibrary()
+    ret_val = advDLL.AdvVer2_GetStatusTagSizeUTF8String(tagId, byref(_size1)) & RET_VAL_MASK
 
     if ret_val is not S_OK:
         if ret_val == 0x81001004:  # missing status tag in frame is common --- return empty string
             return ""
         raise AdvLibException(f'{ResolveErrorMessage(ret_val)}')
 
-    tagValue = bytes('\0' * (pTagLen.contents.value + 1), 'utf8')
-    ret_val = advDLL.AdvVer2_GetStatusTagUTF8String(c_uint(tagId), c_char_p(tagValue)) & RET_VAL_MASK
+    tagValue = _stringBuffer(0, _size1.value)
+    tagValue[0] = b'\0'
+    ret_val = advDLL.AdvVer2_GetStatusTagUTF8String(tagId, tagValue) & RET_VAL_MASK
 
     if ret_val is not S_OK:
         raise AdvLibException(f'{ResolveErrorMessage(ret_val)}')
 
-    return tagValue.decode().strip('\0')
+    return tagValue.value.decode()
 
 
 def GetLibraryVersion() -> str:
-    libVer = bytes('\0' * 256, 'utf8')
-    advDLL.GetLibraryVersion(c_char_p(libVer))
-    return libVer.decode().strip('\0')
+    libVer = create_string_buffer(256)
+    loadLibrary().GetLibraryVersion(libVer)
+    return libVer.value.decode()
 
 
 def GetLibraryPlatformId() -> str:
-    platform_str = bytes('\0' * 256, 'utf8')
-    advDLL.GetLibraryPlatformId(c_char_p(platform_str))
-    return platform_str.decode().strip('\0')
+    platform_str = create_string_buffer(256)
+    loadLibrary().GetLibraryPlatformId(platform_str)
+    return platform_str.value.decode()
 
 
 def GetLibraryBitness() -> int:
-    ret_val = advDLL.GetLibraryBitness()
+    ret_val = loadLibrary().GetLibraryBitness()
     return ret_val
@@ -0,0 +1,540 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# We use type hinting so that it is easy to see the intent as matching the C++/C# code
+
+# This module is a pure Python/numpy alternative to the native library wrapped by AdvLib.py. An AdvMmapFile
+# parses an ADV version 2 file directly from an mmap of the file. Its methods have the same names, arguments
+# and return values as the functions in AdvLib.py, so an Adv2reader can use either one. Because all state is
+# held in the AdvMmapFile instance (rather than in the process-global state of the native library), any number
+# of files can be open at the same time.
+#
+# Only uncompressed images (FULL-IMAGE-RAW and 12BIT-IMAGE-PACKED layouts) can be decoded. Frames that use a
+# compressed layout (LAGARITH16, QUICKLZ) return E_NOTIMPL, although their frame info and status are still read.
+
+import mmap
+import os
+import struct
+import warnings
+from ctypes import c_float
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from Adv2.Adv import AdvFileInfo, AdvFrameInfo, AdvImageLayoutInfo, StreamId, TagPairType, Adv2TagType
+from Adv2.AdvError import S_OK, ResolveErrorMessage, AdvLibException
+
+FILE_MAGIC = b'FSTF'
+FRAME_MAGIC = 0xEE0122FF
+
+E_ADV_INVALID_STATUS_TAG_ID = 0x81001002
+E_ADV_INVALID_STREAM_ID = 0x81001008
+E_ADV_INVALID_IMAGE_LAYOUT_ID = 0x8100100C
+E_ADV_FRAME_MISSING_FROM_INDEX = 0x81001014
+E_ADV_FRAME_CORRUPTED = 0x81001015
+E_ADV_FILE_NOT_OPEN = 0x81001016
+E_ADV_NOT_AN_ADV_FILE = 0x81002001
+E_ADV_VERSION_NOT_SUPPORTED = 0x81002002
+E_ADV_TWO_SECTIONS_EXPECTED = 0x81002005
+E_NOTIMPL = 0x80004001
+
+# Index entries are stored packed (20 bytes each) in the file
+FILE_INDEX_ENTRY_DTYPE = np.dtype([('ElapsedTicks', '<i8'), ('FrameOffset', '<i8'), ('BytesCount', '<u4')])
+
+# Status tags with these names also fill in the matching AdvFrameInfo fields (as the native library does)
+FRAME_INFO_STATUS_TAGS = {
+    'Gamma': 'Gamma',
+    'Gain': 'Gain',
+    'Shutter': 'Shutter',
+    'Offset': 'Offset',
+    'TrackedSatellites': 'GPSTrackedSatellites',
+    'AlmanacStatus': 'GPSAlmanacStatus',
+    'AlmanacOffset': 'GPSAlmanacOffset',
+    'SatelliteFixStatus': 'GPSFixStatus',
+}
+# AdvFrameInfo fields that the native library holds as signed bytes
+FRAME_INFO_SIGNED_BYTE_FIELDS = {'GPSAlmanacOffset'}
+FRAME_INFO_STATUS_TAGS_64 = {
+    'VideoCameraFrameId': ('VideoCameraFrameIdLo', 'VideoCameraFrameIdHi'),
+    'HardwareTimerFrameId': ('HardwareTimerFrameIdLo', 'HardwareTimerFrameIdHi'),
+    'SystemTime': ('SystemTimestampLo', 'SystemTimestampHi'),
+}
+
+# struct formats (little endian) of the fixed size status tag values
+STATUS_TAG_FORMATS = {
+    Adv2TagType.Int8: struct.Struct('<B'),
+    Adv2TagType.Int16: struct.Struct('<h'),
+    Adv2TagType.Int32: struct.Struct('<i'),
+    Adv2TagType.Int64: struct.Struct('<q'),
+    Adv2TagType.Real: struct.Struct('<f'),
+}
+
+UINT16 = struct.Struct('<H')
+UINT32 = struct.Struct('<I')
+INT64 = struct.Struct('<q')
+FRAME_HEADER = struct.Struct('<IBqqI')  # magic, (unused) byte, start ticks, end ticks, image section length
+STATUS_HEADER = struct.Struct('<qIB')  # mid-exposure timestamp, exposure, number of status tags in the frame
+
+
+def AdvGetFileVersion(filepath: str) -> Tuple[str, int]:
+    if not os.path.isfile(filepath):
+        return f'Error - cannot find file: {filepath}', 0
+    with open(filepath, 'rb') as f:
+        header = f.read(5)
+    if len(header) < 5 or not header[:4] == FILE_MAGIC:
+        return f'Error - not an FSTF file: {filepath}', 0
+    return '', header[4]
+
+
+class AdvMmapFile:
+    def __init__(self):
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._buffer: Optional[np.ndarray] = None  # uint8 view of the whole mapping
+
+        self.fileInfo = AdvFileInfo()
+        self.imageLayouts: Dict[int, AdvImageLayoutInfo] = {}
+        self.imageLayoutCompression: Dict[int, str] = {}
+        self.imageSectionTags: Dict[str, str] = {}
+        self.bigEndianPixels = False
+
+        self._tagPairs: Dict[TagPairType, list] = {}
+        self._statusTags: list = []  # (Adv2TagType, name) in tagId order
+        self._indexes: Dict[StreamId, np.ndarray] = {}
+
+        # Status values of the most recently read frame: tagId -> value
+        self._statusValues: Optional[Dict[int, any]] = None
+
+    # ---- Low level readers. Each returns the value and the position just past it ----
+
+    def _readUTF8String(self, pos: int) -> Tuple[str, int]:
+        length, = UINT16.unpack_from(self._map, pos)
+        pos += 2
+        return self._map[pos:pos + length].decode('utf-8', errors='replace'), pos + length
+
+    def _readTagPairs(self, pos: int, count: int) -> Tuple[list, int]:
+        pairs = []
+        for _ in range(count):
+            name, pos = self._readUTF8String(pos)
+            value, pos = self._readUTF8String(pos)
+            pairs.append((name, value))
+        return pairs, pos
+
+    # ---- Functions mirroring AdvLib.py ----
+
+    @staticmethod
+    def AdvGetFileVersion(filepath: str) -> Tuple[str, int]:
+        return AdvGetFileVersion(filepath)
+
+    def AdvOpenFile(self, filepath: str, fileinfo: AdvFileInfo) -> int:
+        self.AdvCloseFile()
+        try:
+            self._file = open(filepath, 'rb')
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self.AdvCloseFile()
+            return E_ADV_NOT_AN_ADV_FILE
+
+        try:
+            ret_val = self._parseHeader()
+        except (struct.error, IndexError, ValueError):
+            ret_val = E_ADV_NOT_AN_ADV_FILE
+
+        if ret_val != 2:
+            self.AdvCloseFile()
+            return ret_val
+
+        self._buffer = np.frombuffer(self._map, dtype=np.uint8)
+        for name in AdvFileInfo.__dataclass_fields__:
+            setattr(fileinfo, name, getattr(self.fileInfo, name))
+        return ret_val
+
+    def _parseHeader(self) -> int:
+        mm = self._map
+        if not mm[:4] == FILE_MAGIC:
+            return E_ADV_NOT_AN_ADV_FILE
+        if not mm[4] == 2:
+            return E_ADV_VERSION_NOT_SUPPORTED
+
+        # 4 reserved bytes follow the version
+        indexTableOffset, systemMetadataOffset, userMetadataOffset = struct.unpack_from('<qqq', mm, 9)
+        pos = 33
+
+        info = self.fileInfo
+        streamsCount = mm[pos]
+        pos += 1
+        streamMetadataOffsets = []
+        for _ in range(streamsCount):
+            name, pos = self._readUTF8String(pos)
+            frameCount, clockFrequency, accuracy, metadataOffset = struct.unpack_from('<IqIq', mm, pos)
+            pos += 24
+            if name == 'MAIN':
+                info.CountMainFrames = frameCount
+                info.MainClockFrequency = clockFrequency
+                info.MainStreamAccuracy = accuracy
+                streamMetadataOffsets.append((TagPairType.MainStream, metadataOffset))
+            elif name == 'CALIBRATION':
+                info.CountCalibrationFrames = frameCount
+                info.CalibrationClockFrequency = clockFrequency
+                info.CalibrationStreamAccuracy = accuracy
+                streamMetadataOffsets.append((TagPairType.CalibrationStream, metadataOffset))
+
+        sectionsCount = mm[pos]
+        pos += 1
+        sectionOffsets = {}
+        for _ in range(sectionsCount):
+            name, pos = self._readUTF8String(pos)
+            sectionOffsets[name], = INT64.unpack_from(mm, pos)
+            pos += 8
+        if 'IMAGE' not in sectionOffsets or 'STATUS' not in sectionOffsets:
+            return E_ADV_TWO_SECTIONS_EXPECTED
+
+        for tagPairType, metadataOffset in streamMetadataOffsets:
+            self._tagPairs[tagPairType], _ = self._readTagPairs(metadataOffset + 1, mm[metadataOffset])
+        info.MainStreamTagsCount = len(self._tagPairs.get(TagPairType.MainStream, []))
+        info.CalibrationStreamTagsCount = len(self._tagPairs.get(TagPairType.CalibrationStream, []))
+
+        self._parseImageSection(sectionOffsets['IMAGE'])
+        self._parseStatusSection(sectionOffsets['STATUS'])
+
+        for tagPairType, metadataOffset in ((TagPairType.SystemMetaData, systemMetadataOffset),
+                                            (TagPairType.UserMetaData, userMetadataOffset)):
+            count, = UINT32.unpack_from(mm, metadataOffset)
+            self._tagPairs[tagPairType], _ = self._readTagPairs(metadataOffset + 4, count)
+        info.SystemMetadataTagsCount = len(self._tagPairs[TagPairType.SystemMetaData])
+        info.UserMetadataTagsCount = len(self._tagPairs[TagPairType.UserMetaData])
+
+        self._parseIndex(indexTableOffset)
+        return 2
+
+    def _parseImageSection(self, pos: int):
+        mm = self._map
+        info = self.fileInfo
+        pos += 1  # section version
+        info.Width, info.Height = struct.unpack_from('<II', mm, pos)
+        pos += 8
+        info.DataBpp = mm[pos]
+        layoutsCount = mm[pos + 1]
+        pos += 2
+        for _ in range(layoutsCount):
+            layoutId, _version, layoutBpp, tagsCount = mm[pos:pos + 4]
+            layoutTags, pos = self._readTagPairs(pos + 4, tagsCount)
+            layoutTags = dict(layoutTags)
+            dataLayout = layoutTags.get('DATA-LAYOUT', 'FULL-IMAGE-RAW')
+            self.imageLayouts[layoutId] = AdvImageLayoutInfo(
+                ImageLayoutId=layoutId, ImageLayoutTagsCount=tagsCount, ImageLayoutBpp=layoutBpp,
+                IsFullImageRaw=dataLayout == 'FULL-IMAGE-RAW',
+                Is12BitImagePacked=dataLayout == '12BIT-IMAGE-PACKED',
+                Is8BitColourPacked=dataLayout == '8BIT-COLOR-IMAGE')
+            self.imageLayoutCompression[layoutId] = layoutTags.get('SECTION-DATA-COMPRESSION', 'UNCOMPRESSED')
+        info.ImageLayoutsCount = layoutsCount
+
+        sectionTags, pos = self._readTagPairs(pos + 1, mm[pos])
+        self.imageSectionTags = dict(sectionTags)
+        info.ImageSectionTagsCount = len(sectionTags)
+        info.MaxPixelValue = int(self.imageSectionTags.get('IMAGE-MAX-PIXEL-VALUE', '0') or 0)
+        info.IsColourImage = ('IMAGE-BAYER-PATTERN' in self.imageSectionTags or
+                              any(layout.Is8BitColourPacked for layout in self.imageLayouts.values()))
+        self.bigEndianPixels = self.imageSectionTags.get('IMAGE-BYTE-ORDER', '') == 'BIG-ENDIAN'
+
+    def _parseStatusSection(self, pos: int):
+        mm = self._map
+        info = self.fileInfo
+        pos += 1  # section version
+        info.UtcTimestampAccuracyInNanoseconds, = INT64.unpack_from(mm, pos)
+        tagsCount = mm[pos + 8]
+        pos += 9
+        info.ErrorStatusTagId = -1
+        for tagId in range(tagsCount):
+            name, pos = self._readUTF8String(pos)
+            self._statusTags.append((Adv2TagType(mm[pos]), name))
+            pos += 1
+            if name == 'Error':
+                info.ErrorStatusTagId = tagId
+        info.StatusTagsCount = tagsCount
+
+    def _parseIndex(self, pos: int):
+        # The index table is: version (1 byte), offset of the MAIN index and offset of the CALIBRATION index
+        # (both uint32 and relative to the start of the table). Each index is a uint32 count followed by the entries.
+        mainOffset, calibOffset = struct.unpack_from('<II', self._map, pos + 1)
+        for streamId, offset in ((StreamId.Main, mainOffset), (StreamId.Calibration, calibOffset)):
+            count, = UINT32.unpack_from(self._map, pos + offset)
+            self._indexes[streamId] = np.frombuffer(self._map, dtype=FILE_INDEX_ENTRY_DTYPE, count=count,
+                                                    offset=pos + offset + 4)
+
+    def AdvCloseFile(self) -> int:
+        if self._map is None:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            return 0
+
+        self._buffer = None
+        self._indexes = {}
+        try:
+            self._map.close()
+        except BufferError:
+            # Pixel views handed out to the caller still refer to the mapping. It is released when they are.
+            warnings.warn(f'{self._file.name} stays mapped until the read-only images returned from it are released '
+                          f'(copy the images that are kept after the file is closed)', RuntimeWarning, stacklevel=2)
+        self._map = None
+        self._file.close()
+        self._file = None
+        self._statusValues = None
+        return 2
+
+    def AdvVer2_GetIndexEntries(self, mainIndex, calibrationIndex) -> int:
+        # mainIndex and calibrationIndex are pointers to buffers of (aligned) AdvIndexEntry structures
+        if self._map is None:
+            return E_ADV_FILE_NOT_OPEN
+        for streamId, pointer in ((StreamId.Main, mainIndex), (StreamId.Calibration, calibrationIndex)):
+            index = self._indexes[streamId]
+            if len(index):
+                dest = np.ctypeslib.as_array(pointer, shape=(6 * len(index),)).view(np.int64).reshape(-1, 3)
+                dest[:, 0] = index['ElapsedTicks']
+                dest[:, 1] = index['FrameOffset']
+                dest[:, 2] = index['BytesCount']  # BytesCount is followed by 4 bytes of (zeroed) padding
+        return S_OK
+
+    def AdvVer2_GetTagPairValues(self, tagPairType: TagPairType, tagId: int) -> Tuple[int, str, str]:
+        pairs = self._tagPairs.get(tagPairType, [])
+        if not 0 <= tagId < len(pairs):
+            return E_ADV_INVALID_STATUS_TAG_ID, '', ''
+        name, value = pairs[tagId]
+        return S_OK, name, value
+
+    def AdvVer2_GetStatusTagInfo(self, tagId: int) -> Tuple[Adv2TagType, str]:
+        if not 0 <= tagId < len(self._statusTags):
+            raise AdvLibException(f'{ResolveErrorMessage(E_ADV_INVALID_STATUS_TAG_ID)}')
+        return self._statusTags[tagId]
+
+    def _frameOffset(self, streamId: StreamId, frameNo: int) -> Tuple[int, int]:
+        # Returns an error code and the file offset of the requested frame
+        if self._map is None:
+            return E_ADV_FILE_NOT_OPEN, 0
+        if streamId not in self._indexes:
+            return E_ADV_INVALID_STREAM_ID, 0
+        index = self._indexes[streamId]
+        if not 0 <= frameNo < len(index):
+            return E_ADV_FRAME_MISSING_FROM_INDEX, 0
+        offset = int(index['FrameOffset'][frameNo])
+        if not UINT32.unpack_from(self._map, offset)[0] == FRAME_MAGIC:
+            return E_ADV_FRAME_CORRUPTED, 0
+        return S_OK, offset
+
+    def _readFrameInfoAndStatus(self, offset: int, frameInfo: AdvFrameInfo) -> int:
+        # Fills frameInfo and self._statusValues from the frame at offset. Returns the offset of the image data.
+        mm = self._map
+        _magic, _, startTicks, endTicks, imageLength = FRAME_HEADER.unpack_from(mm, offset)
+        imageOffset = offset + FRAME_HEADER.size
+
+        for name in AdvFrameInfo.__dataclass_fields__:
+            setattr(frameInfo, name, 0)
+        frameInfo.StartTicksLo = startTicks & 0xffffffff
+        frameInfo.StartTicksHi = startTicks >> 32
+        frameInfo.EndTicksLo = endTicks & 0xffffffff
+        frameInfo.EndTicksHi = endTicks >> 32
+
+        pos = imageOffset + imageLength + 4  # skip over the status section length
+        midExposure, exposure, tagsCount = STATUS_HEADER.unpack_from(mm, pos)
+        pos += STATUS_HEADER.size
+        frameInfo.UtcMidExposureTimestampLo = midExposure & 0xffffffff
+        frameInfo.UtcMidExposureTimestampHi = midExposure >> 32
+        frameInfo.Exposure = exposure
+
+        statusValues = {}
+        for _ in range(tagsCount):
+            tagId = mm[pos]
+            pos += 1
+            tagType, tagName = self._statusTags[tagId]
+            if tagType == Adv2TagType.UTF8String:
+                value, pos = self._readUTF8String(pos)
+            else:
+                tagFormat = STATUS_TAG_FORMATS[tagType]
+                value, = tagFormat.unpack_from(mm, pos)
+                pos += tagFormat.size
+            statusValues[tagId] = value
+
+            if tagName in FRAME_INFO_STATUS_TAGS:
+                fieldName = FRAME_INFO_STATUS_TAGS[tagName]
+                if fieldName in FRAME_INFO_SIGNED_BYTE_FIELDS and tagType == Adv2TagType.Int8 and value > 127:
+                    value -= 256
+                setattr(frameInfo, fieldName, value)
+            elif tagName in FRAME_INFO_STATUS_TAGS_64:
+                loName, hiName = FRAME_INFO_STATUS_TAGS_64[tagName]
+                setattr(frameInfo, loName, value & 0xffffffff)
+                setattr(frameInfo, hiName, (value >> 32) & 0xffffffff)
+
+        self._statusValues = statusValues
+        frameInfo.ImageLayoutId = mm[imageOffset]
+        return imageOffset
+
+    def AdvVer2_GetFrameStatus(self, streamId: StreamId, frameNo: int,
+                               frameInfo: AdvFrameInfo) -> Tuple[int, Dict[int, any]]:
+        # Fills frameInfo and returns the status values (tagId -> value) of a frame without decoding its image.
+        # Tags that are not present in the frame are absent from the returned dict.
+        ret_val, offset = self._frameOffset(streamId, frameNo)
+        if ret_val != S_OK:
+            return ret_val, {}
+        self._readFrameInfoAndStatus(offset, frameInfo)
+        frameInfo.RawDataBlockSize = int(self._indexes[streamId]['BytesCount'][frameNo])
+        return S_OK, self._statusValues
+
+    def _gather(self, positions: np.ndarray, dtype: np.dtype) -> np.ndarray:
+        # Reads one (little endian) value of dtype at each of the file positions, in a single vectorized operation
+        dtype = np.dtype(dtype)
+        byteIndexes = positions.astype(np.int64)[:, None] + np.arange(dtype.itemsize)
+        return self._buffer[byteIndexes].view(dtype).reshape(-1)
+
+    def AdvVer2_GetTimestamps(self, streamId: StreamId) -> Tuple[int, np.ndarray, np.ndarray]:
+        # Returns the mid-exposure timestamps (int64 nanoseconds) and exposures (uint32 nanoseconds) of every frame
+        # of the stream. Only the frame headers and status sections are read: no image is decoded.
+        empty = np.zeros(0, dtype=np.int64)
+        if self._map is None:
+            return E_ADV_FILE_NOT_OPEN, empty, empty
+        if streamId not in self._indexes:
+            return E_ADV_INVALID_STREAM_ID, empty, empty
+
+        offsets = self._indexes[streamId]['FrameOffset']
+        if not np.all(self._gather(offsets, '<u4') == FRAME_MAGIC):
+            return E_ADV_FRAME_CORRUPTED, empty, empty
+
+        imageLengths = self._gather(offsets + FRAME_HEADER.size - 4, '<u4')
+        statusOffsets = offsets + FRAME_HEADER.size + imageLengths + 4
+        midExposure = self._gather(statusOffsets, '<i8')
+        exposure = self._gather(statusOffsets + 8, '<u4')
+        return S_OK, midExposure, exposure
+
+    def AdvVer2_GetFramePixelsView(self, streamId: StreamId, frameNo: int,
+                                   frameInfo: AdvFrameInfo,
+                                   roi: Optional[Tuple[int, int, int, int]] = None,
+                                   dtype: Optional[np.dtype] = None,
+                                   shift: int = 0) -> Tuple[int, Optional[np.ndarray]]:
+        # Returns the pixels of a frame as a (Height, Width) array. For FULL-IMAGE-RAW layouts this is a read-only
+        # view into the file mapping (no copy is made); 12BIT-IMAGE-PACKED images are unpacked into a new array.
+        # With roi=(y0, y1, x0, x1) only the window [y0:y1, x0:x1] is returned, and only rows y0 to y1 are
+        # touched (read or unpacked).
+        # With dtype the pixels are returned as that dtype and multiplied by 2 ** shift (see convertPixels()).
+        # Packed images are unpacked straight into that form; a raw view that is already in it is still returned.
+        ret_val, offset = self._frameOffset(streamId, frameNo)
+        if ret_val != S_OK:
+            return ret_val, None
+
+        imageOffset = self._readFrameInfoAndStatus(offset, frameInfo)
+        frameInfo.RawDataBlockSize = int(self._indexes[streamId]['BytesCount'][frameNo])
+
+        layoutId = self._map[imageOffset]
+        byteMode = self._map[imageOffset + 1]
+        layout = self.imageLayouts.get(layoutId)
+        if layout is None:
+            return E_ADV_INVALID_IMAGE_LAYOUT_ID, None
+        if not self.imageLayoutCompression[layoutId] == 'UNCOMPRESSED' or not byteMode == 0:
+            return E_NOTIMPL, None
+
+        return S_OK, self._decodeImage(layout, imageOffset + 2, roi, dtype, shift)
+
+    def _decodeImage(self, layout: AdvImageLayoutInfo, pos: int,
+                     roi: Optional[Tuple[int, int, int, int]] = None,
+                     dtype: Optional[np.dtype] = None, shift: int = 0) -> Optional[np.ndarray]:
+        width, height = self.fileInfo.Width, self.fileInfo.Height
+        y0, y1, x0, x1 = roi if roi is not None else (0, height, 0, width)
+        firstPixel = y0 * width
+        numPixels = (y1 - y0) * width
+        if layout.IsFullImageRaw:
+            if layout.ImageLayoutBpp <= 8:
+                rawDtype = np.dtype(np.uint8)
+            else:
+                rawDtype = np.dtype('>u2') if self.bigEndianPixels else np.dtype('<u2')
+            rows = np.frombuffer(self._map, dtype=rawDtype, count=numPixels,
+                                 offset=pos + firstPixel * rawDtype.itemsize)
+            pixels = rows.reshape(y1 - y0, width)[:, x0:x1]
+            return pixels if dtype is None else convertPixels(pixels, dtype, shift)
+        if layout.Is12BitImagePacked:
+            # Unpack from the start of the 3-byte pair holding the first pixel of row y0
+            firstPair = firstPixel // 2
+            skip = firstPixel - 2 * firstPair
+            packed = self._buffer[pos + 3 * firstPair:pos + (firstPixel + numPixels + 1) // 2 * 3]
+            pixels = unpack12BitPixels(packed, skip + numPixels, np.uint16 if dtype is None else dtype, shift)
+            return pixels[skip:].reshape(y1 - y0, width)[:, x0:x1]
+        return None
+
+    def AdvVer2_GetFramePixels(self, streamId: StreamId, frameNo: int,
+                               pixels: any, frameInfo: AdvFrameInfo, systemErrorLen: int) -> int:
+        # pixels is a pointer to a buffer of Width * Height c_uint (the same argument the native library takes)
+        ret_val, image = self.AdvVer2_GetFramePixelsView(streamId, frameNo, frameInfo)
+        if image is None:
+            return ret_val if ret_val != S_OK else E_NOTIMPL
+        dest = np.ctypeslib.as_array(pixels, shape=(image.size,)).reshape(image.shape)
+        np.copyto(dest, image, casting='unsafe')
+        return ret_val
+
+    def _getStatusValue(self, tagId: int, missing: any) -> any:
+        if self._statusValues is None or tagId not in self._statusValues:
+            return missing
+        return self._statusValues[tagId]
+
+    def AdvVer2_GetStatusTagUInt8(self, tagId: int) -> int:
+        # The native library returns the byte as a signed value
+        value = self._getStatusValue(tagId, -1)
+        return value - 256 if value > 127 else value
+
+    def AdvVer2_GetStatusTagInt16(self, tagId: int) -> int:
+        return self._getStatusValue(tagId, -1)
+
+    def AdvVer2_GetStatusTagInt32(self, tagId: int) -> int:
+        return self._getStatusValue(tagId, -1)
+
+    def AdvVer2_GetStatusTagInt64(self, tagId: int) -> int:
+        return self._getStatusValue(tagId, -1)
+
+    def AdvVer2_GetStatusTagReal(self, tagId: int) -> float:
+        value = self._getStatusValue(tagId, -1)
+        # Round trip through c_float so that the value is exactly what the native library returns
+        return c_float(value).value
+
+    def AdvVer2_GetStatusTagUTF8String(self, tagId: int) -> str:
+        return self._getStatusValue(tagId, '')
+
+
+def unpack12BitPixels(packed: np.ndarray, numPixels: int, dtype: np.dtype = np.uint16, shift: int = 0) -> np.ndarray:
+    # Each 3 bytes hold 2 pixels, most significant bits first: AAAAAAAA AAAABBBB BBBBBBBB
+    # Read as big-endian uint16s at a stride of 3 bytes, bytes 0-1 of a pair are AAAAAAAAAAAABBBB and bytes 1-2 are
+    # AAAABBBBBBBBBBBB, so each pixel takes a single shift or mask, written straight into the result.
+    # The pixels are returned as dtype multiplied by 2 ** shift (integer dtypes of 16 bits or more are unpacked
+    # directly into that dtype and then shifted in place).
+    dtype = np.dtype(dtype)
+    numPairs = (numPixels + 1) // 2
+    packed = np.ascontiguousarray(packed[:numPairs * 3])
+    firstTwo = np.ndarray((numPairs,), dtype='>u2', buffer=packed, offset=0, strides=(3,))
+    lastTwo = np.ndarray((numPairs,), dtype='>u2', buffer=packed, offset=1, strides=(3,))
+    work = dtype if dtype.kind == 'u' and dtype.itemsize >= 2 else np.dtype(np.uint16)
+    pixels = np.empty((numPairs, 2), dtype=work)
+    np.right_shift(firstTwo, 4, out=pixels[:, 0], dtype=work, casting='unsafe')
+    np.bitwise_and(lastTwo, 0x0fff, out=pixels[:, 1], dtype=work, casting='unsafe')
+    pixels = pixels.reshape(-1)[:numPixels]
+    if work != dtype:
+        return convertPixels(pixels, dtype, shift)
+    if shift:
+        np.left_shift(pixels, shift, out=pixels, dtype=work, casting='unsafe')
+    return pixels
+
+
+def convertPixels(pixels: np.ndarray, dtype: np.dtype, shift: int = 0, out: Optional[np.ndarray] = None) -> \
+        np.ndarray:
+    # Returns pixels as dtype, multiplied by 2 ** shift, in a single vectorized pass (into out if it is given).
+    # pixels itself is returned when it is already in that form and no out is given.
+    dtype = np.dtype(dtype)
+    if out is None:
+        if shift == 0 and pixels.dtype == dtype:
+            return pixels
+        out = np.empty(pixels.shape, dtype=dtype)
+    if shift == 0:
+        np.copyto(out, pixels, casting='unsafe')
+    elif out.dtype.kind == 'f':
+        np.multiply(pixels, 1 << shift, out=out, dtype=out.dtype, casting='unsafe')
+    else:
+        # The shift is done in the output dtype, so 8 bit pixels are not shifted out of a uint8
+        np.left_shift(pixels, shift, out=out, dtype=out.dtype, casting='unsafe')
+    return out
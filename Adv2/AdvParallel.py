@@ -0,0 +1,183 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# We use type hinting so that it is easy to see the intent as matching the C++/C# code
+
+# ParallelAdv2Reader decodes frame stacks on several cores. Each worker process of a process pool has its own
+# Adv2reader open on the file (and so its own copy of the native library's global state). The output stack
+# itself is a single shared memory block: the frame numbers to be read are split into chunks and each worker
+# decodes its chunk straight into its slice of that block, so image data is never pickled or copied by the
+# parent process. Stacks returned by this reader (and those from allocateStack()) stay in shared memory, so
+# passing one back as out= reuses it without a copy. Any other out array is filled from a temporary shared
+# stack with one copy.
+
+import ctypes
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait
+from multiprocessing import get_context, shared_memory
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from Adv2.Adv import StreamId
+from Adv2.Adv2File import Adv2reader, FRAME_INFO_DTYPE, startOfExposureNanoseconds
+from Adv2.AdvError import AdvLibException
+
+# The Adv2reader of a worker process (opened by _initWorker)
+_workerReader: Optional[Adv2reader] = None
+
+
+def _initWorker(filename: str, backend: str, outputDtype: str, scaleTo16Bit: bool):
+    global _workerReader
+    _workerReader = Adv2reader(filename, backend=backend, outputDtype=outputDtype, scaleTo16Bit=scaleTo16Bit)
+
+
+def _readChunk(memoryName: str, offset: int, streamType: StreamId, frameNumbers: np.ndarray) -> np.ndarray:
+    # Runs in a worker: decodes the frames into the output stack (the shared memory block memoryName) starting
+    # offset bytes into it and returns their frame infos
+    memory = shared_memory.SharedMemory(name=memoryName)
+    try:
+        rdr = _workerReader
+        stack = np.ndarray((len(frameNumbers), rdr.Height, rdr.Width), dtype=rdr.outputDtype, buffer=memory.buf,
+                           offset=offset)
+        _, frameInfos, _ = rdr.getImageStack(streamType, frames=frameNumbers, out=stack)
+        del stack
+    finally:
+        memory.close()
+    return frameInfos
+
+
+class _SharedStack:
+    # The shared memory block behind a stack. The array made from it (np.asarray()) and every view of that array
+    # keep it alive; the block is closed and unlinked when the last of them has been garbage collected.
+    def __init__(self, shape: Tuple[int, int, int], dtype: np.dtype):
+        dtype = np.dtype(dtype)
+        self.memory = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+        # Holding a ctypes object on the buffer pins the mapping and gives its address
+        self._anchor = ctypes.c_char.from_buffer(self.memory.buf)
+        self.address = ctypes.addressof(self._anchor)
+        self.__array_interface__ = {'version': 3, 'shape': tuple(shape), 'typestr': dtype.str,
+                                    'data': (self.address, False)}
+
+    def __del__(self):
+        self._anchor = None
+        self.memory.close()
+        try:
+            self.memory.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _sharedStackOf(array: np.ndarray) -> Optional[Tuple[_SharedStack, int]]:
+    # The _SharedStack that a C-contiguous array lies in and the byte offset of the array in it, or None
+    base = array
+    while isinstance(base, np.ndarray):
+        base = base.base
+    if not isinstance(base, _SharedStack) or not array.flags.c_contiguous:
+        return None
+    return base, array.__array_interface__['data'][0] - base.address
+
+
+class ParallelAdv2Reader:
+    def __init__(self, filename: str, workers: Optional[int] = None, backend: str = 'auto',
+                 chunkSize: Optional[int] = None, outputDtype: str = 'uint16', scaleTo16Bit: bool = False):
+        # workers defaults to the number of cores. chunkSize (frames per task) defaults to a value that
+        # gives each worker several tasks per stack. outputDtype and scaleTo16Bit are as for Adv2reader.
+        # The file is opened here (with the mmap backend, which needs no native state) to get the file information
+        self._header = Adv2reader(filename, backend='mmap', outputDtype=outputDtype, scaleTo16Bit=scaleTo16Bit)
+        self.Width = self._header.Width
+        self.Height = self._header.Height
+        self.CountMainFrames = self._header.CountMainFrames
+        self.CountCalibrationFrames = self._header.CountCalibrationFrames
+        self.FileInfo = self._header.FileInfo
+        self.outputDtype = self._header.outputDtype
+        self.pixelScale = self._header.pixelScale
+
+        self.workers = workers if workers else os.cpu_count() or 1
+        self.chunkSize = chunkSize
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context('spawn'),
+                                             initializer=_initWorker,
+                                             initargs=(filename, backend, outputDtype, scaleTo16Bit))
+
+        # Throughput of the most recent stack read
+        self.lastStats: Dict[str, float] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._header.closeFile()
+
+    def allocateStack(self, numFrames: int) -> np.ndarray:
+        # Returns an uninitialized (numFrames, Height, Width) stack of outputDtype in shared memory. Passed as out
+        # to getMainImageStack() or getCalibImageStack() (as a whole or as a contiguous slice of whole frames) it is
+        # filled by the workers directly.
+        return np.asarray(_SharedStack((numFrames, self.Height, self.Width), self.outputDtype))
+
+    def getMainImageStack(self, start: int = 0, stop: Optional[int] = None, step: int = 1,
+                          frames: Union[slice, Sequence[int], None] = None, out: Optional[np.ndarray] = None) -> \
+            Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self.getImageStack(StreamId.Main, start, stop, step, frames, out)
+
+    def getCalibImageStack(self, start: int = 0, stop: Optional[int] = None, step: int = 1,
+                           frames: Union[slice, Sequence[int], None] = None, out: Optional[np.ndarray] = None) -> \
+            Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self.getImageStack(StreamId.Calibration, start, stop, step, frames, out)
+
+    def getImageStack(self, stream: StreamId = StreamId.Main, start: int = 0, stop: Optional[int] = None,
+                      step: int = 1, frames: Union[slice, Sequence[int], None] = None,
+                      out: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Returns the same values as Adv2reader.getImageStack()
+        startTime = time.perf_counter()
+        frameNumbers = self._header.frameNumbers(stream, start, stop, step, frames)
+        numFrames = frameNumbers.size
+
+        shape = (numFrames, self.Height, self.Width)
+        if out is not None and (out.shape != shape or out.dtype != self.outputDtype):
+            raise AdvLibException(f'out must be a {self.outputDtype} array of shape {shape} '
+                                  f'but has dtype {out.dtype} and shape {out.shape}')
+        # The workers write into out itself when it is in shared memory, otherwise into a new shared stack
+        shared = None if out is None else _sharedStackOf(out)
+        stack = out if shared is not None else self.allocateStack(numFrames)
+        block, offset = shared if shared is not None else _sharedStackOf(stack)
+        frameInfos = np.zeros(numFrames, dtype=FRAME_INFO_DTYPE)
+
+        chunkSize = self.chunkSize or max(1, min(256, numFrames // (4 * self.workers)))
+        frameBytes = self.outputDtype.itemsize * self.Width * self.Height
+        futures = {}
+        for first in range(0, numFrames, chunkSize):
+            chunk = frameNumbers[first:first + chunkSize]
+            future = self._executor.submit(_readChunk, block.memory.name, offset + first * frameBytes,
+                                           stream, chunk)
+            futures[future] = (first, len(chunk))
+        try:
+            for future in as_completed(futures):
+                first, count = futures[future]
+                frameInfos[first:first + count] = future.result()
+        except BaseException:
+            # Do not return while workers may still be writing into the stack
+            for future in futures:
+                future.cancel()
+            wait(futures)
+            raise
+
+        if out is None:
+            out = stack
+        elif stack is not out:
+            np.copyto(out, stack)
+
+        seconds = time.perf_counter() - startTime
+        self.lastStats = {
+            'frames': numFrames,
+            'seconds': seconds,
+            'framesPerSecond': numFrames / seconds if seconds > 0 else 0.0,
+            'megabytesPerSecond': out.nbytes / 1e6 / seconds if seconds > 0 else 0.0,
+        }
+        return out, frameInfos, startOfExposureNanoseconds(frameInfos)
@@ -0,0 +1,187 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# We use type hinting so that it is easy to see the intent as matching the C++/C# code
+
+# Aperture photometry over the frames of an ADV file: for each frame, the pixels inside a circular aperture
+# are summed and the sky background (the median of a surrounding annulus) is subtracted. The result is a light
+# curve with one row per frame and one column per aperture.
+#
+# Frames are read in chunks (with the stack readers of Adv2reader, into a reused buffer of at most maxBytes) so
+# the memory used depends on neither the length of the file nor the size of its frames. Without tracking, only
+# the window of the image holding the apertures is read and the sums for a whole chunk are done with a few numpy
+# reductions. With tracking, each aperture is re-centred on the centroid of its star in every frame.
+
+import csv
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from Adv2.Adv import StreamId
+from Adv2.Adv2File import Adv2reader, ADV_EPOCH_NANOSECONDS
+from Adv2.AdvError import AdvLibException
+
+
+@dataclass
+class Aperture:
+    # Centre (row and column, rounded to the nearest pixel), aperture radius and the inner and outer radii of
+    # the sky annulus, all in pixels
+    centerY: float
+    centerX: float
+    radius: float = 4.0
+    skyInnerRadius: float = 8.0
+    skyOuterRadius: float = 12.0
+    name: str = ''
+
+
+@dataclass
+class LightCurve:
+    apertureNames: List[str]
+    frameNumbers: np.ndarray  # (n,) int64
+    startOfExposure: np.ndarray  # (n,) int64 nanoseconds since 2010-01-01
+    apertureSum: np.ndarray  # (n, k) sum of the pixels in each aperture
+    background: np.ndarray  # (n, k) sky background per pixel (median of the annulus)
+    netFlux: np.ndarray  # (n, k) apertureSum - background * apertureArea
+    snr: np.ndarray  # (n, k) signal-to-noise ratio of netFlux
+    centers: np.ndarray  # (n, k, 2) aperture centre (row, column) used in each frame
+    apertureArea: np.ndarray = field(default_factory=lambda: np.zeros(0))  # (k,) pixels in each aperture
+
+    def timestampStrings(self) -> Tuple[List[str], List[str]]:
+        # Returns the start-of-exposure date and time strings, in the same form as AdvFrameInfo.DateString and
+        # AdvFrameInfo.StartOfExposureTimestampString
+        times = (self.startOfExposure + ADV_EPOCH_NANOSECONDS).view('datetime64[ns]').astype('datetime64[us]')
+        strings = np.datetime_as_string(times, unit='us')
+        dates = [s[:10] for s in strings]
+        timestamps = [f'[{s[11:]}]' for s in strings]
+        return dates, timestamps
+
+    def writeCsv(self, filename: str):
+        dates, timestamps = self.timestampStrings()
+        header = ['FrameNum', 'Date', 'StartOfExposureTimestamp']
+        for name in self.apertureNames:
+            header += [f'{name}_sum', f'{name}_background', f'{name}_net', f'{name}_snr', f'{name}_y', f'{name}_x']
+        with open(filename, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            for i in range(self.frameNumbers.size):
+                row = [int(self.frameNumbers[i]), dates[i], timestamps[i]]
+                for j in range(len(self.apertureNames)):
+                    row += [f'{self.apertureSum[i, j]:.1f}', f'{self.background[i, j]:.3f}',
+                            f'{self.netFlux[i, j]:.3f}', f'{self.snr[i, j]:.3f}',
+                            f'{self.centers[i, j, 0]:.2f}', f'{self.centers[i, j, 1]:.2f}']
+                writer.writerow(row)
+
+
+def _apertureMasks(aperture: Aperture) -> Tuple[int, np.ndarray, np.ndarray]:
+    # Returns the half size r of the (2r + 1, 2r + 1) box around the aperture centre and the aperture and sky
+    # masks within that box
+    if not 0 < aperture.radius < aperture.skyInnerRadius < aperture.skyOuterRadius:
+        raise AdvLibException(f'Aperture {aperture.name!r} must have 0 < radius < skyInnerRadius < skyOuterRadius')
+    r = int(np.ceil(aperture.skyOuterRadius))
+    offsets = np.arange(-r, r + 1)
+    distanceSquared = offsets[:, None] ** 2 + offsets[None, :] ** 2
+    apertureMask = distanceSquared <= aperture.radius ** 2
+    skyMask = (distanceSquared >= aperture.skyInnerRadius ** 2) & (distanceSquared <= aperture.skyOuterRadius ** 2)
+    return r, apertureMask, skyMask
+
+
+def _centroidShift(box: np.ndarray, apertureMask: np.ndarray, skyMask: np.ndarray,
+                   offsets: np.ndarray) -> Tuple[float, float]:
+    # Intensity weighted centroid (relative to the box centre) of the background subtracted pixels in the aperture
+    weights = np.clip(box - np.median(box[skyMask]), 0, None) * apertureMask
+    total = weights.sum()
+    if total <= 0:
+        return 0.0, 0.0
+    return float((weights.sum(axis=1) * offsets).sum() / total), float((weights.sum(axis=0) * offsets).sum() / total)
+
+
+def aperturePhotometry(rdr: Adv2reader, apertures: Sequence[Aperture], stream: StreamId = StreamId.Main,
+                       start: int = 0, stop: Optional[int] = None, step: int = 1,
+                       frames: Union[slice, Sequence[int], None] = None, chunkSize: Optional[int] = None,
+                       track: bool = False, gain: float = 1.0, readNoise: float = 0.0,
+                       maxBytes: int = 64 * 1024 * 1024) -> LightCurve:
+    # Measures each of the apertures in the frames selected by start/stop/step or frames (as for
+    # Adv2reader.getMainImageStack()). gain (electrons per ADU) and readNoise (electrons) are used only for the SNR.
+    # With track=True each aperture follows the centroid of its star from frame to frame.
+    # chunkSize (the number of frames read at a time) defaults to the number of frames read (whole frames with
+    # tracking, the window holding the apertures without) that fit in maxBytes.
+    if not apertures:
+        raise AdvLibException('At least one aperture is needed')
+    frameNumbers = rdr.frameNumbers(stream, start, stop, step, frames)
+    numFrames = frameNumbers.size
+    numApertures = len(apertures)
+    names = [aperture.name or f'ap{j}' for j, aperture in enumerate(apertures)]
+
+    boxes = [_apertureMasks(aperture) for aperture in apertures]
+    areas = np.array([apertureMask.sum() for _, apertureMask, _ in boxes], dtype=np.float64)
+    skyAreas = np.array([skyMask.sum() for _, _, skyMask in boxes], dtype=np.float64)
+    centers = np.array([(round(aperture.centerY), round(aperture.centerX)) for aperture in apertures])
+    for (r, _, _), (cy, cx), name in zip(boxes, centers, names):
+        if not (r <= cy < rdr.Height - r and r <= cx < rdr.Width - r):
+            raise AdvLibException(f'Aperture {name!r} (with its sky annulus) does not fit inside the image')
+
+    # Without tracking only the window holding all the apertures is read
+    if track:
+        roi = None
+        origin = np.array([0, 0])
+    else:
+        y0 = min(cy - r for (r, _, _), (cy, _) in zip(boxes, centers))
+        y1 = max(cy + r + 1 for (r, _, _), (cy, _) in zip(boxes, centers))
+        x0 = min(cx - r for (r, _, _), (_, cx) in zip(boxes, centers))
+        x1 = max(cx + r + 1 for (r, _, _), (_, cx) in zip(boxes, centers))
+        roi = (int(y0), int(y1), int(x0), int(x1))
+        origin = np.array([y0, x0])
+
+    readStack = rdr.getMainImageStack if stream == StreamId.Main else rdr.getCalibImageStack
+    shape = (rdr.Height, rdr.Width) if roi is None else (roi[1] - roi[0], roi[3] - roi[2])
+    if chunkSize is None:
+        chunkSize = max(1, maxBytes // (rdr.outputDtype.itemsize * shape[0] * shape[1]))
+    buffer = np.empty((min(chunkSize, max(numFrames, 1)),) + shape, dtype=rdr.outputDtype)
+
+    startOfExposure = np.zeros(numFrames, dtype=np.int64)
+    apertureSum = np.zeros((numFrames, numApertures))
+    background = np.zeros((numFrames, numApertures))
+    frameCenters = np.zeros((numFrames, numApertures, 2))
+    current = centers.astype(np.float64)
+
+    for first in range(0, numFrames, chunkSize):
+        chunk = frameNumbers[first:first + chunkSize]
+        n = chunk.size
+        stack, _, chunkStarts = readStack(frames=chunk, out=buffer[:n], roi=roi)
+        startOfExposure[first:first + n] = chunkStarts
+
+        for j, (r, apertureMask, skyMask) in enumerate(boxes):
+            if not track:
+                cy, cx = centers[j] - origin
+                box = stack[:, cy - r:cy + r + 1, cx - r:cx + r + 1]
+                apertureSum[first:first + n, j] = box[:, apertureMask].sum(axis=1, dtype=np.float64)
+                background[first:first + n, j] = np.median(box[:, skyMask], axis=1)
+                frameCenters[first:first + n, j] = centers[j]
+                continue
+
+            offsets = np.arange(-r, r + 1)
+            for i in range(n):
+                cy, cx = np.rint(current[j]).astype(int)
+                box = stack[i, cy - r:cy + r + 1, cx - r:cx + r + 1].astype(np.float64)
+                dy, dx = _centroidShift(box, apertureMask, skyMask, offsets)
+                # Keep the aperture and its annulus inside the image
+                current[j] = (min(max(cy + dy, r), rdr.Height - r - 1), min(max(cx + dx, r), rdr.Width - r - 1))
+                cy, cx = np.rint(current[j]).astype(int)
+                box = stack[i, cy - r:cy + r + 1, cx - r:cx + r + 1]
+                apertureSum[first + i, j] = box[apertureMask].sum(dtype=np.float64)
+                background[first + i, j] = np.median(box[skyMask])
+                frameCenters[first + i, j] = current[j]
+
+    netFlux = apertureSum - background * areas
+    # CCD equation: the noise of the signal, of the sky under the aperture (and of its estimate) and read noise
+    signal = netFlux * gain
+    variance = signal + areas * (1 + areas / skyAreas) * (background * gain + readNoise ** 2)
+    noise = np.sqrt(np.clip(variance, 0, None))
+    snr = np.divide(signal, noise, out=np.zeros_like(signal), where=noise > 0)
+
+    return LightCurve(apertureNames=names, frameNumbers=frameNumbers, startOfExposure=startOfExposure,
+                      apertureSum=apertureSum, background=background, netFlux=netFlux, snr=snr,
+                      centers=frameCenters, apertureArea=areas)
@@ -0,0 +1,199 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# We use type hinting so that it is easy to see the intent as matching the C++/C# code
+
+# The native library keeps the open file in process-global state: a second AdvOpenFile() silently replaces the
+# file being read by the first. An AdvLibProcess gives a reader its own copy of that state by running the native
+# library in a dedicated worker process. Its methods have the same names, arguments and return values as the
+# functions in AdvLib.py, so an Adv2reader can use it in place of the AdvLib module.
+#
+# Pixels are decoded by the worker into a shared memory block (multiprocessing.shared_memory) that the reader
+# maps, so image data is never pickled. Everything else (frame info, status values, tag pairs) is small and is
+# sent over a pipe.
+
+import ctypes
+import multiprocessing
+import weakref
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+from Adv2.Adv import AdvFileInfo, AdvFrameInfo, StreamId, TagPairType, Adv2TagType
+from Adv2.AdvError import S_OK, AdvLibException
+
+# Field names of AdvFrameInfo that the native library fills in
+FRAME_INFO_FIELDS = list(AdvFrameInfo.__dataclass_fields__)
+
+
+def _workerMain(conn):
+    # Runs in the worker process: executes AdvLib calls on behalf of an AdvLibProcess
+    from Adv2 import AdvLib
+
+    pixelMemory = None
+    pixelBuffer = None
+    fileInfo = AdvFileInfo()
+    frameInfo = AdvFrameInfo()
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        name, args = request
+
+        try:
+            if name == 'AdvOpenFile':
+                ret_val = AdvLib.AdvOpenFile(args[0], fileInfo)
+                result = (ret_val, fileInfo)
+            elif name == 'attachPixelMemory':
+                pixelMemory = shared_memory.SharedMemory(name=args[0])
+                pixelBuffer = (ctypes.c_uint * (fileInfo.Width * fileInfo.Height)).from_buffer(pixelMemory.buf)
+                result = S_OK
+            elif name == 'AdvVer2_GetFramePixels':
+                streamId, frameNo = args
+                ret_val = AdvLib.AdvVer2_GetFramePixels(streamId=streamId, frameNo=frameNo, pixels=pixelBuffer,
+                                                        frameInfo=frameInfo, systemErrorLen=0)
+                result = (ret_val, tuple([getattr(frameInfo, field) for field in FRAME_INFO_FIELDS]))
+            elif name == 'AdvVer2_GetIndexEntries':
+                mainCount, calibCount = args
+                mainIndex = (ctypes.c_int * (6 * mainCount))()
+                calibIndex = (ctypes.c_int * (6 * calibCount))()
+                ret_val = AdvLib.AdvVer2_GetIndexEntries(mainIndex, calibIndex)
+                result = (ret_val, bytes(mainIndex), bytes(calibIndex))
+            elif name == 'shutdown':
+                conn.send(S_OK)
+                break
+            else:
+                result = getattr(AdvLib, name)(*args)
+            conn.send(('ok', result))
+        except Exception as exc:
+            conn.send(('error', exc))
+
+    if pixelMemory is not None:
+        del pixelBuffer
+        pixelMemory.close()
+    conn.close()
+
+
+def _shutdownWorker(process, conn, pixelMemory):
+    # Used as a weakref finalizer so the worker and the shared memory are released even if closeFile() is not called
+    try:
+        conn.send(('shutdown', ()))
+        conn.recv()
+    except (OSError, EOFError, BrokenPipeError):
+        pass
+    conn.close()
+    process.join(timeout=5)
+    if process.is_alive():
+        process.terminate()
+    if pixelMemory is not None:
+        pixelMemory.close()
+        pixelMemory.unlink()
+
+
+class AdvLibProcess:
+    def __init__(self):
+        # A 'spawn' context gives the worker a freshly loaded native library on every platform
+        context = multiprocessing.get_context('spawn')
+        self._conn, workerConn = context.Pipe()
+        self._process = context.Process(target=_workerMain, args=(workerConn,), daemon=True)
+        self._process.start()
+        workerConn.close()
+
+        self._pixelMemory: Optional[shared_memory.SharedMemory] = None
+        self._pixels: Optional[np.ndarray] = None
+        self._counts = (0, 0)
+        self._finalizer = weakref.finalize(self, _shutdownWorker, self._process, self._conn, None)
+
+    def _call(self, name: str, *args):
+        if not self._finalizer.alive:
+            raise AdvLibException('The ADV worker process has been shut down')
+        self._conn.send((name, args))
+        status, result = self._conn.recv()
+        if status == 'error':
+            raise result
+        return result
+
+    def shutdown(self):
+        self._pixels = None
+        self._finalizer()
+
+    # ---- Functions mirroring AdvLib.py ----
+
+    def AdvGetFileVersion(self, filepath: str) -> Tuple[str, int]:
+        return self._call('AdvGetFileVersion', filepath)
+
+    def AdvOpenFile(self, filepath: str, fileinfo: AdvFileInfo) -> int:
+        ret_val, workerFileInfo = self._call('AdvOpenFile', filepath)
+        for name in AdvFileInfo.__dataclass_fields__:
+            setattr(fileinfo, name, getattr(workerFileInfo, name))
+
+        if ret_val == 2:
+            self._counts = (fileinfo.CountMainFrames, fileinfo.CountCalibrationFrames)
+            numBytes = max(4 * fileinfo.Width * fileinfo.Height, 1)
+            self._pixelMemory = shared_memory.SharedMemory(create=True, size=numBytes)
+            self._pixels = np.ndarray((fileinfo.Height, fileinfo.Width), dtype=np.uint32,
+                                      buffer=self._pixelMemory.buf)
+            self._finalizer.detach()
+            self._finalizer = weakref.finalize(self, _shutdownWorker, self._process, self._conn, self._pixelMemory)
+            self._call('attachPixelMemory', self._pixelMemory.name)
+        return ret_val
+
+    def AdvCloseFile(self) -> int:
+        if not self._finalizer.alive:
+            return 0
+        ret_val = self._call('AdvCloseFile')
+        self.shutdown()
+        return ret_val
+
+    def AdvVer2_GetFramePixelsView(self, streamId: StreamId, frameNo: int, frameInfo: AdvFrameInfo,
+                                   roi: Optional[Tuple[int, int, int, int]] = None) -> Tuple[int, Optional[np.ndarray]]:
+        # Returns the (Height, Width) uint32 shared memory buffer the worker decoded the frame into (or the
+        # [y0:y1, x0:x1] window of it if roi=(y0, y1, x0, x1) is given). The buffer is overwritten by the next call.
+        ret_val, values = self._call('AdvVer2_GetFramePixels', streamId, frameNo)
+        for field, value in zip(FRAME_INFO_FIELDS, values):
+            setattr(frameInfo, field, value)
+        if roi is None:
+            return ret_val, self._pixels
+        y0, y1, x0, x1 = roi
+        return ret_val, self._pixels[y0:y1, x0:x1]
+
+    def AdvVer2_GetFramePixels(self, streamId: StreamId, frameNo: int,
+                               pixels: any, frameInfo: AdvFrameInfo, systemErrorLen: int) -> int:
+        ret_val, image = self.AdvVer2_GetFramePixelsView(streamId, frameNo, frameInfo)
+        ctypes.memmove(pixels, image.ctypes.data, image.nbytes)
+        return ret_val
+
+    def AdvVer2_GetIndexEntries(self, mainIndex, calibrationIndex) -> int:
+        ret_val, mainBytes, calibBytes = self._call('AdvVer2_GetIndexEntries', *self._counts)
+        ctypes.memmove(mainIndex, mainBytes, len(mainBytes))
+        ctypes.memmove(calibrationIndex, calibBytes, len(calibBytes))
+        return ret_val
+
+    def AdvVer2_GetTagPairValues(self, tagPairType: TagPairType, tagId: int) -> Tuple[int, str, str]:
+        return self._call('AdvVer2_GetTagPairValues', tagPairType, tagId)
+
+    def AdvVer2_GetStatusTagInfo(self, tagId: int) -> Tuple[Adv2TagType, str]:
+        return self._call('AdvVer2_GetStatusTagInfo', tagId)
+
+    def AdvVer2_GetStatusTagUInt8(self, tagId: int) -> int:
+        return self._call('AdvVer2_GetStatusTagUInt8', tagId)
+
+    def AdvVer2_GetStatusTagInt16(self, tagId: int) -> int:
+        return self._call('AdvVer2_GetStatusTagInt16', tagId)
+
+    def AdvVer2_GetStatusTagInt32(self, tagId: int) -> int:
+        return self._call('AdvVer2_GetStatusTagInt32', tagId)
+
+    def AdvVer2_GetStatusTagInt64(self, tagId: int) -> int:
+        return self._call('AdvVer2_GetStatusTagInt64', tagId)
+
+    def AdvVer2_GetStatusTagReal(self, tagId: int) -> float:
+        return self._call('AdvVer2_GetStatusTagReal', tagId)
+
+    def AdvVer2_GetStatusTagUTF8String(self, tagId: int) -> str:
+        return self._call('AdvVer2_GetStatusTagUTF8String', tagId)
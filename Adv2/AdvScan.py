@@ -0,0 +1,163 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# We use type hinting so that it is easy to see the intent as matching the C++/C# code
+
+# A quality check of a whole recording that reads only the frame headers and status sections (no image is
+# decoded, see Adv2reader.getMainFrameInfoAndStatus()). scanFile() reports:
+#   gaps                 start-of-exposure steps longer than (1 + gapTolerance) times the nominal frame interval
+#                        (the median step), with an estimate of the number of frames missing
+#   duplicateTimestamps  frames with the same start-of-exposure timestamp as the frame before
+#   backwardSteps        frames whose timestamp is earlier than that of the frame before
+#   missingTimestamps    frames without a timestamp (mid-exposure timestamp of 0)
+#   exposureChanges      frames whose exposure differs from that of the frame before
+#   frameIdJumps         frames where a camera or hardware timer frame id does not follow on by one
+#   tagChanges           frames where one of the watched status tags (GPS fix and almanac status by default)
+#                        changes value
+#
+#     python -m Adv2.AdvScan some.adv [--stream Main] [--tolerance 0.5] [--json]
+
+import argparse
+import json
+from typing import Dict, List, Sequence, Union
+
+import numpy as np
+
+from Adv2.Adv import StreamId
+from Adv2.Adv2File import Adv2reader
+
+DEFAULT_WATCH_TAGS = ('SatelliteFixStatus', 'AlmanacStatus')
+
+FRAME_ID_TAGS = ('VideoCameraFrameId', 'HardwareTimerFrameId')
+
+REPORT_LISTS = ('gaps', 'duplicateTimestamps', 'backwardSteps', 'missingTimestamps', 'exposureChanges',
+                'frameIdJumps', 'tagChanges')
+
+
+def _tagValue(column: 'np.ma.MaskedArray', frameNumber: int):
+    # A status tag value as a plain Python value (None where the tag is missing)
+    if column.mask is not np.ma.nomask and column.mask[frameNumber]:
+        return None
+    value = column.data[frameNumber]
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def scanFile(source: Union[str, Adv2reader], stream: StreamId = StreamId.Main, gapTolerance: float = 0.5,
+             watchTags: Sequence[str] = DEFAULT_WATCH_TAGS, backend: str = 'auto') -> Dict[str, any]:
+    # source is a file name (opened with backend, and closed again) or an open Adv2reader. Every entry of the
+    # report lists gives the frame number where the problem shows up; timestamps are ISO 8601 UTC strings and
+    # durations are in seconds.
+    rdr = Adv2reader(source, backend=backend) if isinstance(source, str) else source
+    try:
+        startOfExposure, midExposure, exposure, startDatetime64 = rdr.getTimestamps(stream)
+        _, statusTable = rdr.getStatusTable(stream)
+    finally:
+        if isinstance(source, str):
+            rdr.closeFile()
+
+    numFrames = startOfExposure.size
+    report = {'path': source if isinstance(source, str) else None, 'stream': stream.name, 'frames': numFrames,
+              'nominalIntervalSeconds': None, 'durationSeconds': None}
+    report.update({name: [] for name in REPORT_LISTS})
+
+    def timestamp(frameNumber: int) -> str:
+        return str(startDatetime64[frameNumber].astype('datetime64[us]'))
+
+    hasTimestamp = midExposure != 0
+    report['missingTimestamps'] = np.flatnonzero(~hasTimestamp).tolist()
+
+    # The frame interval checks only look at consecutive frames that both have a timestamp
+    intervals = np.diff(startOfExposure)
+    bothTimed = hasTimestamp[1:] & hasTimestamp[:-1]
+    positive = intervals[bothTimed & (intervals > 0)]
+    if positive.size:
+        nominal = float(np.median(positive))
+        report['nominalIntervalSeconds'] = nominal / 1e9
+        for k in np.flatnonzero(bothTimed & (intervals > (1 + gapTolerance) * nominal)).tolist():
+            report['gaps'].append({'frame': k + 1, 'timestamp': timestamp(k + 1),
+                                   'seconds': int(intervals[k]) / 1e9,
+                                   'missingFrames': max(1, round(int(intervals[k]) / nominal) - 1)})
+    report['duplicateTimestamps'] = (np.flatnonzero(bothTimed & (intervals == 0)) + 1).tolist()
+    for k in np.flatnonzero(bothTimed & (intervals < 0)).tolist():
+        report['backwardSteps'].append({'frame': k + 1, 'timestamp': timestamp(k + 1),
+                                        'seconds': int(intervals[k]) / 1e9})
+    timed = np.flatnonzero(hasTimestamp)
+    if timed.size:
+        first, last = timed[0], timed[-1]
+        report['durationSeconds'] = int(startOfExposure[last] + exposure[last] - startOfExposure[first]) / 1e9
+
+    for k in (np.flatnonzero(np.diff(exposure) != 0) + 1).tolist():
+        report['exposureChanges'].append({'frame': k, 'fromSeconds': int(exposure[k - 1]) / 1e9,
+                                          'toSeconds': int(exposure[k]) / 1e9})
+
+    for tagName in FRAME_ID_TAGS:
+        column = statusTable.get(tagName)
+        if column is None or numFrames < 2:
+            continue
+        present = ~np.ma.getmaskarray(column)
+        steps = np.diff(column.data.astype(np.int64))
+        for k in np.flatnonzero(present[1:] & present[:-1] & (steps != 1)).tolist():
+            report['frameIdJumps'].append({'frame': k + 1, 'tag': tagName, 'from': int(column.data[k]),
+                                           'to': int(column.data[k + 1])})
+
+    for tagName in watchTags:
+        column = statusTable.get(tagName)
+        if column is None:
+            continue
+        previous = _tagValue(column, 0) if numFrames else None
+        for frameNumber in range(1, numFrames):
+            value = _tagValue(column, frameNumber)
+            if value != previous:
+                report['tagChanges'].append({'frame': frameNumber, 'tag': tagName, 'from': previous, 'to': value})
+            previous = value
+    report['tagChanges'].sort(key=lambda change: change['frame'])
+    return report
+
+
+def _summary(report: Dict[str, any]) -> List[str]:
+    lines = [f'{report["path"]}: {report["frames"]} {report["stream"]} frames']
+    if report['nominalIntervalSeconds'] is not None:
+        lines[0] += (f', nominal interval {report["nominalIntervalSeconds"]:.6f} s, '
+                     f'duration {report["durationSeconds"]:.3f} s')
+    for gap in report['gaps']:
+        lines.append(f'  gap of {gap["seconds"]:.6f} s before frame {gap["frame"]} ({gap["timestamp"]}), '
+                     f'about {gap["missingFrames"]} frames missing')
+    if report['duplicateTimestamps']:
+        lines.append(f'  {len(report["duplicateTimestamps"])} duplicate timestamps, first at frame '
+                     f'{report["duplicateTimestamps"][0]}')
+    for step in report['backwardSteps']:
+        lines.append(f'  timestamp steps back {-step["seconds"]:.6f} s at frame {step["frame"]}')
+    if report['missingTimestamps']:
+        lines.append(f'  {len(report["missingTimestamps"])} frames without a timestamp, first is frame '
+                     f'{report["missingTimestamps"][0]}')
+    for change in report['exposureChanges']:
+        lines.append(f'  exposure {change["fromSeconds"]} s -> {change["toSeconds"]} s at frame {change["frame"]}')
+    for jump in report['frameIdJumps']:
+        lines.append(f'  {jump["tag"]} {jump["from"]} -> {jump["to"]} at frame {jump["frame"]}')
+    for change in report['tagChanges']:
+        lines.append(f'  {change["tag"]} {change["from"]} -> {change["to"]} at frame {change["frame"]}')
+    if not any(report[name] for name in REPORT_LISTS):
+        lines.append('  no problems found')
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the frame timing and status of ADV files '
+                                                 '(only the frame headers are read)')
+    parser.add_argument('files', nargs='+', help='the .adv or .aav files to scan')
+    parser.add_argument('--stream', default='Main', choices=[stream.name for stream in StreamId])
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='a gap is a frame interval longer than (1 + tolerance) times the nominal interval')
+    parser.add_argument('--backend', default='auto', choices=('auto', 'native', 'mmap'))
+    parser.add_argument('--json', action='store_true', help='print the full reports as JSON lines')
+    args = parser.parse_args()
+
+    for filename in args.files:
+        report = scanFile(filename, StreamId[args.stream], args.tolerance, backend=args.backend)
+        print(json.dumps(report) if args.json else '\n'.join(_summary(report)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# We use type hinting so that it is easy to see the intent as matching the C++/C# code
+
+# A sidecar cache file (<file>.adv.idx.npz, next to the ADV file) that holds what Adv2reader otherwise has to
+# work out every time a file is opened: the file information, the status tag layout, the metadata, the index
+# arrays and (once they have been computed) the per-frame timestamps. See Adv2reader(sidecarCache=True).
+#
+# The sidecar is keyed on the size and modification time of the ADV file and a hash of its first
+# SIDECAR_HEADER_BYTES bytes. If any of these no longer match, the sidecar is ignored and rebuilt.
+# Everything is stored as plain numpy arrays (strings as JSON), so loading it never unpickles anything.
+
+import hashlib
+import json
+import os
+import zipfile
+from dataclasses import asdict
+from typing import Dict, Optional
+
+import numpy as np
+
+from Adv2.Adv import AdvFileInfo
+
+# Increment when the contents of the sidecar change
+SIDECAR_VERSION = 1
+
+SIDECAR_HEADER_BYTES = 64 * 1024
+
+
+def sidecarPath(filename: str) -> str:
+    return filename + '.idx.npz'
+
+
+def sidecarKey(filename: str) -> Dict[str, any]:
+    stat = os.stat(filename)
+    with open(filename, 'rb') as f:
+        headerHash = hashlib.sha256(f.read(SIDECAR_HEADER_BYTES)).hexdigest()
+    return {'version': SIDECAR_VERSION, 'size': stat.st_size, 'mtimeNs': stat.st_mtime_ns, 'headerHash': headerHash}
+
+
+def loadSidecar(filename: str, key: Dict[str, any]) -> Optional[Dict[str, any]]:
+    # Returns the contents of the sidecar of filename, or None if there is no sidecar, it is unreadable or its
+    # key (see sidecarKey()) does not match key
+    path = sidecarPath(filename)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as npz:
+            if not json.loads(str(npz['key'])) == key:
+                return None
+            contents = {
+                'fileInfo': AdvFileInfo(**json.loads(str(npz['fileInfo']))),
+                'statusTags': [tuple(entry) for entry in json.loads(str(npz['statusTags']))],
+                'metaData': json.loads(str(npz['metaData'])),
+                'indexArrays': (npz['mainIndex'], npz['calibIndex']),
+                'timestamps': {},
+            }
+            for streamName in ('Main', 'Calibration'):
+                if f'midExposure{streamName}' in npz.files:
+                    contents['timestamps'][streamName] = (npz[f'midExposure{streamName}'],
+                                                          npz[f'exposure{streamName}'])
+    except (OSError, ValueError, KeyError, TypeError, EOFError, zipfile.BadZipFile):
+        return None  # A damaged sidecar is rebuilt
+    return contents
+
+
+def saveSidecar(filename: str, key: Dict[str, any], fileInfo: AdvFileInfo, statusTags: list,
+                metaData: Dict[str, str], indexArrays: tuple, timestamps: Dict[str, tuple]):
+    # statusTags is a list of (tagId, tagType value, tagName). timestamps maps a stream name to the
+    # (midExposure, exposure) arrays of that stream.
+    # The sidecar is written to a temporary file and renamed, so a reader never sees a partly written sidecar.
+    # A sidecar that cannot be written (a read-only directory, for example) is simply not written.
+    arrays = {
+        'key': np.array(json.dumps(key)),
+        'fileInfo': np.array(json.dumps(asdict(fileInfo))),
+        'statusTags': np.array(json.dumps(statusTags)),
+        'metaData': np.array(json.dumps(metaData)),
+        'mainIndex': indexArrays[0],
+        'calibIndex': indexArrays[1],
+    }
+    for streamName, (midExposure, exposure) in timestamps.items():
+        arrays[f'midExposure{streamName}'] = midExposure
+        arrays[f'exposure{streamName}'] = exposure
+
+    path = sidecarPath(filename)
+    tempPath = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tempPath, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tempPath, path)
+    except OSError:
+        try:
+            os.remove(tempPath)
+        except OSError:
+            pass
@@ -0,0 +1,73 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# We use type hinting so that it is easy to see the intent as matching the C++/C# code
+
+# Measures how long a fresh Python process takes to import the package and do a few typical small jobs.
+# Each scenario is run in its own interpreter (so nothing is already imported or loaded) --repeat times and the
+# median time is reported, with the time for an empty interpreter subtracted.
+#
+#     python benchmarks/AdvImportBenchmark.py [--repeat 20] [--json] [file.adv]
+
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parent.parent
+SAMPLE_FILE = REPO_ROOT / 'Adv2' / 'UnitTestSample.adv'
+
+SCENARIOS = {
+    'import Adv2.AdvLib': 'import Adv2.AdvLib',
+    'AdvGetFileVersion (native)': 'from Adv2 import AdvLib; AdvLib.AdvGetFileVersion({file!r})',
+    'import Adv2.Adv2File': 'import Adv2.Adv2File',
+    'open + metadata (mmap)': "from Adv2.Adv2File import Adv2reader; Adv2reader({file!r}, 'mmap').getAdvFileMetaData()",
+    'open + metadata (native)': ("from Adv2.Adv2File import Adv2reader; "
+                                 "Adv2reader({file!r}, 'native').getAdvFileMetaData()"),
+}
+
+
+def timeProcess(code: str, repeat: int) -> float:
+    # Median wall clock seconds of running code in a new interpreter
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT) + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], env=env, check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def runBenchmark(filename: str, repeat: int) -> Dict[str, float]:
+    # Returns the median milliseconds of each scenario (over and above starting an empty interpreter)
+    baseline = timeProcess('pass', repeat)
+    results = {'empty interpreter (subtracted)': round(1000 * baseline, 1)}
+    for name, code in SCENARIOS.items():
+        results[name] = round(1000 * (timeProcess(code.format(file=filename), repeat) - baseline), 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import and startup time of the Adv2 package')
+    parser.add_argument('file', nargs='?', default=str(SAMPLE_FILE), help='ADV file used by the scenarios')
+    parser.add_argument('--repeat', type=int, default=20, help='runs of each scenario (the median is reported)')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args()
+
+    results = runBenchmark(args.file, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, milliseconds in results.items():
+            print(f'{name:40s} {milliseconds:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# We use type hinting so that it is easy to see the intent as matching the C++/C# code
+
+# Measures the read paths of Adv2reader with each backend: opening a file, loading its index, reading frames
+# in order and in random order, and extracting the status tags and the timestamps of every frame.
+# Adv2reader reads the status tags and timestamps through a mmap view of the frame headers whatever the backend,
+# so statusTable and timestamps time the same code for every backend; statusTableOwnBackend and
+# timestampsOwnBackend time the backend's own per-frame path instead (the one used for files that the mmap
+# parser cannot read), which for native and process decodes every frame.
+# Unless an existing file is given, a synthetic file of the requested shape is written first (see
+# AdvSyntheticWriter.py). Every measurement is repeated --repeat times with a newly opened reader (so nothing
+# is already cached) and the median is reported. The results are printed as JSON.
+#
+#     python -m benchmarks.AdvReadBenchmark [--file some.adv] [--width 640] [--height 480] [--frames 1000]
+#                                           [--bit-depth 16] [--status-tags typical] [--backends native,mmap]
+#                                           [--output-dtype uint16] [--repeat 5] [--output results.json]
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from Adv2 import AdvLib
+from Adv2.Adv import StreamId
+from Adv2.Adv2File import Adv2reader, OUTPUT_DTYPES
+from benchmarks.AdvSyntheticWriter import STATUS_TAG_LAYOUTS, writeSyntheticAdv2
+
+
+def _medianSeconds(setUp: Callable[[], Adv2reader], work: Callable[[Adv2reader], None], repeat: int) -> float:
+    # Median seconds spent in work(rdr), each time with a new reader made by setUp() (which is not timed)
+    times = []
+    for _ in range(repeat):
+        rdr = setUp()
+        try:
+            start = time.perf_counter()
+            work(rdr)
+            times.append(time.perf_counter() - start)
+        finally:
+            rdr.closeFile()
+    return statistics.median(times)
+
+
+def _readFrames(frameNumbers: List[int]) -> Callable[[Adv2reader], None]:
+    def work(rdr: Adv2reader):
+        out = np.empty((rdr.Height, rdr.Width), dtype=rdr.outputDtype)
+        for frameNumber in frameNumbers:
+            err, _, _, _ = rdr.getMainImageAndStatusData(frameNumber, out=out)
+            if err:
+                raise RuntimeError(f'frame {frameNumber}: {err}')
+    return work
+
+
+def _withoutHeaderReader(rdr: Adv2reader) -> Adv2reader:
+    # Makes rdr read status sections and timestamps frame by frame through its backend, as it does when the
+    # mmap parser cannot read the file (see Adv2reader._headerReader()). The mmap backend is its own header reader.
+    if rdr.backend != 'mmap':
+        rdr._headerLib = False
+    return rdr
+
+
+def benchmarkBackend(filename: str, backend: str, repeat: int, randomReads: int, seed: int = 0,
+                     outputDtype: str = 'uint16') -> Dict[str, any]:
+    # Returns the median time of each operation (in milliseconds) and the matching rates for one backend
+    def setUp() -> Adv2reader:
+        return Adv2reader(filename, backend, outputDtype=outputDtype)
+
+    def setUpWithoutHeaderReader() -> Adv2reader:
+        return _withoutHeaderReader(setUp())
+
+    def openAndClose():
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rdr = Adv2reader(filename, backend, outputDtype=outputDtype)
+            times.append(time.perf_counter() - start)
+            rdr.closeFile()
+        return statistics.median(times)
+
+    probe = setUp()
+    numFrames, frameBytes = probe.CountMainFrames, probe.Width * probe.Height * probe.outputDtype.itemsize
+    probe.closeFile()
+
+    rng = np.random.default_rng(seed)
+    randomFrames = rng.integers(0, numFrames, size=min(randomReads, numFrames)).tolist()
+
+    seconds = {
+        'open': openAndClose(),
+        'indexLoad': _medianSeconds(setUp, lambda rdr: rdr.getIndexArrays(), repeat),
+        'sequentialRead': _medianSeconds(setUp, _readFrames(list(range(numFrames))), repeat),
+        'sequentialIterFrames': _medianSeconds(setUp, lambda rdr: [None for _ in rdr.iterFrames()], repeat),
+        'randomRead': _medianSeconds(setUp, _readFrames(randomFrames), repeat),
+        'statusTable': _medianSeconds(setUp, lambda rdr: rdr.getStatusTable(), repeat),
+        'timestamps': _medianSeconds(setUp, lambda rdr: rdr.getTimestamps(StreamId.Main), repeat),
+        'statusTableOwnBackend': _medianSeconds(setUpWithoutHeaderReader, lambda rdr: rdr.getStatusTable(), repeat),
+        'timestampsOwnBackend': _medianSeconds(setUpWithoutHeaderReader,
+                                               lambda rdr: rdr.getTimestamps(StreamId.Main), repeat),
+    }
+
+    results = {f'{name}Ms': round(1000 * value, 3) for name, value in seconds.items()}
+    for name, count in (('sequentialRead', numFrames), ('sequentialIterFrames', numFrames),
+                        ('randomRead', len(randomFrames))):
+        results[f'{name}FramesPerSecond'] = round(count / seconds[name], 1) if seconds[name] > 0 else None
+        results[f'{name}MBPerSecond'] = round(count * frameBytes / seconds[name] / 1e6, 1) if seconds[name] > 0 \
+            else None
+    for name in ('statusTable', 'timestamps', 'statusTableOwnBackend', 'timestampsOwnBackend'):
+        results[f'{name}FramesPerSecond'] = round(numFrames / seconds[name], 1) if seconds[name] > 0 else None
+    return results
+
+
+def runBenchmark(filename: str, backends: List[str], repeat: int, randomReads: int,
+                 outputDtype: str = 'uint16') -> Dict[str, any]:
+    rdr = Adv2reader(filename, 'mmap')
+    fileInfo = {
+        'path': filename,
+        'bytes': os.path.getsize(filename),
+        'width': rdr.Width,
+        'height': rdr.Height,
+        'dataBpp': rdr.FileInfo.DataBpp,
+        'mainFrames': rdr.CountMainFrames,
+        'calibrationFrames': rdr.CountCalibrationFrames,
+        'statusTags': rdr.FileInfo.StatusTagsCount,
+    }
+    rdr.closeFile()
+
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'nativeLibrary': AdvLib.nativeLibraryAvailable(),
+        },
+        'parameters': {'repeat': repeat, 'randomReads': randomReads, 'outputDtype': outputDtype},
+        'file': fileInfo,
+        'results': {},
+    }
+    for backend in backends:
+        if backend in ('native', 'process') and not AdvLib.nativeLibraryAvailable():
+            report['results'][backend] = {'skipped': 'the native library could not be loaded'}
+            continue
+        report['results'][backend] = benchmarkBackend(filename, backend, repeat, randomReads,
+                                                      outputDtype=outputDtype)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read performance of Adv2reader')
+    parser.add_argument('--file', help='an existing ADV file to use instead of a synthetic one')
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--frames', type=int, default=1000)
+    parser.add_argument('--bit-depth', type=int, default=16, help='bits per pixel (12 is written packed)')
+    parser.add_argument('--status-tags', default='typical', choices=sorted(STATUS_TAG_LAYOUTS))
+    parser.add_argument('--backends', default='native,mmap,process', help='comma separated backends to measure')
+    parser.add_argument('--repeat', type=int, default=5, help='runs of each measurement (the median is reported)')
+    parser.add_argument('--random-reads', type=int, default=200, help='frames read in random order')
+    parser.add_argument('--output-dtype', default='uint16', choices=OUTPUT_DTYPES, help='pixel type of the images read')
+    parser.add_argument('--output', help='write the JSON results to this file instead of printing them')
+    args = parser.parse_args()
+
+    backends = [backend.strip() for backend in args.backends.split(',') if backend.strip()]
+    with tempfile.TemporaryDirectory() as folder:
+        filename = args.file
+        if filename is None:
+            filename = os.path.join(folder, 'synthetic.adv')
+            writeSyntheticAdv2(filename, args.width, args.height, args.frames, args.bit_depth, args.status_tags)
+        report = runBenchmark(filename, backends, args.repeat, args.random_reads, args.output_dtype)
+        if args.file is None:
+            report['file']['path'] = None
+            report['file']['synthetic'] = {'statusTagLayout': args.status_tags}
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# We use type hinting so that it is easy to see the intent as matching the C++/C# code
+
+# Writes synthetic (but valid) uncompressed ADV version 2 files of any image size, bit depth, number of frames
+# and status tag layout, so the readers can be benchmarked on files shaped like the ones being recorded
+# without having to keep large sample files around.
+#
+# The frames are written one at a time (only the index is held in memory), so files much larger than memory
+# can be made. The pixel values are a fixed noise pattern plus a star field that drifts a little from frame to
+# frame; every status tag has a value that depends on the frame number.
+#
+#     python -m benchmarks.AdvSyntheticWriter out.adv [--width 640] [--height 480] [--frames 1000]
+#                                                [--bit-depth 16] [--status-tags typical]
+
+import argparse
+import struct
+import sys
+from typing import BinaryIO, Callable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from Adv2.Adv import Adv2TagType
+
+# Nanoseconds from the ADV epoch (2010-01-01) to 2024-01-01, the time of the first synthetic frame
+FIRST_FRAME_NANOSECONDS = 441763200 * 10 ** 9
+
+CLOCK_FREQUENCY = 10_000_000  # ticks per second of the MAIN and CALIBRATION stream clocks
+
+# Named status tag layouts: lists of (tag name, tag type)
+STATUS_TAG_LAYOUTS = {
+    'none': [],
+    'minimal': [('SystemTime', Adv2TagType.Int64)],
+    'typical': [
+        ('Gain', Adv2TagType.Real),
+        ('Gamma', Adv2TagType.Real),
+        ('Shutter', Adv2TagType.Real),
+        ('Offset', Adv2TagType.Real),
+        ('SystemTime', Adv2TagType.Int64),
+        ('VideoCameraFrameId', Adv2TagType.Int64),
+        ('HardwareTimerFrameId', Adv2TagType.Int64),
+        ('TrackedSatellites', Adv2TagType.Int8),
+        ('AlmanacStatus', Adv2TagType.Int8),
+        ('AlmanacOffset', Adv2TagType.Int8),
+        ('SatelliteFixStatus', Adv2TagType.Int8),
+        ('Temperature', Adv2TagType.Int16),
+        ('Error', Adv2TagType.UTF8String),
+    ],
+    'wide': [(f'Tag{i:02d}', Adv2TagType(i % 5)) for i in range(40)] + [('Note', Adv2TagType.UTF8String)],
+}
+
+FRAME_MAGIC = struct.pack('<I', 0xEE0122FF)
+FRAME_HEADER = struct.Struct('<Bqq')  # stream id, start ticks, end ticks
+STATUS_HEADER = struct.Struct('<qIB')  # mid-exposure timestamp, exposure, number of status tags in the frame
+INDEX_ENTRY = struct.Struct('<qqI')  # elapsed ticks, frame offset, frame bytes
+
+STATUS_TAG_FORMATS = {
+    Adv2TagType.Int8: struct.Struct('<B'),
+    Adv2TagType.Int16: struct.Struct('<h'),
+    Adv2TagType.Int32: struct.Struct('<i'),
+    Adv2TagType.Int64: struct.Struct('<q'),
+    Adv2TagType.Real: struct.Struct('<f'),
+}
+
+
+def _utf8String(value: str) -> bytes:
+    encoded = value.encode('utf-8')
+    return struct.pack('<H', len(encoded)) + encoded
+
+
+def _tagPairs(pairs: Sequence[Tuple[str, str]]) -> bytes:
+    return b''.join(_utf8String(name) + _utf8String(value) for name, value in pairs)
+
+
+def _statusTagValue(tagName: str, tagType: Adv2TagType, frameNumber: int, midExposure: int) -> bytes:
+    if tagType == Adv2TagType.UTF8String:
+        return _utf8String('' if tagName == 'Error' else f'frame {frameNumber}')
+    if tagName == 'SystemTime':
+        return STATUS_TAG_FORMATS[tagType].pack(midExposure + 1_000_000)
+    if tagType == Adv2TagType.Real:
+        return STATUS_TAG_FORMATS[tagType].pack(1.0 + (frameNumber % 100) / 8)
+    limit = {Adv2TagType.Int8: 256, Adv2TagType.Int16: 32768, Adv2TagType.Int32: 2 ** 31,
+             Adv2TagType.Int64: 2 ** 63}[tagType]
+    return STATUS_TAG_FORMATS[tagType].pack(frameNumber % limit)
+
+
+def _pack12BitPixels(pixels: np.ndarray) -> bytes:
+    # Two 12 bit pixels in three bytes (the 12BIT-IMAGE-PACKED layout)
+    pairs = pixels.astype(np.uint16).reshape(-1, 2)
+    packed = np.empty((pairs.shape[0], 3), dtype=np.uint8)
+    packed[:, 0] = pairs[:, 0] >> 4
+    packed[:, 1] = ((pairs[:, 0] & 0xF) << 4) | (pairs[:, 1] >> 8)
+    packed[:, 2] = pairs[:, 1] & 0xFF
+    return packed.tobytes()
+
+
+class ImageSource:
+    # Makes the pixels of each frame from a fixed noise pattern and a slowly drifting star field. image(n) is
+    # frame n of a file written with the same width, height, bitDepth and seed (of either stream).
+    def __init__(self, width: int, height: int, bitDepth: int, seed: int):
+        rng = np.random.default_rng(seed)
+        self.maxValue = (1 << bitDepth) - 1
+        self.noise = rng.normal(0.1 * self.maxValue, 0.01 * self.maxValue, (height, width)).astype(np.float32)
+        y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+        self.stars = np.zeros((height, width), dtype=np.float32)
+        for _ in range(max(1, width * height // 20000)):
+            cy, cx = rng.uniform(0, height), rng.uniform(0, width)
+            self.stars += rng.uniform(0.1, 0.6) * self.maxValue * np.exp(-((y - cy) ** 2 + (x - cx) ** 2) / 4.0)
+
+    def image(self, frameNumber: int) -> np.ndarray:
+        stars = np.roll(self.stars, frameNumber // 25, axis=1)
+        return np.clip(self.noise + stars + (frameNumber % 7), 0, self.maxValue).astype(np.uint16)
+
+
+def writeSyntheticAdv2(filename: str, width: int = 640, height: int = 480, frameCount: int = 1000,
+                       bitDepth: int = 16, statusTags: Union[str, Sequence[Tuple[str, Adv2TagType]]] = 'typical',
+                       calibrationFrameCount: int = 0, exposureNanoseconds: int = 40_000_000,
+                       packed12Bit: Optional[bool] = None, seed: int = 0, source: Optional[ImageSource] = None,
+                       omitStatusTag: Optional[Callable[[int, str], bool]] = None) -> int:
+    # Writes the file and returns its size in bytes. bitDepth (1 to 16) is the DataBpp of the file: 8 bit and
+    # shallower images are stored one byte per pixel, 12 bit images in the 12BIT-IMAGE-PACKED layout (unless
+    # packed12Bit is False) and the others two bytes per pixel. statusTags is one of the names in
+    # STATUS_TAG_LAYOUTS or a list of (tag name, Adv2TagType). source gives the pixels of each frame (anything
+    # with image(frameNumber) and maxValue, as ImageSource has); by default it is ImageSource(width, height,
+    # bitDepth, seed). A tag for which omitStatusTag(frameNumber, tagName) is True is left out of that frame's
+    # status section (of either stream), as a recorder does for a value it does not have.
+    if not 1 <= bitDepth <= 16:
+        raise ValueError(f'bitDepth must be between 1 and 16 but was {bitDepth}')
+    if packed12Bit is None:
+        packed12Bit = bitDepth == 12
+    if packed12Bit and (bitDepth != 12 or (width * height) % 2):
+        raise ValueError('The 12 bit packed layout needs a bitDepth of 12 and an even number of pixels')
+    if isinstance(statusTags, str):
+        statusTags = STATUS_TAG_LAYOUTS[statusTags]
+    statusTags = [(name, Adv2TagType(tagType)) for name, tagType in statusTags]
+
+    if packed12Bit:
+        dataLayout, layoutBpp = '12BIT-IMAGE-PACKED', 12
+    else:
+        dataLayout, layoutBpp = 'FULL-IMAGE-RAW', 8 if bitDepth <= 8 else 16
+    pixelDtype = np.dtype(np.uint8) if layoutBpp == 8 else np.dtype('<u2')
+    if source is None:
+        source = ImageSource(width, height, bitDepth, seed)
+
+    with open(filename, 'wb') as f:
+        # The offsets of the index and of the system and user metadata are filled in once they are known
+        f.write(b'FSTF' + bytes([2]) + struct.pack('<I', 0))
+        offsetsPosition = f.tell()
+        f.write(struct.pack('<qqq', 0, 0, 0))
+
+        streamCounts = (('MAIN', frameCount), ('CALIBRATION', calibrationFrameCount))
+        streamsPosition = f.tell()
+        streamsLength = 1 + sum(len(_utf8String(name)) + 24 for name, _ in streamCounts)
+        sectionsLength = 1 + len(_utf8String('IMAGE')) + 8 + len(_utf8String('STATUS')) + 8
+        position = streamsPosition + streamsLength + sectionsLength
+        f.seek(position)
+
+        streamMetadata = []
+        for name, _ in streamCounts:
+            streamMetadata.append(f.tell())
+            pairs = [('Name', name)]
+            f.write(bytes([len(pairs)]) + _tagPairs(pairs))
+
+        imagePosition = f.tell()
+        layoutTags = [('DATA-LAYOUT', dataLayout), ('SECTION-DATA-COMPRESSION', 'UNCOMPRESSED')]
+        imageTags = [('IMAGE-MAX-PIXEL-VALUE', str(source.maxValue))]
+        f.write(bytes([2]) + struct.pack('<II', width, height) + bytes([bitDepth, 1]) +
+                bytes([1, 2, layoutBpp, len(layoutTags)]) + _tagPairs(layoutTags) +
+                bytes([len(imageTags)]) + _tagPairs(imageTags))
+
+        statusPosition = f.tell()
+        f.write(bytes([2]) + struct.pack('<q', 1_000_000) + bytes([len(statusTags)]) +
+                b''.join(_utf8String(name) + bytes([tagType.value]) for name, tagType in statusTags))
+
+        systemMetadataPosition = f.tell()
+        systemMetadata = [('RECORDER-SOFTWARE', 'AdvSyntheticWriter'), ('FSTF-TYPE', 'ADV'), ('ADV-VERSION', '2'),
+                          ('BITPIX', str(bitDepth)), ('WIDTH', str(width)), ('HEIGHT', str(height))]
+        f.write(struct.pack('<I', len(systemMetadata)) + _tagPairs(systemMetadata))
+
+        exposureTicks = exposureNanoseconds * CLOCK_FREQUENCY // 10 ** 9
+        indexes: List[List[bytes]] = [[], []]
+        for streamId, (_, count) in enumerate(streamCounts):
+            for frameNumber in range(count):
+                pixels = source.image(frameNumber)
+                if packed12Bit:
+                    imageData = _pack12BitPixels(pixels)
+                else:
+                    imageData = pixels.astype(pixelDtype).tobytes()
+                image = bytes([1, 0]) + imageData
+
+                midExposure = FIRST_FRAME_NANOSECONDS + frameNumber * exposureNanoseconds + exposureNanoseconds // 2
+                frameTags = [(tagId, name, tagType) for tagId, (name, tagType) in enumerate(statusTags)
+                             if omitStatusTag is None or not omitStatusTag(frameNumber, name)]
+                status = b''.join(bytes([tagId]) + _statusTagValue(name, tagType, frameNumber, midExposure)
+                                  for tagId, name, tagType in frameTags)
+                status = STATUS_HEADER.pack(midExposure, exposureNanoseconds, len(frameTags)) + status
+
+                startTicks = frameNumber * exposureTicks
+                body = (FRAME_HEADER.pack(streamId, startTicks, startTicks + exposureTicks) +
+                        struct.pack('<I', len(image)) + image + struct.pack('<I', len(status)) + status)
+                indexes[streamId].append(INDEX_ENTRY.pack(startTicks, f.tell(), len(body)))
+                f.write(FRAME_MAGIC + body)
+
+        indexPosition = f.tell()
+        mainIndex = struct.pack('<I', len(indexes[0])) + b''.join(indexes[0])
+        calibIndex = struct.pack('<I', len(indexes[1])) + b''.join(indexes[1])
+        f.write(bytes([2]) + struct.pack('<II', 9, 9 + len(mainIndex)) + mainIndex + calibIndex)
+
+        userMetadataPosition = f.tell()
+        userMetadata = [('OBSERVER', 'Synthetic')]
+        f.write(struct.pack('<I', len(userMetadata)) + _tagPairs(userMetadata))
+        fileSize = f.tell()
+
+        f.seek(offsetsPosition)
+        f.write(struct.pack('<qqq', indexPosition, systemMetadataPosition, userMetadataPosition))
+        _writeStreamsAndSections(f, streamCounts, streamMetadata, imagePosition, statusPosition)
+    return fileSize
+
+
+def _writeStreamsAndSections(f: BinaryIO, streamCounts, streamMetadata: List[int], imagePosition: int,
+                             statusPosition: int):
+    f.write(bytes([len(streamCounts)]))
+    for (name, count), metadataPosition in zip(streamCounts, streamMetadata):
+        f.write(_utf8String(name) + struct.pack('<IqIq', count, CLOCK_FREQUENCY, 10, metadataPosition))
+    f.write(bytes([2]) + _utf8String('IMAGE') + struct.pack('<q', imagePosition) +
+            _utf8String('STATUS') + struct.pack('<q', statusPosition))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a synthetic ADV version 2 file')
+    parser.add_argument('file', help='the file to write')
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--frames', type=int, default=1000, help='number of MAIN frames')
+    parser.add_argument('--calibration-frames', type=int, default=0, help='number of CALIBRATION frames')
+    parser.add_argument('--bit-depth', type=int, default=16, help='bits per pixel (12 is written packed)')
+    parser.add_argument('--status-tags', default='typical', choices=sorted(STATUS_TAG_LAYOUTS),
+                        help='status tag layout')
+    args = parser.parse_args()
+
+    size = writeSyntheticAdv2(args.file, args.width, args.height, args.frames, args.bit_depth, args.status_tags,
+                              args.calibration_frames)
+    print(f'Wrote {args.file} ({size / 2 ** 20:.1f} MiB)', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
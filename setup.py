@@ -15,7 +15,7 @@ CLASSIFIERS = [
     "Operating System :: MacOS :: MacOS X",
     "Operating System :: Microsoft :: Windows",
     "Operating System :: POSIX :: Linux",
-    "Programming Language :: Python :: 3.7",
+    "Programming Language :: Python :: 3.8",
     "Topic :: Scientific/Engineering",
 ]
 
@@ -27,7 +27,7 @@ README = (HERE / "README.md").read_text()
 
 setup(
     name="Adv2",
-    python_requires='>=3.7',
+    python_requires='>=3.8',
     description='Adv2reader reads version 2 Astro Digital Video files.',
     license='License :: OSI Approved :: MIT License',
     url=r'https://github.com/bob-anderson-ok/adv2reader',
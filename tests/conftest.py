@@ -0,0 +1,74 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# Fixtures shared by the tests: the sample file shipped with the package and small synthetic files (written by
+# benchmarks.AdvSyntheticWriter) whose pixels, timestamps and status tags are known exactly.
+
+import os
+from typing import Dict
+
+import numpy as np
+import pytest
+
+from Adv2 import AdvLib
+from benchmarks.AdvSyntheticWriter import FIRST_FRAME_NANOSECONDS, ImageSource, writeSyntheticAdv2
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Adv2',
+                           'UnitTestSample.adv')
+
+SYNTHETIC_WIDTH = 40
+SYNTHETIC_HEIGHT = 30
+SYNTHETIC_FRAMES = 60
+SYNTHETIC_CALIBRATION_FRAMES = 4
+SYNTHETIC_EXPOSURE = 40_000_000  # nanoseconds
+
+# Bit depths of the synthetic files: 8 and 10 bit are stored raw (one and two bytes per pixel), 12 bit in the
+# 12BIT-IMAGE-PACKED layout and 16 bit raw
+SYNTHETIC_BIT_DEPTHS = {'8bit': 8, '10bit': 10, '12bitPacked': 12, '16bit': 16}
+
+requiresNative = pytest.mark.skipif(not AdvLib.nativeLibraryAvailable(),
+                                    reason='the native AdvLib library cannot be loaded here')
+
+# The region of interest used by the tests, (y0, y1, x0, x1), and the window of an image (or a stack) it selects
+ROI = (3, 17, 5, 31)
+ROI_WINDOW = np.s_[..., 3:17, 5:31]
+
+# The backends that can read the synthetic files, for parametrize
+BACKENDS = ['mmap', pytest.param('native', marks=requiresNative), pytest.param('process', marks=requiresNative)]
+
+
+class SyntheticFile:
+    # A synthetic file and the values that were written to it
+    def __init__(self, filename: str, bitDepth: int):
+        self.filename = filename
+        self.bitDepth = bitDepth
+        self._source = ImageSource(SYNTHETIC_WIDTH, SYNTHETIC_HEIGHT, bitDepth, 0)
+
+    def image(self, frameNumber: int) -> np.ndarray:
+        return self._source.image(frameNumber)
+
+    def images(self, frameNumbers) -> np.ndarray:
+        return np.stack([self.image(frameNumber) for frameNumber in frameNumbers])
+
+    @staticmethod
+    def startOfExposure(frameNumber: int) -> int:
+        return FIRST_FRAME_NANOSECONDS + frameNumber * SYNTHETIC_EXPOSURE
+
+
+@pytest.fixture(scope='session')
+def syntheticFiles(tmp_path_factory) -> Dict[str, SyntheticFile]:
+    folder = tmp_path_factory.mktemp('synthetic')
+    files = {}
+    for name, bitDepth in SYNTHETIC_BIT_DEPTHS.items():
+        filename = str(folder / f'{name}.adv')
+        writeSyntheticAdv2(filename, SYNTHETIC_WIDTH, SYNTHETIC_HEIGHT, SYNTHETIC_FRAMES, bitDepth,
+                           calibrationFrameCount=SYNTHETIC_CALIBRATION_FRAMES, exposureNanoseconds=SYNTHETIC_EXPOSURE)
+        files[name] = SyntheticFile(filename, bitDepth)
+    return files
+
+
+@pytest.fixture(params=list(SYNTHETIC_BIT_DEPTHS))
+def syntheticFile(request, syntheticFiles) -> SyntheticFile:
+    return syntheticFiles[request.param]
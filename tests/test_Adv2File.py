@@ -0,0 +1,305 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# Reading frames with Adv2reader, with each backend
+
+import multiprocessing
+import warnings
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from Adv2.Adv import Adv2TagType, StreamId
+from Adv2.Adv2File import Adv2reader, MISSING_TIMESTAMP
+from Adv2.AdvError import AdvLibException
+from benchmarks.AdvSyntheticWriter import STATUS_TAG_LAYOUTS, writeSyntheticAdv2
+from tests.conftest import BACKENDS, ROI, ROI_WINDOW
+
+
+def missingStatusTag(frameNumber: int, tagName: str) -> bool:
+    # The status tags left out of the frames of the file written by gappyFile
+    return ((tagName == 'Temperature' and frameNumber % 3 == 0) or (tagName == 'Note' and frameNumber % 5 == 0) or
+            (tagName == 'Gain' and frameNumber == 7))
+
+
+@pytest.fixture(scope='module')
+def gappyFile(tmp_path_factory) -> str:
+    filename = str(tmp_path_factory.mktemp('gappy') / 'gappy.adv')
+    # Note holds 'frame <n>': the native library reports a missing string tag as '', so a tag that is '' in
+    # every frame (as Error is) could not be told apart from a missing one without the header reader
+    statusTags = STATUS_TAG_LAYOUTS['typical'] + [('Note', Adv2TagType.UTF8String)]
+    writeSyntheticAdv2(filename, 40, 30, 30, 16, statusTags=statusTags, omitStatusTag=missingStatusTag)
+    return filename
+
+
+@pytest.fixture(params=BACKENDS)
+def reader(request, syntheticFile):
+    rdr = Adv2reader(syntheticFile.filename, backend=request.param)
+    yield rdr
+    rdr.closeFile()
+
+
+def test_outArrayIsFilled(reader, syntheticFile):
+    out = np.zeros((reader.Height, reader.Width), dtype=np.uint16)
+    for frameNumber in (0, 31, 5):
+        err, pixels, _, _ = reader.getMainImageAndStatusData(frameNumber, out=out)
+        assert err == ''
+        assert pixels is out
+        np.testing.assert_array_equal(out, syntheticFile.image(frameNumber))
+
+
+def test_outArrayWithRoi(reader, syntheticFile):
+    out = np.zeros((14, 26), dtype=np.uint16)
+    err, pixels, _, _ = reader.getMainImageAndStatusData(8, out=out, roi=ROI)
+    assert err == ''
+    assert pixels is out
+    np.testing.assert_array_equal(out, syntheticFile.image(8)[ROI_WINDOW])
+
+
+def test_outArrayFromFrameCache(reader, syntheticFile):
+    reader.enableFrameCache()
+    reader.getMainImageAndStatusData(4)
+    out = np.zeros((reader.Height, reader.Width), dtype=np.uint16)
+    err, pixels, _, _ = reader.getMainImageAndStatusData(4, out=out)
+    assert err == ''
+    assert pixels is out
+    assert out.flags.writeable
+    np.testing.assert_array_equal(out, syntheticFile.image(4))
+
+
+def test_framesAreNotShared(reader, syntheticFile):
+    # Without out each frame is returned in a new array
+    _, first, _, _ = reader.getMainImageAndStatusData(1)
+    _, second, _, _ = reader.getMainImageAndStatusData(2)
+    np.testing.assert_array_equal(first, syntheticFile.image(1))
+    np.testing.assert_array_equal(second, syntheticFile.image(2))
+
+
+def test_readOnlyImages(reader, syntheticFile):
+    # Only the mmap backend returns views into the file, and only of raw images already in the output dtype
+    isView = reader.backend == 'mmap' and syntheticFile.bitDepth in (10, 16)
+    _, pixels, _, _ = reader.getMainImageAndStatusData(3)
+    assert pixels.flags.writeable == (not isView)
+    np.testing.assert_array_equal(pixels, syntheticFile.image(3))
+    _, pixels, _, _ = reader.getMainImageAndStatusData(3, out=np.empty((30, 40), dtype=np.uint16))
+    pixels += 1
+    np.testing.assert_array_equal(pixels, syntheticFile.image(3) + 1)
+
+
+def test_closingWithImagesInUse(syntheticFiles):
+    rdr = Adv2reader(syntheticFiles['16bit'].filename, backend='mmap')
+    _, kept, _, _ = rdr.getMainImageAndStatusData(5)
+    with pytest.warns(RuntimeWarning, match='stays mapped'):
+        rdr.closeFile()
+    np.testing.assert_array_equal(kept, syntheticFiles['16bit'].image(5))
+
+    rdr = Adv2reader(syntheticFiles['16bit'].filename, backend='mmap')
+    rdr.getMainImageAndStatusData(5)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        rdr.closeFile()
+
+
+@pytest.mark.parametrize('shape, dtype', [((30, 41), np.uint16), ((30, 40), np.uint32), ((30, 40), np.float32)])
+def test_badOutArrayIsRejected(reader, shape, dtype):
+    with pytest.raises(AdvLibException):
+        reader.getMainImageAndStatusData(0, out=np.zeros(shape, dtype=dtype))
+
+
+@pytest.mark.parametrize('selection, frameNumbers', [
+    ({}, list(range(60))),
+    ({'start': 5, 'stop': 20, 'step': 4}, [5, 9, 13, 17]),
+    ({'start': -3}, [57, 58, 59]),
+    ({'frames': slice(50, None, 3)}, [50, 53, 56, 59]),
+    ({'frames': [7, 2, 2, 40]}, [7, 2, 2, 40]),
+    ({'start': 30, 'stop': 10}, []),
+])
+def test_imageStack(reader, syntheticFile, selection, frameNumbers):
+    images, frameInfos, timestamps = reader.getMainImageStack(**selection)
+    assert images.shape == (len(frameNumbers), reader.Height, reader.Width)
+    assert images.dtype == np.uint16
+    np.testing.assert_array_equal(reader.frameNumbers(**selection), frameNumbers)
+    if frameNumbers:
+        np.testing.assert_array_equal(images, syntheticFile.images(frameNumbers))
+    np.testing.assert_array_equal(timestamps, [syntheticFile.startOfExposure(n) for n in frameNumbers])
+    np.testing.assert_array_equal(frameInfos['Exposure'], [40_000_000] * len(frameNumbers))
+
+
+def test_imageStackIntoOutWithRoi(reader, syntheticFile):
+    out = np.zeros((4, 14, 26), dtype=np.uint16)
+    images, _, _ = reader.getCalibImageStack(out=out, roi=ROI)
+    assert images is out
+    np.testing.assert_array_equal(out, syntheticFile.images(range(4))[ROI_WINDOW])
+
+
+def test_imageStackMatchesSingleFrames(reader):
+    images, frameInfos, _ = reader.getMainImageStack(frames=[3, 11])
+    for image, frameInfo, frameNumber in zip(images, frameInfos, (3, 11)):
+        _, pixels, singleFrameInfo, _ = reader.getMainImageAndStatusData(frameNumber)
+        np.testing.assert_array_equal(image, pixels)
+        assert tuple(frameInfo) == tuple(getattr(singleFrameInfo, name) for name in frameInfos.dtype.names)
+
+
+@pytest.mark.parametrize('selection', [{'frames': [0, 60]}, {'frames': [-1]}, {'out': np.zeros((60, 30, 41))},
+                                       {'roi': (0, 31, 0, 40)}, {'roi': (5, 5, 0, 40)}])
+def test_badImageStackArguments(reader, selection):
+    with pytest.raises(AdvLibException):
+        reader.getMainImageStack(**selection)
+
+
+# Frame n of the synthetic files starts at 2024-01-01T00:00:00 + n * 40 ms
+@pytest.mark.parametrize('t0, t1, expected', [
+    (None, None, slice(0, 60)),
+    ('2024-01-01T00:00:01', None, slice(25, 60)),
+    ('2024-01-01T00:00:00.990', '2024-01-01 00:00:01.030', slice(25, 26)),
+    ('00:00:01.5', '[00:00:02.000000]', slice(38, 50)),
+    (datetime(2024, 1, 1, 0, 0, 1), datetime(2024, 1, 1, 1, 0, 1, tzinfo=timezone(timedelta(hours=1))),
+     slice(25, 25)),
+    (np.datetime64('2024-01-01T00:00:00.080'), np.datetime64('2024-01-01T00:00:00.081'), slice(2, 3)),
+    (441763200 * 10 ** 9 + 120_000_000, None, slice(3, 60)),
+    ('2023-12-31T23:00:00', '2024-01-01T00:00:00', slice(0, 0)),
+    ('2024-01-02T00:00:00', None, slice(60, 60)),
+    ('2024-01-01T00:00:02', '2024-01-01T00:00:01', slice(50, 50)),
+])
+def test_framesInTimeRange(reader, t0, t1, expected):
+    assert reader.framesInTimeRange(t0, t1) == expected
+
+
+def test_framesInTimeRangeWithoutHeaderReader(reader, syntheticFile):
+    # Files the mmap parser cannot read are searched by decoding frames as they are visited
+    if reader.backend == 'mmap':
+        pytest.skip('the mmap backend always reads the frame headers')
+    reader._headerLib = False
+    for frameNumber in (0, 1, 17, 59):
+        t = syntheticFile.startOfExposure(frameNumber)
+        assert reader.framesInTimeRange(t) == slice(frameNumber, 60)
+        assert reader.framesInTimeRange(t - 1, t + 1) == slice(frameNumber, frameNumber + 1)
+    assert reader.framesInTimeRange(syntheticFile.startOfExposure(2), stream=StreamId.Calibration) == slice(2, 4)
+    # Only the frames visited by the searches were decoded
+    decoded = np.count_nonzero(reader._lazyStartOfExposure[StreamId.Main] != MISSING_TIMESTAMP)
+    assert 0 < decoded < 40
+    assert StreamId.Main not in reader._timestamps
+
+
+def test_framesInTimeRangeSelectsStack(reader, syntheticFile):
+    frames = reader.framesInTimeRange('00:00:00.2', '00:00:00.4')
+    images, _, timestamps = reader.getMainImageStack(frames=frames)
+    np.testing.assert_array_equal(images, syntheticFile.images(range(5, 10)))
+    assert timestamps[0] == syntheticFile.startOfExposure(5)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_failedOpenReleasesTheBackend(syntheticFiles, tmp_path, backend):
+    # A reader whose constructor raises must not keep the native library or a worker process, even while the
+    # exception (whose traceback refers to the half made reader) is kept
+    filename = syntheticFiles['16bit'].filename
+    version1 = tmp_path / 'version1.adv'
+    content = bytearray(open(filename, 'rb').read())
+    content[4] = 1  # The version byte follows the 'FSTF' magic
+    version1.write_bytes(bytes(content))
+
+    workers = len(multiprocessing.active_children())
+    failures = []
+    for failingFile, options in ((str(version1), {}), (filename, {'outputDtype': 'uint8'})):
+        try:
+            Adv2reader(failingFile, backend=backend, **options)
+        except AdvLibException as exc:
+            failures.append(exc)
+    assert len(failures) == 2
+    assert len(multiprocessing.active_children()) == workers
+
+    if backend != 'mmap':
+        rdr = Adv2reader(filename)
+        try:
+            assert rdr.backend == 'native'
+        finally:
+            rdr.closeFile()
+
+
+@pytest.mark.parametrize('headerReader', [True, False])
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_statusTableMasksMissingTags(gappyFile, backend, headerReader):
+    rdr = Adv2reader(gappyFile, backend=backend)
+    try:
+        if not headerReader:
+            if backend == 'mmap':
+                pytest.skip('the mmap backend always reads the frame headers')
+            rdr._headerLib = False  # Read each frame's status with the backend itself
+        frameNumbers, table = rdr.getStatusTable(start=1)
+    finally:
+        rdr.closeFile()
+    np.testing.assert_array_equal(frameNumbers, range(1, 30))
+    for tagName, dtype in (('Temperature', np.int16), ('Note', object), ('Gain', np.float32)):
+        column = table[tagName]
+        assert column.dtype == dtype
+        np.testing.assert_array_equal(column.mask, [missingStatusTag(n, tagName) for n in frameNumbers])
+    np.testing.assert_array_equal(table['Temperature'].compressed(), [n for n in frameNumbers if n % 3])
+    assert list(table['Note'].compressed()) == [f'frame {n}' for n in frameNumbers if n % 5]
+    np.testing.assert_array_equal(table['Gain'].compressed(), [1.0 + n / 8 for n in frameNumbers if n != 7])
+    assert not table['VideoCameraFrameId'].mask.any()
+    np.testing.assert_array_equal(table['VideoCameraFrameId'], frameNumbers)
+
+
+@pytest.mark.parametrize('outputDtype, scaleTo16Bit', [('native', False), ('uint8', False), ('float32', False),
+                                                       ('uint16', True), ('float32', True)])
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_outputDtypes(syntheticFile, backend, outputDtype, scaleTo16Bit):
+    bitDepth = syntheticFile.bitDepth
+    if outputDtype == 'uint8' and bitDepth > 8:
+        pytest.skip('uint8 images cannot hold the pixels of this file (see test_uint8Overflow)')
+    expectedDtype = {'native': np.uint8 if bitDepth <= 8 else np.uint16}.get(outputDtype, outputDtype)
+    shift = 16 - bitDepth if scaleTo16Bit else 0
+
+    rdr = Adv2reader(syntheticFile.filename, backend=backend, outputDtype=outputDtype, scaleTo16Bit=scaleTo16Bit)
+    try:
+        assert rdr.outputDtype == np.dtype(expectedDtype)
+        assert rdr.pixelScale == 1 << shift
+
+        def expected(frameNumbers):
+            return syntheticFile.images(frameNumbers).astype(expectedDtype) * rdr.pixelScale
+
+        for frameNumber in (0, 13, 59):
+            err, pixels, _, _ = rdr.getMainImageAndStatusData(frameNumber)
+            assert err == ''
+            assert pixels.dtype == rdr.outputDtype
+            np.testing.assert_array_equal(pixels, expected([frameNumber])[0])
+
+            out = np.zeros(rdr.imageShape(ROI), dtype=expectedDtype)
+            _, window, _, _ = rdr.getMainImageAndStatusData(frameNumber, out=out, roi=ROI)
+            assert window is out
+            np.testing.assert_array_equal(out, expected([frameNumber])[0][ROI_WINDOW])
+
+        images, _, _ = rdr.getMainImageStack(start=4, stop=40, step=5)
+        assert images.dtype == rdr.outputDtype
+        np.testing.assert_array_equal(images, expected(range(4, 40, 5)))
+
+        images, _, _ = rdr.getCalibImageStack(roi=ROI)
+        np.testing.assert_array_equal(images, expected(range(4))[ROI_WINDOW])
+
+        for frameNumber, pixels, _, _ in rdr.iterFrames(start=20, stop=26, prefetch=2):
+            assert pixels.dtype == rdr.outputDtype
+            np.testing.assert_array_equal(pixels, expected([frameNumber])[0])
+        del pixels, window  # May be views of the file mapping, which closeFile() warns about
+    finally:
+        rdr.closeFile()
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_uint8Overflow(syntheticFiles, backend):
+    # uint8 images cannot hold pixels of more than 8 bits, nor 8 bit pixels scaled to 16 bits
+    for name, scaleTo16Bit in (('10bit', False), ('12bitPacked', False), ('16bit', False), ('8bit', True)):
+        with pytest.raises(AdvLibException, match='uint8 images cannot hold'):
+            Adv2reader(syntheticFiles[name].filename, backend=backend, outputDtype='uint8', scaleTo16Bit=scaleTo16Bit)
+    with pytest.raises(AdvLibException, match='outputDtype must be one of'):
+        Adv2reader(syntheticFiles['8bit'].filename, backend=backend, outputDtype='int32')
+
+    # The backend was released by the failed opens
+    rdr = Adv2reader(syntheticFiles['8bit'].filename, backend=backend, outputDtype='uint8')
+    try:
+        assert rdr.outputDtype == np.uint8
+        np.testing.assert_array_equal(rdr.getMainImageAndStatusData(3)[1], syntheticFiles['8bit'].image(3))
+    finally:
+        rdr.closeFile()
@@ -0,0 +1,120 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# Reads through AsyncAdv2reader against the same reads through Adv2reader
+
+import asyncio
+from contextlib import aclosing
+
+import numpy as np
+import pytest
+
+from Adv2.Adv import StreamId
+from Adv2.Adv2File import Adv2reader
+from Adv2.AdvAsync import AsyncAdv2reader
+from Adv2.AdvError import AdvLibException
+from tests.conftest import BACKENDS, ROI
+
+
+def syncFrames(filename: str, frameNumbers, stream: StreamId = StreamId.Main, roi=None):
+    # (frameNo, image, frame info fields, status) of each frame, read with an mmap Adv2reader
+    rdr = Adv2reader(filename, backend='mmap')
+    try:
+        frames = []
+        for frameNumber in frameNumbers:
+            err, image, frameInfo, status = rdr.getImageAndStatusData(frameNumber, stream, roi=roi)
+            assert err == ''
+            frames.append((frameNumber, image.copy(), dict(vars(frameInfo)), status))
+        del image  # May be a view of the file mapping, which closeFile() warns about
+        return frames
+    finally:
+        rdr.closeFile()
+
+
+def copied(frames):
+    # The images of the mmap backend may be views of the file mapping, so those kept after the reader is closed are
+    # copied
+    return [(first, image.copy(), frameInfo, status) for first, image, frameInfo, status in frames]
+
+
+def assertFramesEqual(asyncFrames, expected):
+    assert [frame[0] for frame in asyncFrames] == [frame[0] for frame in expected]
+    for (_, image, frameInfo, status), (_, expectedImage, expectedInfo, expectedStatus) in zip(asyncFrames,
+                                                                                               expected):
+        np.testing.assert_array_equal(image, expectedImage)
+        assert dict(vars(frameInfo)) == expectedInfo
+        assert status == expectedStatus
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_getFrameEqualsSyncRead(syntheticFile, backend):
+    frameNumbers = [0, 17, 3, 59, 17]
+
+    async def readFrames():
+        async with AsyncAdv2reader(syntheticFile.filename, backend=backend, maxInFlight=2) as ardr:
+            assert (ardr.Width, ardr.Height, ardr.CountMainFrames) == (40, 30, 60)
+            results = copied(await asyncio.gather(*(ardr.getFrame(frameNumber) for frameNumber in frameNumbers)))
+            window = copied([await ardr.getFrame(2, StreamId.Calibration, roi=ROI)])[0]
+        return results, window
+
+    results, window = asyncio.run(readFrames())
+    assert all(err == '' for err, _, _, _ in results)
+    # Each result has its own frame info, even though the reader reuses its own
+    assert len({id(frameInfo) for _, _, frameInfo, _ in results}) == len(results)
+    assertFramesEqual([(frameNumber,) + tuple(result[1:]) for frameNumber, result in zip(frameNumbers, results)],
+                      syncFrames(syntheticFile.filename, frameNumbers))
+    assertFramesEqual([(2,) + tuple(window[1:])],
+                      syncFrames(syntheticFile.filename, [2], StreamId.Calibration, ROI))
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_framesEqualSyncReads(syntheticFile, backend):
+    async def readFrames():
+        async with AsyncAdv2reader(syntheticFile.filename, backend=backend) as ardr:
+            every = copied([frame async for frame in ardr.frames(start=5, stop=40, step=3, prefetch=3)])
+            windows = copied([frame async for frame in ardr.frames(StreamId.Calibration, roi=ROI)])
+            timestamps = await ardr.run(Adv2reader.getTimestamps)
+        return every, windows, timestamps
+
+    every, windows, timestamps = asyncio.run(readFrames())
+    assertFramesEqual(every, syncFrames(syntheticFile.filename, range(5, 40, 3)))
+    assertFramesEqual(windows, syncFrames(syntheticFile.filename, range(4), StreamId.Calibration, ROI))
+    np.testing.assert_array_equal(timestamps[0], [syntheticFile.startOfExposure(n) for n in range(60)])
+
+
+def test_leavingFramesEarly(syntheticFiles):
+    filename = syntheticFiles['16bit'].filename
+
+    async def readSome():
+        async with AsyncAdv2reader(filename, backend='mmap', maxInFlight=3) as ardr:
+            seen = []
+            async with aclosing(ardr.frames()) as frames:
+                async for frameNumber, *_ in frames:
+                    seen.append(frameNumber)
+                    if frameNumber == 4:
+                        break
+            # The requests still outstanding were cancelled and the reader can be used again
+            err, image, _, _ = copied([await ardr.getFrame(30)])[0]
+        return seen, err, image
+
+    seen, err, image = asyncio.run(readSome())
+    assert seen == [0, 1, 2, 3, 4]
+    assert err == ''
+    np.testing.assert_array_equal(image, syntheticFiles['16bit'].image(30))
+
+
+def test_closedReader(syntheticFiles):
+    async def useClosed():
+        ardr = AsyncAdv2reader(syntheticFiles['16bit'].filename, backend='mmap')
+        with pytest.raises(AdvLibException):
+            await ardr.getFrame(0)
+        await ardr.open()
+        await ardr.close()
+        with pytest.raises(AdvLibException):
+            await ardr.getFrame(0)
+
+    asyncio.run(useClosed())
+    with pytest.raises(AdvLibException):
+        AsyncAdv2reader(syntheticFiles['16bit'].filename, maxInFlight=0)
@@ -0,0 +1,143 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# The mmap backend against the values written to the synthetic files and against the native library
+
+import copy
+
+import numpy as np
+import pytest
+
+from Adv2.Adv import StreamId
+from Adv2.Adv2File import Adv2reader
+from tests.conftest import ROI, ROI_WINDOW, SAMPLE_FILE, SYNTHETIC_CALIBRATION_FRAMES, SYNTHETIC_EXPOSURE, \
+    SYNTHETIC_FRAMES, requiresNative
+
+
+@pytest.fixture
+def readers():
+    # Opens a file with the native and the mmap backend, and closes both readers after the test
+    opened = []
+
+    def openReaders(filename: str):
+        for backend in ('native', 'mmap'):
+            opened.append(Adv2reader(filename, backend=backend))
+        return opened
+
+    yield openReaders
+    for rdr in opened:
+        rdr.closeFile()
+
+
+def test_mmapReadsSyntheticFrames(syntheticFile):
+    rdr = Adv2reader(syntheticFile.filename, backend='mmap')
+    try:
+        assert (rdr.Width, rdr.Height) == (40, 30)
+        assert rdr.CountMainFrames == SYNTHETIC_FRAMES
+        assert rdr.CountCalibrationFrames == SYNTHETIC_CALIBRATION_FRAMES
+        assert rdr.FileInfo.DataBpp == syntheticFile.bitDepth
+
+        for frameNumber in (0, 1, 26, SYNTHETIC_FRAMES - 1):
+            err, pixels, frameInfo, status = rdr.getMainImageAndStatusData(frameNumber)
+            assert err == ''
+            assert pixels.dtype == np.uint16
+            np.testing.assert_array_equal(pixels, syntheticFile.image(frameNumber))
+            midExposure = frameInfo.UtcMidExposureTimestampLo + (frameInfo.UtcMidExposureTimestampHi << 32)
+            assert midExposure == syntheticFile.startOfExposure(frameNumber) + SYNTHETIC_EXPOSURE // 2
+            assert frameInfo.Exposure == SYNTHETIC_EXPOSURE
+            assert status['VideoCameraFrameId'] == frameNumber
+            assert status['Gain'] == pytest.approx(1.0 + frameNumber / 8)
+            assert status['Error'] == ''
+
+            _, window, _, _ = rdr.getMainImageAndStatusData(frameNumber, roi=ROI)
+            np.testing.assert_array_equal(window, syntheticFile.image(frameNumber)[ROI_WINDOW])
+
+        images, frameInfos, timestamps = rdr.getMainImageStack(start=2, stop=50, step=3)
+        frameNumbers = list(range(2, 50, 3))
+        np.testing.assert_array_equal(images, syntheticFile.images(frameNumbers))
+        np.testing.assert_array_equal(timestamps, [syntheticFile.startOfExposure(n) for n in frameNumbers])
+        assert (frameInfos['Exposure'] == SYNTHETIC_EXPOSURE).all()
+
+        images, _, _ = rdr.getCalibImageStack(roi=ROI)
+        expected = syntheticFile.images(range(SYNTHETIC_CALIBRATION_FRAMES))[ROI_WINDOW]
+        np.testing.assert_array_equal(images, expected)
+
+        startOfExposure, midExposure, exposure, _ = rdr.getTimestamps()
+        np.testing.assert_array_equal(startOfExposure,
+                                      [syntheticFile.startOfExposure(n) for n in range(SYNTHETIC_FRAMES)])
+        np.testing.assert_array_equal(midExposure - startOfExposure, exposure // 2)
+
+        frameNumbers, table = rdr.getStatusTable()
+        np.testing.assert_array_equal(table['VideoCameraFrameId'], frameNumbers)
+        np.testing.assert_array_equal(table['TrackedSatellites'], frameNumbers % 256)
+        assert not table['Temperature'].mask.any()
+        del pixels, window  # May be views of the file mapping, which closeFile() warns about
+    finally:
+        rdr.closeFile()
+
+
+@requiresNative
+def test_backendsAgreeOnSyntheticFiles(syntheticFile, readers):
+    native, mmap = readers(syntheticFile.filename)
+    assert vars(native.FileInfo) == vars(mmap.FileInfo)
+    assert native.statusTagInfo == mmap.statusTagInfo
+    assert native.getAdvFileMetaData() == mmap.getAdvFileMetaData()
+
+    for stream, frameCount in ((StreamId.Main, SYNTHETIC_FRAMES),
+                               (StreamId.Calibration, SYNTHETIC_CALIBRATION_FRAMES)):
+        for frameNumber in range(0, frameCount, 7):
+            results = []
+            for rdr in (native, mmap):
+                err, pixels, frameInfo, status = rdr.getImageAndStatusData(frameNumber, stream)
+                results.append((err, pixels.copy(), copy.copy(frameInfo), status))
+            (nativeErr, nativePixels, nativeInfo, nativeStatus), (mmapErr, mmapPixels, mmapInfo, mmapStatus) = results
+            assert nativeErr == mmapErr == ''
+            np.testing.assert_array_equal(nativePixels, mmapPixels)
+            assert vars(nativeInfo) == vars(mmapInfo)
+            assert nativeStatus == mmapStatus
+
+            _, nativeWindow, _, _ = native.getImageAndStatusData(frameNumber, stream, roi=ROI)
+            nativeWindow = nativeWindow.copy()
+            _, mmapWindow, _, _ = mmap.getImageAndStatusData(frameNumber, stream, roi=ROI)
+            np.testing.assert_array_equal(nativeWindow, mmapWindow)
+
+        nativeStack = native.getImageStack(stream, frames=slice(None, None, 2))
+        mmapStack = mmap.getImageStack(stream, frames=slice(None, None, 2))
+        for nativeArray, mmapArray in zip(nativeStack, mmapStack):
+            np.testing.assert_array_equal(nativeArray, mmapArray)
+
+        for nativeArray, mmapArray in zip(native.getTimestamps(stream), mmap.getTimestamps(stream)):
+            np.testing.assert_array_equal(nativeArray, mmapArray)
+
+    nativeFrames, nativeTable = native.getStatusTable()
+    mmapFrames, mmapTable = mmap.getStatusTable()
+    np.testing.assert_array_equal(nativeFrames, mmapFrames)
+    assert list(nativeTable) == list(mmapTable)
+    for tagName in nativeTable:
+        np.testing.assert_array_equal(nativeTable[tagName], mmapTable[tagName])
+
+
+@requiresNative
+def test_backendsAgreeOnSampleFile(readers):
+    # The images of the sample file are compressed, which the mmap backend does not decode, but the file
+    # information, frame headers, status sections and timestamps are all read
+    native, mmap = readers(SAMPLE_FILE)
+    assert vars(native.FileInfo) == vars(mmap.FileInfo)
+    assert native.statusTagInfo == mmap.statusTagInfo
+    assert native.getAdvFileMetaData() == mmap.getAdvFileMetaData()
+    for nativeIndex, mmapIndex in zip(native.getIndexArrays(), mmap.getIndexArrays()):
+        np.testing.assert_array_equal(nativeIndex, mmapIndex)
+
+    # The native reader decodes each frame, the mmap reader only reads its header and status section
+    startOfExposure = np.zeros(native.CountMainFrames, dtype=np.int64)
+    for frameNumber in range(native.CountMainFrames):
+        nativeErr, _, nativeInfo, nativeStatus = native.getMainImageAndStatusData(frameNumber)
+        mmapErr, mmapInfo, mmapStatus = mmap.getMainFrameInfoAndStatus(frameNumber)
+        assert nativeErr == mmapErr == ''
+        assert vars(nativeInfo) == vars(mmapInfo)
+        assert nativeStatus == mmapStatus
+        startOfExposure[frameNumber] = (nativeInfo.UtcMidExposureTimestampLo +
+                                        (nativeInfo.UtcMidExposureTimestampHi << 32) - nativeInfo.Exposure // 2)
+    np.testing.assert_array_equal(mmap.getTimestamps()[0], startOfExposure)
@@ -0,0 +1,105 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# Master calibration frames built by AdvCalibration, against a plain numpy combination of the same frames
+
+import numpy as np
+import pytest
+
+from Adv2.Adv import StreamId
+from Adv2.Adv2File import Adv2reader
+from Adv2.AdvCalibration import _combine, buildMasterCalibration
+from Adv2.AdvError import AdvLibException
+from tests.conftest import BACKENDS
+
+FRAMES = list(range(0, 40, 2))
+
+# A band of the 20 frames takes 20 x 40 x 2 bytes per row (three times that for sigma_clip), so 5000 bytes
+# gives bands of 3 rows (1 row for sigma_clip) and mean reads 2 frames at a time
+SMALL_MAX_BYTES = 5000
+
+
+def sigmaClipReference(stack: np.ndarray, sigma: float, iterations: int) -> np.ndarray:
+    # The mean of the values left after repeatedly masking those more than sigma standard deviations from the
+    # median of each pixel
+    values = np.ma.MaskedArray(stack.astype(np.float64), mask=np.zeros(stack.shape, dtype=bool))
+    for _ in range(iterations):
+        outliers = np.abs(values - np.ma.median(values, axis=0)) > sigma * values.std(axis=0)
+        outliers = outliers.filled(False)
+        if not outliers.any():
+            break
+        values.mask |= outliers
+    return values.mean(axis=0).filled(np.nan)
+
+
+def reference(stack: np.ndarray, method: str, sigma: float = 3.0, iterations: int = 3) -> np.ndarray:
+    if method == 'median':
+        return np.median(stack, axis=0)
+    if method == 'mean':
+        return stack.mean(axis=0)
+    return sigmaClipReference(stack, sigma, iterations)
+
+
+@pytest.mark.parametrize('method', ['median', 'mean', 'sigma_clip'])
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('maxBytes', [256 * 1024 * 1024, SMALL_MAX_BYTES])
+def test_masterMatchesNumpy(syntheticFile, backend, method, maxBytes):
+    # With native and process the frames are spooled to a temporary file, with mmap the bands are read directly
+    rdr = Adv2reader(syntheticFile.filename, backend=backend)
+    try:
+        master = buildMasterCalibration(rdr, method, stream=StreamId.Main, frames=FRAMES, sigma=1.5,
+                                        maxBytes=maxBytes)
+    finally:
+        rdr.closeFile()
+    assert master.dtype == np.float32
+    assert master.shape == (30, 40)
+    expected = reference(syntheticFile.images(FRAMES), method, sigma=1.5)
+    np.testing.assert_allclose(master, expected, rtol=1e-5)
+
+
+@pytest.mark.parametrize('chunkRows', [1, 7, 30, 100])
+def test_chunkRows(syntheticFiles, chunkRows):
+    sixteenBitFile = syntheticFiles['16bit']
+    rdr = Adv2reader(sixteenBitFile.filename, backend='mmap')
+    try:
+        master = buildMasterCalibration(rdr, 'median', chunkRows=chunkRows, start=10, stop=50, step=3,
+                                        stream=StreamId.Main)
+    finally:
+        rdr.closeFile()
+    np.testing.assert_allclose(master, np.median(sixteenBitFile.images(range(10, 50, 3)), axis=0), rtol=1e-6)
+
+
+def test_calibrationStreamIsTheDefault(syntheticFiles):
+    sixteenBitFile = syntheticFiles['16bit']
+    rdr = Adv2reader(sixteenBitFile.filename, backend='mmap')
+    try:
+        master = buildMasterCalibration(rdr)
+    finally:
+        rdr.closeFile()
+    np.testing.assert_allclose(master, np.median(sixteenBitFile.images(range(4)), axis=0), rtol=1e-6)
+
+
+def test_sigmaClipRejectsOutliers():
+    rng = np.random.default_rng(1)
+    band = rng.normal(1000, 5, size=(15, 4, 6)).astype(np.uint16)
+    band[3, 1, 2] = 60000  # A cosmic ray
+    band[9, 0, :] = 0  # A bad frame row
+    expected = sigmaClipReference(band, 3.0, 3)
+    work = np.empty(band.shape, dtype=np.float32)
+    combined = _combine(band.copy(), 'sigma_clip', 3.0, 3, work)
+    np.testing.assert_allclose(combined, expected, rtol=1e-5)
+    assert abs(combined[1, 2] - 1000) < 10
+    assert (abs(combined[0] - 1000) < 10).all()
+
+
+def test_badArguments(syntheticFiles):
+    rdr = Adv2reader(syntheticFiles['16bit'].filename, backend='mmap')
+    try:
+        with pytest.raises(AdvLibException):
+            buildMasterCalibration(rdr, 'mode')
+        with pytest.raises(AdvLibException):
+            buildMasterCalibration(rdr, frames=[])
+    finally:
+        rdr.closeFile()
@@ -0,0 +1,83 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# Cataloging a directory tree of ADV files with AdvCatalog, and rescanning it
+
+import os
+import shutil
+
+import pytest
+
+from Adv2.AdvCatalog import buildCatalog, readCatalog
+
+
+@pytest.fixture
+def recordings(syntheticFiles, tmp_path):
+    # Two good files (one in a sub-folder), a file that is not an ADV file and a file of another type
+    root = tmp_path / 'recordings'
+    (root / 'night2').mkdir(parents=True)
+    shutil.copyfile(syntheticFiles['16bit'].filename, root / 'a.adv')
+    shutil.copyfile(syntheticFiles['8bit'].filename, root / 'night2' / 'b.aav')
+    (root / 'broken.adv').write_bytes(b'not an ADV file')
+    (root / 'notes.txt').write_text('not cataloged')
+    return root
+
+
+def entriesByName(entries):
+    return {os.path.basename(entry['path']): entry for entry in entries}
+
+
+@pytest.mark.parametrize('extension', ['jsonl', 'csv', 'sqlite'])
+def test_catalog(recordings, tmp_path, extension):
+    output = str(tmp_path / f'catalog.{extension}')
+    entries, counts = buildCatalog(str(recordings), output, workers=1, backend='mmap')
+    assert counts == {'scanned': 3, 'unchanged': 0, 'removed': 0, 'errors': 1}
+    assert readCatalog(output) == entries
+
+    byName = entriesByName(entries)
+    assert sorted(byName) == ['a.adv', 'b.aav', 'broken.adv']
+    good = byName['a.adv']
+    assert good['error'] == ''
+    assert (good['version'], good['width'], good['height'], good['dataBpp']) == (2, 40, 30, 16)
+    assert (good['mainFrames'], good['calibrationFrames']) == (60, 4)
+    assert good['firstTimestamp'] == '2024-01-01T00:00:00.000000'
+    assert good['lastTimestamp'] == '2024-01-01T00:00:02.360000'
+    assert good['durationSeconds'] == pytest.approx(2.4)
+    assert good['metadata']['RECORDER-SOFTWARE'] == 'AdvSyntheticWriter'
+    assert good['size'] == os.path.getsize(good['path'])
+    assert byName['b.aav']['dataBpp'] == 8
+    assert byName['broken.adv']['error']
+    assert byName['broken.adv']['width'] is None
+
+
+def test_incrementalRescan(recordings, syntheticFiles, tmp_path):
+    output = str(tmp_path / 'catalog.jsonl')
+    buildCatalog(str(recordings), output, workers=1, backend='mmap')
+
+    # Nothing has changed: only the file that could not be read is opened again
+    entries, counts = buildCatalog(str(recordings), output, workers=1, backend='mmap')
+    assert counts == {'scanned': 1, 'unchanged': 2, 'removed': 0, 'errors': 1}
+
+    assert entriesByName(entries)['broken.adv']['error']
+
+    # ... and is cataloged once it can be read
+    shutil.copyfile(syntheticFiles['12bitPacked'].filename, recordings / 'broken.adv')
+    entries, counts = buildCatalog(str(recordings), output, workers=1, backend='mmap')
+    assert counts == {'scanned': 1, 'unchanged': 2, 'removed': 0, 'errors': 0}
+    assert entriesByName(entries)['broken.adv']['dataBpp'] == 12
+
+    # A changed file is opened again and a removed file is dropped
+    stat = os.stat(recordings / 'a.adv')
+    os.utime(recordings / 'a.adv', ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    os.remove(recordings / 'night2' / 'b.aav')
+    entries, counts = buildCatalog(str(recordings), output, workers=1, backend='mmap')
+    assert counts == {'scanned': 1, 'unchanged': 1, 'removed': 1, 'errors': 0}
+    assert sorted(entriesByName(entries)) == ['a.adv', 'broken.adv']
+    assert entriesByName(entries)['a.adv']['mtimeNs'] == stat.st_mtime_ns + 10 ** 9
+    assert readCatalog(output) == entries
+
+    # A full scan opens every file
+    _, counts = buildCatalog(str(recordings), output, workers=1, backend='mmap', incremental=False)
+    assert counts == {'scanned': 2, 'unchanged': 0, 'removed': 0, 'errors': 0}
@@ -0,0 +1,153 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# Exporting frames with AdvExport and reading them back
+
+import csv
+import glob
+import os
+import sys
+
+import numpy as np
+import pytest
+
+from Adv2 import AdvExport
+from Adv2.Adv import StreamId
+from Adv2.Adv2File import Adv2reader
+from Adv2.AdvError import AdvLibException
+from Adv2.AdvExport import FITS_BLOCK_BYTES, exportFrames, sideTablePath
+from tests.conftest import BACKENDS, ROI, ROI_WINDOW
+
+
+def readFits(filename: str):
+    # Returns the header cards (as a dict of keyword to value text) and the data of a FITS file written by
+    # exportFrames(), parsed by hand as astropy is not a dependency
+    with open(filename, 'rb') as f:
+        content = f.read()
+    assert len(content) % FITS_BLOCK_BYTES == 0
+    cards = {}
+    position = 0
+    while True:
+        card = content[position:position + 80].decode('ascii')
+        position += 80
+        keyword = card[:8].strip()
+        if keyword == 'END':
+            break
+        if card[8:10] == '= ':
+            value = card[10:].split(' /')[0].strip()
+            cards[keyword] = value.strip("'").strip() if value.startswith("'") else value
+    position += -position % FITS_BLOCK_BYTES
+
+    bitpix = int(cards['BITPIX'])
+    shape = tuple(int(cards[f'NAXIS{axis}']) for axis in range(int(cards['NAXIS']), 0, -1))
+    diskDtype = {8: np.dtype('u1'), 16: np.dtype('>i2'), -32: np.dtype('>f4')}[bitpix]
+    count = int(np.prod(shape))
+    data = np.frombuffer(content, dtype=diskDtype, count=count, offset=position).reshape(shape)
+    if 'BZERO' in cards:
+        data = data.astype(np.int64) + int(float(cards['BZERO']))
+    assert not content[position + count * diskDtype.itemsize:].strip(b'\0')
+    return cards, data
+
+
+def readSideTable(output: str):
+    with open(sideTablePath(output), newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+@pytest.fixture
+def reader(syntheticFile):
+    rdr = Adv2reader(syntheticFile.filename, backend='mmap')
+    yield rdr
+    rdr.closeFile()
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_npyRoundTrip(syntheticFile, backend, tmp_path):
+    rdr = Adv2reader(syntheticFile.filename, backend=backend)
+    try:
+        output = str(tmp_path / 'cube.npy')
+        result = exportFrames(rdr, output, start=1, stop=50, step=2, chunkSize=7)
+    finally:
+        rdr.closeFile()
+    frameNumbers = list(range(1, 50, 2))
+    cube = np.load(output)
+    assert cube.dtype == np.uint16
+    np.testing.assert_array_equal(cube, syntheticFile.images(frameNumbers))
+    assert result['frames'] == len(frameNumbers)
+    assert result['bytes'] == cube.nbytes
+
+    rows = readSideTable(output)
+    assert [int(row['FrameNum']) for row in rows] == frameNumbers
+    assert [int(row['StartOfExposureNs']) for row in rows] == [syntheticFile.startOfExposure(n)
+                                                               for n in frameNumbers]
+    assert rows[0]['StartOfExposure'] == '2024-01-01T00:00:00.040000'
+    assert [int(row['VideoCameraFrameId']) for row in rows] == frameNumbers
+    assert [float(row['Gain']) for row in rows] == [1.0 + n / 8 for n in frameNumbers]
+
+
+def test_chunksRoundTrip(reader, syntheticFile, tmp_path):
+    output = str(tmp_path / 'chunks')
+    exportFrames(reader, output, stream=StreamId.Main, frames=[5, 0, 33, 59, 12], roi=ROI, chunkSize=2)
+    chunks = sorted(glob.glob(os.path.join(output, 'chunk_*.npy')))
+    assert [os.path.basename(chunk) for chunk in chunks] == ['chunk_00000.npy', 'chunk_00001.npy',
+                                                             'chunk_00002.npy']
+    cube = np.concatenate([np.load(chunk) for chunk in chunks])
+    np.testing.assert_array_equal(cube, syntheticFile.images([5, 0, 33, 59, 12])[ROI_WINDOW])
+    assert [int(row['FrameNum']) for row in readSideTable(output)] == [5, 0, 33, 59, 12]
+
+
+@pytest.mark.parametrize('roi', [None, ROI])
+def test_fitsRoundTrip(reader, syntheticFile, tmp_path, roi):
+    output = str(tmp_path / 'cube.fits')
+    exportFrames(reader, output, stream=StreamId.Calibration, roi=roi, chunkSize=3, sideTable=False)
+    cards, data = readFits(output)
+    expected = syntheticFile.images(range(4))
+    if roi is not None:
+        expected = expected[ROI_WINDOW]
+        assert (cards['ROI_Y0'], cards['ROI_X0']) == ('3', '5')
+    np.testing.assert_array_equal(data, expected)
+    assert cards['BITPIX'] == '16'
+    assert cards['ADVSTRM'] == 'Calibration'
+    assert cards['ADVBPP'] == str(syntheticFile.bitDepth)
+    assert cards['DATE-OBS'] == '2024-01-01T00:00:00.000000'
+    assert not os.path.exists(sideTablePath(output))
+
+
+@pytest.mark.parametrize('outputDtype, bitpix', [('native', None), ('float32', '-32')])
+def test_fitsOutputDtypes(syntheticFile, tmp_path, outputDtype, bitpix):
+    rdr = Adv2reader(syntheticFile.filename, backend='mmap', outputDtype=outputDtype)
+    try:
+        output = str(tmp_path / 'cube.fits')
+        exportFrames(rdr, output, stop=10, chunkSize=4, sideTable=False)
+    finally:
+        rdr.closeFile()
+    cards, data = readFits(output)
+    assert cards['BITPIX'] == (bitpix or ('8' if syntheticFile.bitDepth <= 8 else '16'))
+    np.testing.assert_array_equal(data, syntheticFile.images(range(10)))
+
+
+def test_emptySelection(reader, tmp_path):
+    output = str(tmp_path / 'empty.npy')
+    result = exportFrames(reader, output, start=10, stop=10)
+    assert result['frames'] == 0
+    assert np.load(output).shape == (0, 30, 40)
+    assert readSideTable(output) == []
+
+
+def test_badArguments(reader, tmp_path):
+    with pytest.raises(AdvLibException):
+        exportFrames(reader, str(tmp_path / 'cube.npy'), outputFormat='tiff')
+    with pytest.raises(AdvLibException):
+        exportFrames(reader, str(tmp_path / 'cube.npy'), roi=(0, 40, 0, 40))
+
+
+def test_commandLine(syntheticFile, tmp_path, monkeypatch, capsys):
+    output = str(tmp_path / 'cube.fits')
+    monkeypatch.setattr(sys, 'argv', ['AdvExport', syntheticFile.filename, output, '--backend', 'mmap',
+                                      '--start', '20', '--stop', '30', '--scale-to-16-bit'])
+    AdvExport.main()
+    assert capsys.readouterr().out.startswith(f'10 frames (0.0 MB) written to {output}')
+    _, data = readFits(output)
+    np.testing.assert_array_equal(data, syntheticFile.images(range(20, 30)) << (16 - syntheticFile.bitDepth))
@@ -0,0 +1,128 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# The frame cache of Adv2reader (AdvFrameCache)
+
+import numpy as np
+import pytest
+
+from Adv2.Adv import StreamId
+from Adv2.Adv2File import Adv2reader
+from Adv2.AdvFrameCache import AdvFrameCache
+from tests.conftest import BACKENDS, ROI, ROI_WINDOW
+
+FRAME_BYTES = 40 * 30 * 2
+
+
+@pytest.fixture(params=BACKENDS)
+def reader(request, syntheticFile):
+    rdr = Adv2reader(syntheticFile.filename, backend=request.param)
+    yield rdr
+    rdr.closeFile()
+
+
+@pytest.fixture
+def decodes(reader, monkeypatch):
+    # The frames decoded by the reader (cache misses), in order
+    decoded = []
+    readImageAndStatusData = reader._readImageAndStatusData
+
+    def recordDecode(frameNumber, streamType, out=None, roi=None):
+        decoded.append((streamType, frameNumber, roi))
+        return readImageAndStatusData(frameNumber, streamType, out, roi)
+
+    monkeypatch.setattr(reader, '_readImageAndStatusData', recordDecode)
+    return decoded
+
+
+def test_hitReturnsTheCachedFrame(reader, decodes, syntheticFile):
+    reader.enableFrameCache()
+    _, first, firstInfo, firstStatus = reader.getMainImageAndStatusData(7)
+    first = first.copy()
+    exposure = firstInfo.Exposure
+    reader.getMainImageAndStatusData(8)
+    err, pixels, frameInfo, status = reader.getMainImageAndStatusData(7)
+    assert err == ''
+    assert decodes == [(StreamId.Main, 7, None), (StreamId.Main, 8, None)]
+    np.testing.assert_array_equal(pixels, first)
+    np.testing.assert_array_equal(pixels, syntheticFile.image(7))
+    assert not pixels.flags.writeable
+    assert frameInfo is reader.frameInfo
+    assert frameInfo.Exposure == exposure
+    assert status == firstStatus
+    assert status['VideoCameraFrameId'] == 7
+    assert reader.frameCache.stats()['hits'] == 1
+    assert reader.frameCache.stats()['misses'] == 2
+
+    # A status dictionary changed by the caller does not change the cached one
+    status['VideoCameraFrameId'] = -1
+    assert reader.getMainImageAndStatusData(7)[3]['VideoCameraFrameId'] == 7
+
+
+def test_streamsAndWindowsAreCachedSeparately(reader, decodes, syntheticFile):
+    reader.enableFrameCache()
+    reader.getMainImageAndStatusData(2)
+    reader.getCalibImageAndStatusData(2)
+    _, window, _, _ = reader.getMainImageAndStatusData(2, roi=ROI)
+    np.testing.assert_array_equal(window, syntheticFile.image(2)[ROI_WINDOW])
+    _, window, _, _ = reader.getMainImageAndStatusData(2, roi=ROI)
+    np.testing.assert_array_equal(window, syntheticFile.image(2)[ROI_WINDOW])
+    assert decodes == [(StreamId.Main, 2, None), (StreamId.Calibration, 2, None), (StreamId.Main, 2, ROI)]
+
+
+def test_leastRecentlyUsedFrameIsEvicted(reader, decodes):
+    reader.enableFrameCache(maxBytes=3 * FRAME_BYTES)
+    for frameNumber in (0, 1, 2):
+        reader.getMainImageAndStatusData(frameNumber)
+    reader.getMainImageAndStatusData(0)  # Frame 1 is now the least recently used
+    reader.getMainImageAndStatusData(3)
+    assert reader.frameCache.stats() == {'hits': 1, 'misses': 4, 'evictions': 1, 'entries': 3,
+                                         'currentBytes': 3 * FRAME_BYTES, 'maxBytes': 3 * FRAME_BYTES}
+    decodes.clear()
+    for frameNumber in (0, 2, 3, 1):
+        reader.getMainImageAndStatusData(frameNumber)
+    assert decodes == [(StreamId.Main, 1, None)]
+
+
+def test_outIsFilledFromTheCache(reader, decodes, syntheticFile):
+    reader.enableFrameCache()
+    reader.getMainImageAndStatusData(5)
+    out = np.zeros((30, 40), dtype=np.uint16)
+    _, pixels, _, _ = reader.getMainImageAndStatusData(5, out=out)
+    assert pixels is out
+    np.testing.assert_array_equal(out, syntheticFile.image(5))
+    assert len(decodes) == 1
+
+
+def test_closeClearsTheCache(syntheticFiles):
+    rdr = Adv2reader(syntheticFiles['16bit'].filename, backend='mmap')
+    rdr.enableFrameCache()
+    for frameNumber in range(5):
+        rdr.getMainImageAndStatusData(frameNumber)
+    cache = rdr.frameCache
+    assert len(cache) == 5
+    rdr.closeFile()
+    assert len(cache) == 0
+    assert cache.currentBytes == 0
+
+
+def test_disableFrameCache(reader, decodes):
+    reader.enableFrameCache()
+    reader.getMainImageAndStatusData(1)
+    reader.disableFrameCache()
+    assert reader.frameCache is None
+    reader.getMainImageAndStatusData(1)
+    assert len(decodes) == 2
+
+
+def test_framesLargerThanTheCacheAreNotKept():
+    cache = AdvFrameCache(maxBytes=100)
+    cache.put('big', np.zeros(101, dtype=np.uint8), None, {})
+    cache.put('small', np.zeros(60, dtype=np.uint8), None, {})
+    cache.put('small', np.zeros(50, dtype=np.uint8), None, {})
+    assert cache.get('big') is None
+    assert cache.stats()['entries'] == 1
+    assert cache.currentBytes == 50
+    assert cache.evictions == 0
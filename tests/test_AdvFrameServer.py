@@ -0,0 +1,181 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# Sharing frames between processes with AdvFrameServer and AdvFrameClient
+
+import multiprocessing
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from Adv2.Adv import StreamId
+from Adv2.AdvError import AdvLibException
+from Adv2.AdvFrameServer import AdvFrameClient, AdvFrameServer
+from tests.conftest import ROI, ROI_WINDOW
+
+
+def _readAllFrames(name: str, results):
+    # Runs in a client process: reads every frame and sends back what it saw
+    with AdvFrameClient(name, timeout=30) as client:
+        seen = []
+        for frameNumber, image, frameInfo, status in client.frames(timeout=30):
+            seen.append((frameNumber, image.shape, int(image.astype(np.int64).sum()), frameInfo.Exposure,
+                         status['VideoCameraFrameId']))
+            time.sleep(0.001 * (frameNumber % 3))  # A slow client makes the server wait for free slots
+    results.put(seen)
+
+
+def _dieAfterOneFrame(name: str):
+    client = AdvFrameClient(name, timeout=30)
+    next(client.frames(timeout=30))
+    os._exit(1)
+
+
+def _sharedMemoryNames(name: str):
+    if not os.path.isdir('/dev/shm'):
+        return []
+    return [entry for entry in os.listdir('/dev/shm') if entry.startswith(name)]
+
+
+def _serveInThread(server: AdvFrameServer, **kwargs) -> threading.Thread:
+    # The thread's published attribute is set to the number of frames published, unless serve() fails
+    def serve():
+        try:
+            thread.published = server.serve(**kwargs)
+        except AdvLibException:
+            pass  # Recorded in the block for the clients
+    thread = threading.Thread(target=serve)
+    thread.published = None
+    thread.start()
+    return thread
+
+
+@pytest.fixture
+def sixteenBitFile(syntheticFiles):
+    return syntheticFiles['16bit']
+
+
+def test_clientProcessesGetEveryFrame(sixteenBitFile):
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    with AdvFrameServer(sixteenBitFile.filename, slots=4, backend='mmap', roi=ROI) as server:
+        clients = [context.Process(target=_readAllFrames, args=(server.name, results)) for _ in range(2)]
+        for client in clients:
+            client.start()
+        assert server.serve(start=10, waitForClients=2, timeout=60) == 50
+        seen = [results.get(timeout=60) for _ in clients]
+        for client in clients:
+            client.join(timeout=60)
+            assert client.exitcode == 0
+        name = server.name
+
+    expected = [(frameNumber, (14, 26), int(sixteenBitFile.image(frameNumber)[ROI_WINDOW].astype(np.int64).sum()),
+                 40_000_000, frameNumber) for frameNumber in range(10, 60)]
+    assert seen == [expected, expected]
+    assert _sharedMemoryNames(name) == []
+
+
+def test_clientInThread(sixteenBitFile):
+    with AdvFrameServer(sixteenBitFile.filename, slots=3, backend='mmap') as server:
+        with AdvFrameClient(server.name) as client:
+            assert (client.Width, client.Height) == (40, 30)
+            assert client.filename == os.path.abspath(sixteenBitFile.filename)
+            serving = _serveInThread(server, stream=StreamId.Calibration, waitForClients=1, timeout=30)
+            frames = []
+            for frameNumber, image, frameInfo, status in client.frames(timeout=30):
+                assert not image.flags.writeable
+                np.testing.assert_array_equal(image, sixteenBitFile.image(frameNumber))
+                midExposure = frameInfo.UtcMidExposureTimestampLo + (frameInfo.UtcMidExposureTimestampHi << 32)
+                assert midExposure == sixteenBitFile.startOfExposure(frameNumber) + 20_000_000
+                assert status['Gain'] == 1.0 + frameNumber / 8
+                frames.append(frameNumber)
+            serving.join()
+            assert serving.published == 4
+            assert frames == [0, 1, 2, 3]
+            assert client.frameCount == 4
+            assert client.stream == 'Calibration'
+            assert server.clientCount() == 1
+        assert server.clientCount() == 0
+
+
+@pytest.mark.parametrize('fileName, outputDtype, scaleTo16Bit', [
+    ('8bit', 'uint8', False), ('10bit', 'uint16', True), ('16bit', 'float32', False)])
+def test_outputDtypes(syntheticFiles, fileName, outputDtype, scaleTo16Bit):
+    syntheticFile = syntheticFiles[fileName]
+    shift = 16 - syntheticFile.bitDepth if scaleTo16Bit else 0
+    with AdvFrameServer(syntheticFile.filename, slots=2, backend='mmap', roi=ROI, outputDtype=outputDtype,
+                        scaleTo16Bit=scaleTo16Bit) as server:
+        assert server.dtype == np.dtype(outputDtype)
+        with AdvFrameClient(server.name) as client:
+            assert client.dtype == np.dtype(outputDtype)
+            serving = _serveInThread(server, stop=6, waitForClients=1, timeout=30)
+            frames = []
+            for frameNumber, image, _, _ in client.frames(timeout=30):
+                assert image.dtype == np.dtype(outputDtype)
+                np.testing.assert_array_equal(image, syntheticFile.image(frameNumber)[ROI_WINDOW] << shift)
+                frames.append(frameNumber)
+            serving.join()
+            assert frames == list(range(6))
+
+
+def test_deadClientIsFreed(sixteenBitFile):
+    # With one client entry, a second client can only attach once the first (killed) client's entry is freed
+    context = multiprocessing.get_context('spawn')
+    with AdvFrameServer(sixteenBitFile.filename, slots=2, maxClients=1, backend='mmap') as server:
+        dying = context.Process(target=_dieAfterOneFrame, args=(server.name,))
+        dying.start()
+        serving = _serveInThread(server, waitForClients=1, timeout=30)
+        dying.join(timeout=60)
+
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                client = AdvFrameClient(server.name, timeout=1)
+                break
+            except AdvLibException:
+                assert time.monotonic() < deadline
+                time.sleep(0.1)
+        with client:
+            # The server may have published the rest of the frames before this client attached
+            frames = [frameNumber for frameNumber, _, _, _ in client.frames(timeout=30)]
+        serving.join()
+        assert serving.published == 60
+        assert frames == list(range(60 - len(frames), 60))
+        name = server.name
+    assert _sharedMemoryNames(name) == []
+
+
+def test_serverFailureReachesClients(sixteenBitFile):
+    # The status of a frame does not fit in 100 bytes
+    with AdvFrameServer(sixteenBitFile.filename, slots=2, backend='mmap', statusBytes=100) as server:
+        with AdvFrameClient(server.name) as client:
+            serving = _serveInThread(server, waitForClients=1, timeout=30)
+            with pytest.raises(AdvLibException, match='statusBytes is 100'):
+                for _ in client.frames(timeout=30):
+                    pass
+            serving.join()
+            assert serving.published is None
+
+
+def test_limits(sixteenBitFile):
+    with pytest.raises(AdvLibException):
+        AdvFrameServer(sixteenBitFile.filename, slots=1, backend='mmap')
+    with pytest.raises(AdvLibException):
+        AdvFrameServer(sixteenBitFile.filename, backend='mmap', roi=(0, 31, 0, 40))
+    with pytest.raises(AdvLibException):
+        AdvFrameClient('noSuchAdvFrameServer', timeout=0.1)
+    with pytest.raises(AdvLibException):
+        AdvFrameServer(sixteenBitFile.filename, backend='mmap', outputDtype='uint8')
+
+    with AdvFrameServer(sixteenBitFile.filename, maxClients=1, backend='mmap') as server:
+        with AdvFrameClient(server.name):
+            with pytest.raises(AdvLibException, match='already has 1 clients'):
+                AdvFrameClient(server.name)
+        assert server.serve(stop=5) == 5
+        with pytest.raises(AdvLibException):
+            server.serve()
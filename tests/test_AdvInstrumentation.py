@@ -0,0 +1,91 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# The performance counters of Adv2reader (AdvInstrumentation)
+
+import pytest
+
+from Adv2.Adv2File import Adv2reader
+from tests.conftest import BACKENDS, ROI
+
+FRAME_BYTES = 40 * 30 * 2
+WINDOW_BYTES = 14 * 26 * 2
+
+
+@pytest.fixture(params=BACKENDS)
+def reader(request, syntheticFile):
+    rdr = Adv2reader(syntheticFile.filename, backend=request.param)
+    yield rdr
+    rdr.closeFile()
+
+
+def calls(stats, phase: str) -> int:
+    return stats['phases'].get(phase, {'calls': 0})['calls']
+
+
+def test_frameReadsAreCounted(reader):
+    instrumentation = reader.enableInstrumentation()
+    assert reader.instrumentation is instrumentation
+    for frameNumber in range(5):
+        reader.getMainImageAndStatusData(frameNumber)
+    reader.getCalibImageAndStatusData(1, roi=ROI)
+
+    stats = instrumentation.stats()
+    assert stats['framesDecoded'] == 6
+    assert stats['bytesDecoded'] == 5 * FRAME_BYTES + WINDOW_BYTES
+    for phase in ('decode', 'convert', 'statusTags', 'timestampFormat'):
+        assert calls(stats, phase) == 6
+        assert stats['phases'][phase]['seconds'] >= 0
+    assert stats['phases']['convert']['bytes'] == 0
+    assert (stats['cacheHits'], stats['cacheMisses']) == (0, 0)
+    assert 'cacheLookup' not in stats['phases']
+
+
+def test_stacksTimestampsAndStatusTables(reader):
+    instrumentation = reader.enableInstrumentation()
+    images, _, _ = reader.getMainImageStack(stop=12)
+    reader.getTimestamps()
+    reader.getStatusTable()
+    stats = instrumentation.stats()
+    assert stats['phases']['stackRead'] == {'calls': 1, 'seconds': stats['phases']['stackRead']['seconds'],
+                                            'bytes': images.nbytes}
+    assert images.nbytes == 12 * FRAME_BYTES
+    assert calls(stats, 'timestamps') == 1
+    assert calls(stats, 'statusTable') == 1
+    # The frames of a stack are not counted one by one
+    assert stats['framesDecoded'] == 0
+
+
+def test_cacheLookupsAreCounted(reader):
+    reader.enableFrameCache()
+    instrumentation = reader.enableInstrumentation()
+    for _ in range(2):
+        for frameNumber in (4, 5, 6):
+            reader.getMainImageAndStatusData(frameNumber)
+    stats = instrumentation.stats()
+    assert (stats['cacheHits'], stats['cacheMisses']) == (3, 3)
+    assert calls(stats, 'cacheLookup') == 6
+    assert stats['framesDecoded'] == 3
+
+
+def test_tracerResetAndDisable(syntheticFiles):
+    rdr = Adv2reader(syntheticFiles['16bit'].filename, backend='mmap')
+    try:
+        traced = []
+        instrumentation = rdr.enableInstrumentation(lambda phase, seconds, numBytes: traced.append((phase, numBytes)))
+        rdr.getMainImageAndStatusData(0)
+        assert traced == [('decode', FRAME_BYTES), ('convert', 0), ('statusTags', 0), ('timestampFormat', 0)]
+
+        instrumentation.reset()
+        assert instrumentation.stats() == {'phases': {}, 'framesDecoded': 0, 'bytesDecoded': 0, 'cacheHits': 0,
+                                           'cacheMisses': 0}
+
+        rdr.disableInstrumentation()
+        assert rdr.instrumentation is None
+        rdr.getMainImageAndStatusData(1)
+        assert instrumentation.stats()['framesDecoded'] == 0
+        assert len(traced) == 4
+    finally:
+        rdr.closeFile()
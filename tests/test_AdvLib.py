@@ -0,0 +1,79 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# Calls into the native library from more than one thread
+
+import sys
+import threading
+
+import pytest
+
+from Adv2 import AdvLib
+from Adv2.Adv import AdvFrameInfo, StreamId, TagPairType
+from Adv2.Adv2File import Adv2reader
+from tests.conftest import requiresNative
+
+pytestmark = requiresNative
+
+
+@pytest.fixture
+def nativeReader(syntheticFiles):
+    rdr = Adv2reader(syntheticFiles['16bit'].filename, backend='native')
+    yield rdr
+    rdr.closeFile()
+
+
+@pytest.mark.parametrize('call', [
+    lambda rdr: AdvLib.AdvVer2_GetTagPairValues(TagPairType.SystemMetaData, 0),
+    lambda rdr: AdvLib.AdvVer2_GetStatusTagInfo(0),
+    lambda rdr: AdvLib.AdvVer2_GetFramePixels(StreamId.Main, 0, rdr._pixelPointer, AdvFrameInfo(), 0),
+    lambda rdr: AdvLib.AdvVer2_GetStatusTagUTF8String(rdr.FileInfo.ErrorStatusTagId),
+])
+def test_callsWaitForTheCallLock(nativeReader, call):
+    nativeReader.getMainImageAndStatusData(0)  # Loads the status of a frame
+    results = []
+    with AdvLib._callLock:
+        caller = threading.Thread(target=lambda: results.append(call(nativeReader)))
+        caller.start()
+        caller.join(timeout=0.2)
+        assert caller.is_alive()
+        assert results == []
+    caller.join(timeout=30)
+    assert not caller.is_alive()
+    assert len(results) == 1
+
+
+def test_metadataReadAlongsideFrames(nativeReader, syntheticFiles):
+    # One thread reads the metadata (through the shared string buffers) while the frames and their string status
+    # tags are read in another, switching threads as often as possible
+    switchInterval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    expected = [AdvLib.AdvVer2_GetTagPairValues(TagPairType.SystemMetaData, entryNum)
+                for entryNum in range(nativeReader.FileInfo.SystemMetadataTagsCount)]
+    stopping = threading.Event()
+    wrong = []
+
+    def readMetadata():
+        while not stopping.is_set():
+            for entryNum, values in enumerate(expected):
+                result = AdvLib.AdvVer2_GetTagPairValues(TagPairType.SystemMetaData, entryNum)
+                if result != values:
+                    wrong.append(result)
+
+    metadataReader = threading.Thread(target=readMetadata)
+    metadataReader.start()
+    try:
+        for _ in range(5):
+            for frameNumber in range(nativeReader.CountMainFrames):
+                err, pixels, frameInfo, status = nativeReader.getMainImageAndStatusData(frameNumber)
+                assert err == ''
+                assert status['VideoCameraFrameId'] == frameNumber
+                assert status['Error'] == ''
+                assert pixels[0, 0] == syntheticFiles['16bit'].image(frameNumber)[0, 0]
+    finally:
+        stopping.set()
+        metadataReader.join()
+        sys.setswitchinterval(switchInterval)
+    assert wrong == []
@@ -0,0 +1,91 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# Stacks read by ParallelAdv2Reader against the same stacks read by a single Adv2reader
+
+import numpy as np
+import pytest
+
+from Adv2.Adv import StreamId
+from Adv2.Adv2File import Adv2reader
+from Adv2.AdvError import AdvLibException
+from Adv2.AdvParallel import ParallelAdv2Reader
+from tests.conftest import requiresNative
+
+
+def assertStacksEqual(parallel, serial):
+    for parallelArray, serialArray in zip(parallel, serial):
+        np.testing.assert_array_equal(parallelArray, serialArray)
+
+
+@pytest.fixture
+def readers(syntheticFile):
+    # A parallel reader (two workers, chunks of 7 frames) and a serial reader of the same file
+    with ParallelAdv2Reader(syntheticFile.filename, workers=2, backend='mmap', chunkSize=7) as parallel:
+        serial = Adv2reader(syntheticFile.filename, backend='mmap')
+        try:
+            yield parallel, serial
+        finally:
+            serial.closeFile()
+
+
+def test_parallelStackEqualsSerialStack(readers, syntheticFile):
+    parallel, serial = readers
+    assertStacksEqual(parallel.getMainImageStack(), serial.getMainImageStack())
+    assertStacksEqual(parallel.getMainImageStack(start=3, stop=50, step=4),
+                      serial.getMainImageStack(start=3, stop=50, step=4))
+    assertStacksEqual(parallel.getMainImageStack(frames=[59, 0, 30, 30, 12]),
+                      serial.getMainImageStack(frames=[59, 0, 30, 30, 12]))
+    assertStacksEqual(parallel.getCalibImageStack(), serial.getCalibImageStack())
+    images, _, _ = parallel.getImageStack(StreamId.Main, frames=slice(10, 20))
+    np.testing.assert_array_equal(images, syntheticFile.images(range(10, 20)))
+    assert parallel.lastStats['frames'] == 10
+
+
+def test_outArrays(readers):
+    parallel, serial = readers
+    expected = serial.getMainImageStack(stop=30)
+
+    shared = parallel.allocateStack(30)
+    images, _, _ = parallel.getMainImageStack(stop=30, out=shared)
+    assert images is shared
+    assertStacksEqual((images,), expected)
+
+    # A contiguous slice of whole frames of a shared stack is written to directly as well
+    images, _, _ = parallel.getMainImageStack(stop=10, out=shared[20:])
+    np.testing.assert_array_equal(shared[20:], expected[0][:10])
+
+    plain = np.zeros((30, parallel.Height, parallel.Width), dtype=np.uint16)
+    images, frameInfos, timestamps = parallel.getMainImageStack(stop=30, out=plain)
+    assert images is plain
+    assertStacksEqual((images, frameInfos, timestamps), expected)
+
+    with pytest.raises(AdvLibException):
+        parallel.getMainImageStack(stop=30, out=np.zeros((30, parallel.Height, parallel.Width)))
+
+
+@pytest.mark.parametrize('outputDtype, scaleTo16Bit', [('float32', False), ('uint16', True)])
+def test_outputDtypes(syntheticFiles, outputDtype, scaleTo16Bit):
+    filename = syntheticFiles['12bitPacked'].filename
+    with ParallelAdv2Reader(filename, workers=2, backend='mmap', outputDtype=outputDtype,
+                            scaleTo16Bit=scaleTo16Bit) as parallel:
+        serial = Adv2reader(filename, backend='mmap', outputDtype=outputDtype, scaleTo16Bit=scaleTo16Bit)
+        try:
+            parallelStack = parallel.getMainImageStack(step=3)
+            assert parallelStack[0].dtype == np.dtype(outputDtype)
+            assertStacksEqual(parallelStack, serial.getMainImageStack(step=3))
+        finally:
+            serial.closeFile()
+
+
+@requiresNative
+def test_nativeWorkers(syntheticFiles):
+    # Each worker process has its own copy of the native library's global state
+    syntheticFile = syntheticFiles['12bitPacked']
+    with ParallelAdv2Reader(syntheticFile.filename, workers=2, backend='native', chunkSize=5) as parallel:
+        images, frameInfos, timestamps = parallel.getMainImageStack()
+    np.testing.assert_array_equal(images, syntheticFile.images(range(60)))
+    np.testing.assert_array_equal(timestamps, [syntheticFile.startOfExposure(n) for n in range(60)])
+    assert (frameInfos['Exposure'] == 40_000_000).all()
@@ -0,0 +1,149 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# Aperture photometry with AdvPhotometry on synthetic files of stars with a known flux
+
+import csv
+
+import numpy as np
+import pytest
+
+from Adv2.Adv2File import Adv2reader
+from Adv2.AdvError import AdvLibException
+from Adv2.AdvPhotometry import Aperture, aperturePhotometry
+from benchmarks.AdvSyntheticWriter import writeSyntheticAdv2
+from tests.conftest import BACKENDS
+
+WIDTH = 64
+HEIGHT = 48
+FRAMES = 60
+BACKGROUND = 100
+
+# (row, column, flux) of each star in frame 0: each star is a 3 x 3 square of flux / 9 above the background
+STARS = [(20, 20, 4500), (30, 40, 9000)]
+
+# In the drifting file each star moves one column to the right every DRIFT_FRAMES frames
+DRIFT_FRAMES = 5
+
+
+class StarField:
+    # The image source of writeSyntheticAdv2(): a flat background and the square STARS, drifting or not
+    maxValue = 65535
+
+    def __init__(self, drifting: bool):
+        self.drifting = drifting
+
+    def column(self, x: int, frameNumber: int) -> int:
+        return x + frameNumber // DRIFT_FRAMES if self.drifting else x
+
+    def image(self, frameNumber: int) -> np.ndarray:
+        image = np.full((HEIGHT, WIDTH), BACKGROUND, dtype=np.uint16)
+        for y, x, flux in STARS:
+            x = self.column(x, frameNumber)
+            image[y - 1:y + 2, x - 1:x + 2] += flux // 9
+        return image
+
+
+@pytest.fixture(scope='module')
+def starFiles(tmp_path_factory):
+    folder = tmp_path_factory.mktemp('stars')
+    files = {}
+    for name, drifting in (('still', False), ('drifting', True)):
+        filename = str(folder / f'{name}.adv')
+        writeSyntheticAdv2(filename, WIDTH, HEIGHT, FRAMES, 16, source=StarField(drifting))
+        files[name] = filename
+    return files
+
+
+def apertures():
+    return [Aperture(centerY=y, centerX=x, name=f'star{flux}') for y, x, flux in STARS]
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_fixedApertures(starFiles, backend):
+    rdr = Adv2reader(starFiles['still'], backend=backend)
+    try:
+        lightCurve = aperturePhotometry(rdr, apertures(), start=5, stop=45, step=2)
+    finally:
+        rdr.closeFile()
+    assert lightCurve.apertureNames == ['star4500', 'star9000']
+    np.testing.assert_array_equal(lightCurve.frameNumbers, np.arange(5, 45, 2))
+    np.testing.assert_array_equal(lightCurve.background, BACKGROUND)
+    np.testing.assert_array_equal(lightCurve.netFlux, [[4500, 9000]] * 20)
+    np.testing.assert_array_equal(lightCurve.apertureSum, lightCurve.netFlux + BACKGROUND * lightCurve.apertureArea)
+    np.testing.assert_array_equal(lightCurve.centers, [[(20, 20), (30, 40)]] * 20)
+    assert (lightCurve.snr > 0).all()
+
+
+def test_trackedApertures(starFiles):
+    rdr = Adv2reader(starFiles['drifting'], backend='mmap')
+    try:
+        tracked = aperturePhotometry(rdr, apertures(), track=True)
+        fixed = aperturePhotometry(rdr, apertures())
+    finally:
+        rdr.closeFile()
+    np.testing.assert_allclose(tracked.netFlux, [[4500, 9000]] * FRAMES)
+    np.testing.assert_array_equal(tracked.background, BACKGROUND)
+    field = StarField(drifting=True)
+    expectedCenters = [[(y, field.column(x, frameNumber)) for y, x, _ in STARS] for frameNumber in range(FRAMES)]
+    np.testing.assert_allclose(tracked.centers, expectedCenters, atol=1e-9)
+
+    # The fixed apertures lose the stars as they drift out
+    np.testing.assert_array_equal(fixed.netFlux[:DRIFT_FRAMES], [[4500, 9000]] * DRIFT_FRAMES)
+    assert (fixed.netFlux[-1] < [4500, 9000]).all()
+
+
+@pytest.mark.parametrize('track', [False, True])
+def test_chunksAreSizedByBytes(starFiles, track, monkeypatch):
+    rdr = Adv2reader(starFiles['drifting'], backend='mmap')
+    chunks = []
+    readStack = rdr.getMainImageStack
+
+    def recordChunk(**kwargs):
+        stack = readStack(**kwargs)
+        chunks.append(stack[0].shape)
+        return stack
+
+    monkeypatch.setattr(rdr, 'getMainImageStack', recordChunk)
+    try:
+        unchunked = aperturePhotometry(rdr, apertures(), track=track)
+        chunks.clear()
+        # Tracking reads whole frames, otherwise the 35 x 45 window holding both apertures and their annuli
+        frameBytes = HEIGHT * WIDTH * 2 if track else 35 * 45 * 2
+        lightCurve = aperturePhotometry(rdr, apertures(), track=track, maxBytes=7 * frameBytes + 1)
+    finally:
+        rdr.closeFile()
+    assert chunks[0][0] == 7
+    assert sum(chunk[0] for chunk in chunks) == FRAMES
+    np.testing.assert_array_equal(lightCurve.netFlux, unchunked.netFlux)
+    np.testing.assert_array_equal(lightCurve.centers, unchunked.centers)
+
+
+def test_writeCsv(starFiles, tmp_path):
+    rdr = Adv2reader(starFiles['still'], backend='mmap')
+    try:
+        lightCurve = aperturePhotometry(rdr, apertures(), stop=3)
+    finally:
+        rdr.closeFile()
+    filename = str(tmp_path / 'lightcurve.csv')
+    lightCurve.writeCsv(filename)
+    with open(filename, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['FrameNum'] for row in rows] == ['0', '1', '2']
+    assert rows[0]['Date'] == '2024-01-01'
+    assert [float(row['star9000_net']) for row in rows] == [9000.0] * 3
+
+
+def test_badApertures(starFiles):
+    rdr = Adv2reader(starFiles['still'], backend='mmap')
+    try:
+        with pytest.raises(AdvLibException):
+            aperturePhotometry(rdr, [])
+        with pytest.raises(AdvLibException):
+            aperturePhotometry(rdr, [Aperture(centerY=5, centerX=30)])
+        with pytest.raises(AdvLibException):
+            aperturePhotometry(rdr, [Aperture(centerY=20, centerX=30, radius=9)])
+    finally:
+        rdr.closeFile()
@@ -0,0 +1,112 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# The timing and status scan of AdvScan
+
+import json
+import sys
+
+import numpy as np
+import pytest
+
+from Adv2 import AdvScan
+from Adv2.Adv import StreamId
+from Adv2.Adv2File import ADV_EPOCH_NANOSECONDS, Adv2reader
+from Adv2.AdvScan import REPORT_LISTS, scanFile
+from tests.conftest import BACKENDS, SAMPLE_FILE
+
+SECOND = 10 ** 9
+
+
+class RecordedReader:
+    # Stands in for an Adv2reader with the given frame timing and status tags, to produce every kind of problem
+    def __init__(self, startOfExposure, exposure, statusTable):
+        exposure = np.asarray(exposure, dtype=np.int64)
+        self.startOfExposure = np.asarray(startOfExposure, dtype=np.int64)
+        self.midExposure = np.where(self.startOfExposure != 0, self.startOfExposure + exposure // 2, 0)
+        self.exposure = exposure
+        self.statusTable = statusTable
+
+    def getTimestamps(self, stream):
+        startDatetime64 = (self.startOfExposure + ADV_EPOCH_NANOSECONDS).view('datetime64[ns]')
+        return self.startOfExposure, self.midExposure, self.exposure, startDatetime64
+
+    def getStatusTable(self, stream):
+        return np.arange(self.startOfExposure.size), self.statusTable
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_cleanFile(syntheticFile, backend):
+    report = scanFile(syntheticFile.filename, backend=backend, watchTags=())
+    assert report['path'] == syntheticFile.filename
+    assert report['stream'] == 'Main'
+    assert report['frames'] == 60
+    assert report['nominalIntervalSeconds'] == pytest.approx(0.04)
+    assert report['durationSeconds'] == pytest.approx(2.4)
+    assert not any(report[name] for name in REPORT_LISTS)
+
+
+def test_openReaderIsLeftOpen(syntheticFile):
+    rdr = Adv2reader(syntheticFile.filename, backend='mmap')
+    try:
+        report = scanFile(rdr, stream=StreamId.Calibration, watchTags=('AlmanacStatus',))
+        assert report['path'] is None
+        assert report['frames'] == 4
+        assert [change['frame'] for change in report['tagChanges']] == [1, 2, 3]
+        assert rdr.getMainImageAndStatusData(0)[0] == ''
+    finally:
+        rdr.closeFile()
+
+
+def test_compressedFileIsScannedWithoutDecoding():
+    # The mmap backend cannot decode the compressed images of the sample file, but the scan does not need them
+    rdr = Adv2reader(SAMPLE_FILE, backend='mmap')
+    try:
+        report = scanFile(rdr, watchTags=())
+        assert report['frames'] == rdr.CountMainFrames
+        assert report['nominalIntervalSeconds'] > 0
+    finally:
+        rdr.closeFile()
+
+
+def test_problemsAreReported():
+    starts = [0, 1, 2, 3, 6, 6, 7, 6.5, 8, 9]
+    starts = [int(t * SECOND) + SECOND for t in starts]
+    starts[9] = 0  # no timestamp
+    exposure = [SECOND // 2] * 6 + [SECOND // 4] * 4
+    frameIds = np.ma.MaskedArray([0, 1, 2, 3, 4, 5, 9, 10, 11, 12], mask=[False] * 9 + [True])
+    fixStatus = np.ma.MaskedArray(np.array([0, 0, 1, 1, 1, 1, 1, 2, 2, 2], dtype=np.uint8))
+    rdr = RecordedReader(starts, exposure, {'VideoCameraFrameId': frameIds, 'SatelliteFixStatus': fixStatus})
+
+    report = scanFile(rdr, watchTags=('SatelliteFixStatus', 'NotInFile'))
+    assert report['frames'] == 10
+    assert report['nominalIntervalSeconds'] == 1.0
+    assert report['gaps'] == [{'frame': 4, 'timestamp': '2010-01-01T00:00:07.000000', 'seconds': 3.0,
+                               'missingFrames': 2}]
+    assert report['duplicateTimestamps'] == [5]
+    assert report['backwardSteps'] == [{'frame': 7, 'timestamp': '2010-01-01T00:00:07.500000', 'seconds': -0.5}]
+    assert report['missingTimestamps'] == [9]
+    assert report['exposureChanges'] == [{'frame': 6, 'fromSeconds': 0.5, 'toSeconds': 0.25}]
+    assert report['frameIdJumps'] == [{'frame': 6, 'tag': 'VideoCameraFrameId', 'from': 5, 'to': 9}]
+    assert report['tagChanges'] == [{'frame': 2, 'tag': 'SatelliteFixStatus', 'from': 0, 'to': 1},
+                                    {'frame': 7, 'tag': 'SatelliteFixStatus', 'from': 1, 'to': 2}]
+    assert report['durationSeconds'] == pytest.approx(8.25)
+
+    lines = AdvScan._summary(dict(report, path='recorded.adv'))
+    assert lines[0].startswith('recorded.adv: 10 Main frames, nominal interval 1.000000 s')
+    assert '  gap of 3.000000 s before frame 4 (2010-01-01T00:00:07.000000), about 2 frames missing' in lines
+
+
+def test_commandLine(syntheticFile, monkeypatch, capsys):
+    monkeypatch.setattr(sys, 'argv', ['AdvScan', syntheticFile.filename, '--backend', 'mmap', '--json'])
+    AdvScan.main()
+    report = json.loads(capsys.readouterr().out)
+    assert report['frames'] == 60
+    assert len(report['tagChanges']) == 2 * 59  # SatelliteFixStatus and AlmanacStatus count the frames
+
+    monkeypatch.setattr(sys, 'argv', ['AdvScan', syntheticFile.filename, '--backend', 'mmap', '--stream',
+                                      'Calibration'])
+    AdvScan.main()
+    assert capsys.readouterr().out.startswith(f'{syntheticFile.filename}: 4 Calibration frames')
@@ -0,0 +1,117 @@
+# The naming conventions follow those used in github.com/AstroDigitalVideo/ADVlib
+# While not exactly 'Pythonic' (i.e., not snake case), it was my judgement (Bob Anderson) that
+# fewer errors would be introduced and would reduce the intellectual 'load' of comparing
+# the Python code against the equivalent code in github.com/AstroDigitalVideo/ADVlib
+
+# The sidecar cache files of Adv2reader (AdvSidecar)
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from Adv2 import AdvMmapLib
+from Adv2.Adv import StreamId
+from Adv2.Adv2File import Adv2reader
+from Adv2.AdvSidecar import loadSidecar, sidecarKey, sidecarPath
+from tests.conftest import BACKENDS
+
+
+@pytest.fixture
+def advFile(syntheticFile, tmp_path) -> str:
+    # A copy of the synthetic file in a folder of its own, for its sidecar
+    filename = str(tmp_path / 'copy.adv')
+    shutil.copyfile(syntheticFile.filename, filename)
+    return filename
+
+
+def readerState(rdr: Adv2reader):
+    return (rdr.statusTagInfo, rdr.getAdvFileMetaData(), [index.tolist() for index in rdr.getIndexArrays()],
+            [array.tolist() for array in rdr.getTimestamps()], rdr.getMainImageAndStatusData(9)[3])
+
+
+def openWithoutStatusTagInfo(filename: str, monkeypatch) -> Adv2reader:
+    # Opens the file with the sidecar, failing if the status tag layout is read from the file itself
+    def notFromTheFile(self, tagId):
+        raise AssertionError('the status tag layout was read from the file')
+    with monkeypatch.context() as patch:
+        patch.setattr(AdvMmapLib.AdvMmapFile, 'AdvVer2_GetStatusTagInfo', notFromTheFile)
+        return Adv2reader(filename, backend='mmap', sidecarCache=True)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_roundTrip(advFile, backend, monkeypatch):
+    rdr = Adv2reader(advFile, backend=backend, sidecarCache=True)
+    try:
+        assert os.path.isfile(sidecarPath(advFile))
+        assert loadSidecar(advFile, sidecarKey(advFile))['timestamps'] == {}
+        expected = readerState(rdr)  # Computing the timestamps adds them to the sidecar
+    finally:
+        rdr.closeFile()
+    assert list(loadSidecar(advFile, sidecarKey(advFile))['timestamps']) == ['Main']
+
+    rdr = openWithoutStatusTagInfo(advFile, monkeypatch)
+    try:
+        assert StreamId.Main in rdr._timestamps
+        assert readerState(rdr) == expected
+    finally:
+        rdr.closeFile()
+
+
+@pytest.mark.parametrize('damage', ['overwritten', 'truncated'])
+def test_corruptSidecarIsIgnored(advFile, syntheticFile, damage):
+    Adv2reader(advFile, backend='mmap', sidecarCache=True).closeFile()
+    with open(sidecarPath(advFile), 'r+b') as f:
+        if damage == 'overwritten':
+            f.seek(100)
+            f.write(b'not a zip file' * 10)
+        else:
+            f.truncate(os.path.getsize(sidecarPath(advFile)) // 2)
+    assert loadSidecar(advFile, sidecarKey(advFile)) is None
+
+    rdr = Adv2reader(advFile, backend='mmap', sidecarCache=True)
+    try:
+        assert rdr.getMainImageAndStatusData(3)[3]['VideoCameraFrameId'] == 3
+        np.testing.assert_array_equal(rdr.getTimestamps()[0], [syntheticFile.startOfExposure(n) for n in range(60)])
+    finally:
+        rdr.closeFile()
+    # ... and rebuilt
+    assert loadSidecar(advFile, sidecarKey(advFile)) is not None
+
+
+def test_staleSidecarIsIgnored(advFile, syntheticFiles, tmp_path):
+    # The sidecar of another file (of another image size) is left where this file's sidecar should be
+    other = str(tmp_path / 'other.adv')
+    shutil.copyfile(syntheticFiles['8bit'].filename, other)
+    Adv2reader(other, backend='mmap', sidecarCache=True).closeFile()
+    shutil.copyfile(sidecarPath(other), sidecarPath(advFile))
+    assert loadSidecar(advFile, sidecarKey(advFile)) is None
+
+    # A file that has changed since its sidecar was written
+    Adv2reader(advFile, backend='mmap', sidecarCache=True).closeFile()
+    stat = os.stat(advFile)
+    os.utime(advFile, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert loadSidecar(advFile, sidecarKey(advFile)) is None
+
+
+def test_sidecarWithOtherFileInfoIsIgnored(advFile):
+    # A sidecar whose key matches but whose file information does not is not used
+    rdr = Adv2reader(advFile, backend='mmap', sidecarCache=True)
+    expected = readerState(rdr)
+    rdr.closeFile()
+    with np.load(sidecarPath(advFile)) as npz:
+        arrays = dict(npz)
+    fileInfo = json.loads(str(arrays['fileInfo']))
+    fileInfo['StatusTagsCount'] = 1
+    arrays['fileInfo'] = np.array(json.dumps(fileInfo))
+    arrays['statusTags'] = np.array(json.dumps([[0, 4, 'Bogus']]))
+    with open(sidecarPath(advFile), 'wb') as f:
+        np.savez(f, **arrays)
+
+    rdr = Adv2reader(advFile, backend='mmap', sidecarCache=True)
+    try:
+        assert readerState(rdr) == expected
+    finally:
+        rdr.closeFile()